@@ -0,0 +1,89 @@
+"""
+Compare the shared cache with a dict cache of each worker.
+
+    python benchmarks/bench_shared_cache.py [--workers 8] [--keys 2000] [--rounds 3]
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+import timeit
+
+from guniflask_cli.shared_cache import SharedCache
+
+
+def bench_ops(keys: int):
+    value = {'id': 1, 'name': 'reference data', 'tags': ['a', 'b', 'c']}
+    d = {}
+    cache = SharedCache(slots=keys * 2, slot_size=256)
+    for i in range(keys):
+        d[f'k{i}'] = value
+        cache.set(f'k{i}', value)
+    n = 100000
+    print(f'{"operation":<24}{"per-worker dict":>18}{"shared cache":>18}')
+    for name, f_dict, f_cache in [
+        ('get (hit)', lambda: d.get('k7'), lambda: cache.get('k7')),
+        ('get (miss)', lambda: d.get('missing'), lambda: cache.get('missing')),
+        ('set', lambda: d.__setitem__('k7', value), lambda: cache.set('k7', value)),
+    ]:
+        t_dict = timeit.timeit(f_dict, number=n) / n
+        t_cache = timeit.timeit(f_cache, number=n) / n
+        print(f'{name:<24}{t_dict * 1e6:>15.2f} us{t_cache * 1e6:>15.2f} us')
+
+
+def load(key, cost):
+    # stands for a query of reference data
+    time.sleep(cost)
+    return {'key': key, 'payload': 'x' * 100}
+
+
+def run_worker(cache, keys, cost, misses):
+    local = {}
+    n = 0
+    for i in range(keys):
+        key = f'k{i}'
+        if cache is None:
+            if key not in local:
+                local[key] = load(key, cost)
+                n += 1
+        elif cache.get(key) is None:
+            cache.set(key, load(key, cost))
+            n += 1
+    with misses.get_lock():
+        misses.value += n
+
+
+def bench_workers(workers: int, keys: int, cost: float, rounds: int):
+    print(f'\n{workers} workers each reading {keys} keys, a miss costs {cost * 1000:.1f} ms, '
+          f'workers are replaced {rounds - 1} times like on max_requests')
+    for name, cache in [('per-worker dict', None), ('shared cache', SharedCache(slots=keys * 2, slot_size=256))]:
+        misses = multiprocessing.Value('i', 0)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            pids = []
+            for _ in range(workers):
+                pid = os.fork()
+                if pid == 0:
+                    run_worker(cache, keys, cost, misses)
+                    os._exit(0)
+                pids.append(pid)
+            for pid in pids:
+                os.waitpid(pid, 0)
+        elapsed = time.perf_counter() - start
+        print(f'{name:<24}{misses.value:>8} misses{elapsed:>10.2f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--keys', type=int, default=2000)
+    parser.add_argument('--cost', type=float, default=0.0005, help='Seconds to load a key on a miss.')
+    parser.add_argument('--rounds', type=int, default=3, help='Generations of workers.')
+    args = parser.parse_args()
+    bench_ops(args.keys)
+    bench_workers(args.workers, args.keys, args.cost, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import json
+import mmap
+import os
+import signal
+import struct
+import threading
+import time
+from collections import deque
+from os.path import splitext
+
+from .master_thread import MasterThread
+from .workers import worker_concurrency
+
+# in-flight requests, served requests
+_SLOT = struct.Struct('<qq')
+
+# state of listening sockets in /proc/net/tcp
+_TCP_LISTEN = '0A'
+
+
+class WorkerCounters:
+    """
+    Requests counted by workers in memory shared with the master.
+
+    The master assigns a free slot to each worker before forking it, the worker is the only writer of its slot.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.buf = mmap.mmap(-1, slots * _SLOT.size)
+        # threads of a gthread worker share the slot
+        self.lock = threading.Lock()
+
+    def assign(self, worker, workers):
+        used = {getattr(w, '_guniflask_slot', None) for w in workers}
+        for i in range(self.slots):
+            if i not in used:
+                _SLOT.pack_into(self.buf, i * _SLOT.size, 0, 0)
+                worker._guniflask_slot = i
+                return i
+        # not counted, more workers than slots
+        worker._guniflask_slot = None
+        return None
+
+    def read(self, i) -> tuple:
+        inflight, requests = _SLOT.unpack_from(self.buf, i * _SLOT.size)
+        return max(inflight, 0), requests
+
+    def begin(self, i):
+        with self.lock:
+            inflight, requests = _SLOT.unpack_from(self.buf, i * _SLOT.size)
+            _SLOT.pack_into(self.buf, i * _SLOT.size, inflight + 1, requests)
+
+    def end(self, i):
+        with self.lock:
+            inflight, requests = _SLOT.unpack_from(self.buf, i * _SLOT.size)
+            _SLOT.pack_into(self.buf, i * _SLOT.size, inflight - 1, requests + 1)
+
+
+def listen_backlog(inodes) -> int:
+    """
+    Connections waiting to be accepted on the listening TCP sockets of the given inodes.
+    """
+    backlog = 0
+    if not inodes:
+        return backlog
+    for fname in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(fname, 'r') as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 10 or fields[3] != _TCP_LISTEN or int(fields[9]) not in inodes:
+                continue
+            # the receive queue of a listening socket is its accept queue
+            backlog += int(fields[4].split(':')[1], 16)
+    return backlog
+
+
+def autoscale_metrics_file(pidfile: str) -> str:
+    return f'{splitext(pidfile)[0]}.autoscale.json'
+
+
+def max_workers(cfg) -> int:
+    return cfg.autoscale_max_workers or 2 * cfg.workers
+
+
+def peak_workers(cfg) -> int:
+    """
+    The most workers the autoscaler runs at the same time.
+    """
+    return max(max_workers(cfg), cfg.autoscale_min_workers)
+
+
+class Autoscaler(MasterThread):
+    """
+    Add or remove a worker at a time by sending TTIN or TTOU to the master, so that the arbiter changes
+    the number of workers in its own loop.
+    """
+
+    name = 'autoscaler'
+
+    def __init__(self, server):
+        super().__init__(server)
+        self.samples = deque()
+        self.last_change = time.monotonic()
+        self.decisions = deque(maxlen=20)
+
+    @property
+    def interval(self):
+        return self.server.cfg.autoscale_interval
+
+    def check(self):
+        cfg = self.server.cfg
+        now = time.monotonic()
+        inflight = requests = 0
+        for w in self.workers().values():
+            i = getattr(w, '_guniflask_slot', None)
+            if i is not None and _counters is not None:
+                a, b = _counters.read(i)
+                inflight += a
+                requests += b
+        workers = self.server.num_workers
+        capacity = workers * worker_concurrency(self.server.app.options)
+        utilization = inflight / capacity if capacity else 0.0
+        backlog = listen_backlog(self.listener_inodes())
+        self.samples.append((utilization, backlog))
+        size = max(1, round(cfg.autoscale_window / cfg.autoscale_interval))
+        while len(self.samples) > size:
+            self.samples.popleft()
+        average = sum(u for u, _ in self.samples) / len(self.samples)
+        self.write_metrics(workers, inflight, requests, utilization, average, backlog)
+
+        lo, hi = cfg.autoscale_min_workers, peak_workers(cfg)
+        if workers < lo:
+            self.scale(1, f'{workers} workers are fewer than the minimum {lo}')
+        elif workers > hi:
+            self.scale(-1, f'{workers} workers are more than the maximum {hi}')
+        elif now - self.last_change < cfg.autoscale_cooldown or len(self.samples) < size:
+            return
+        elif workers < hi and average >= cfg.autoscale_scale_up:
+            self.scale(1, f'average utilization {average:.2f} >= {cfg.autoscale_scale_up}')
+        elif workers < hi and all(b > 0 for _, b in self.samples):
+            self.scale(1, f'{backlog} connections are waiting to be accepted')
+        elif workers > lo and all(u <= cfg.autoscale_scale_down and b == 0 for u, b in self.samples):
+            self.scale(-1, f'utilization {max(u for u, _ in self.samples):.2f} <= {cfg.autoscale_scale_down}')
+
+    def listener_inodes(self) -> set:
+        # listeners are replaced on reload if the bind changes
+        inodes = set()
+        for lnr in self.server.LISTENERS:
+            try:
+                inodes.add(os.fstat(lnr.fileno()).st_ino)
+            except OSError:
+                pass
+        return inodes
+
+    def scale(self, delta, reason):
+        workers = self.server.num_workers
+        self.log.info('Autoscaler %s a worker (%s -> %s): %s', 'adds' if delta > 0 else 'removes',
+                      workers, workers + delta, reason)
+        self.decisions.append({'time': time.time(), 'workers': workers + delta, 'reason': reason})
+        self.last_change = time.monotonic()
+        # decide on the samples taken with the new workers
+        self.samples.clear()
+        os.kill(self.server.pid, signal.SIGTTIN if delta > 0 else signal.SIGTTOU)
+
+    def write_metrics(self, workers, inflight, requests, utilization, average, backlog):
+        pidfile = self.server.cfg.pidfile
+        if not pidfile:
+            return
+        cfg = self.server.cfg
+        metrics = {
+            'time': time.time(),
+            'pid': self.server.pid,
+            'workers': workers,
+            'min_workers': cfg.autoscale_min_workers,
+            'max_workers': max_workers(cfg),
+            'inflight': inflight,
+            'requests': requests,
+            'utilization': round(utilization, 4),
+            'average_utilization': round(average, 4),
+            'backlog': backlog,
+            'decisions': list(self.decisions),
+        }
+        fname = autoscale_metrics_file(pidfile)
+        tmp = f'{fname}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f)
+        os.replace(tmp, fname)
+
+
+_counters = None
+
+
+def create_worker_counters(server):
+    global _counters
+    if _counters is None:
+        # old workers are still running while new ones are spawned on reload
+        _counters = WorkerCounters(2 * peak_workers(server.cfg) + 16)
+
+
+def assign_worker_slot(server, worker):
+    if _counters is not None:
+        _counters.assign(worker, server.WORKERS.values())
+
+
+def count_request_start(worker, req):
+    i = getattr(worker, '_guniflask_slot', None)
+    if i is not None and _counters is not None:
+        _counters.begin(i)
+
+
+def count_request_end(worker, req, environ, resp):
+    i = getattr(worker, '_guniflask_slot', None)
+    if i is not None and _counters is not None:
+        _counters.end(i)
+
+
+def start_autoscaler(server):
+    Autoscaler.start(server)
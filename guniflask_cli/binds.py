@@ -0,0 +1,105 @@
+import os
+import socket
+
+SD_LISTEN_FDS_START = 3
+
+DEFAULT_PORT = 8000
+
+
+def parse_bind(bind: str) -> tuple:
+    """
+    Parse a gunicorn bind into ``('tcp', host, port)``, ``('unix', path)`` or ``('fd', fd)``.
+    """
+    bind = bind.strip()
+    if bind.startswith('unix:'):
+        path = bind[len('unix:'):]
+        if path.startswith('//'):
+            path = path[2:]
+        return 'unix', path
+    if bind.startswith('fd://'):
+        return 'fd', int(bind[len('fd://'):])
+    if bind.startswith('tcp://'):
+        bind = bind[len('tcp://'):]
+    if bind.startswith('['):
+        # IPv6, e.g. [::1]:8000
+        host, _, rest = bind[1:].partition(']')
+        port = rest[1:] if rest.startswith(':') else ''
+    elif bind.count(':') == 1:
+        host, port = bind.split(':')
+    else:
+        host, port = bind, ''
+    return 'tcp', host or '0.0.0.0', int(port) if port else DEFAULT_PORT
+
+
+def parse_binds(bind) -> list:
+    if bind is None:
+        return []
+    if isinstance(bind, str):
+        bind = [bind]
+    if not isinstance(bind, (list, tuple)):
+        raise ValueError(f'Invalid bind: {bind}')
+    return [parse_bind(i) for i in bind]
+
+
+def systemd_listen_fds() -> list:
+    """
+    File descriptors passed by systemd socket activation to the current process.
+    """
+    if os.environ.get('LISTEN_PID') != str(os.getpid()):
+        return []
+    try:
+        n = int(os.environ.get('LISTEN_FDS', 0))
+    except ValueError:
+        return []
+    return list(range(SD_LISTEN_FDS_START, SD_LISTEN_FDS_START + n))
+
+
+def fd_address(fd: int):
+    """
+    The ``(host, port)`` an inherited TCP socket listens on, or None.
+    """
+    try:
+        sock = socket.socket(fileno=fd)
+    except OSError:
+        return None
+    try:
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            return sock.getsockname()[:2]
+    except OSError:
+        pass
+    finally:
+        # do not close the inherited fd
+        sock.detach()
+    return None
+
+
+def default_host_port(binds: list, listen_fds=None):
+    """
+    The address that the app is served on, for ``GUNIFLASK_HOST`` and ``GUNIFLASK_PORT``.
+
+    Sockets activated by systemd replace the binds. Otherwise the first TCP bind wins,
+    then inherited TCP sockets. (None, None) if the app is only served on unix sockets.
+    """
+    listen_fds = systemd_listen_fds() if listen_fds is None else listen_fds
+    if not listen_fds:
+        for b in binds:
+            if b[0] == 'tcp':
+                return b[1], b[2]
+        listen_fds = [b[1] for b in binds if b[0] == 'fd']
+    for fd in listen_fds:
+        addr = fd_address(fd)
+        if addr:
+            return addr
+    return None, None
+
+
+def chmod_unix_sockets(server):
+    """
+    Apply ``unix_socket_mode`` to the unix sockets that gunicorn listens on.
+    """
+    mode = server.cfg.unix_socket_mode
+    if mode is None:
+        return
+    for lnr in server.LISTENERS:
+        if lnr.FAMILY == socket.AF_UNIX and isinstance(lnr.cfg_addr, str):
+            os.chmod(lnr.cfg_addr, mode)
@@ -0,0 +1,243 @@
+import http.client
+import itertools
+import math
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import click
+
+from guniflask_cli.errors import UsageError
+from guniflask_cli.gunicorn import GunicornApplication
+
+
+@click.group()
+def cli_bench():
+    pass
+
+
+@cli_bench.command('bench')
+@click.option('-p', '--active-profiles', metavar='PROFILES', help='Active profiles (comma-separated).')
+@click.option('-r', '--route', 'routes', metavar='ROUTE', multiple=True,
+              help='Route to request, can be specified multiple times (default: /health).')
+@click.option('-c', '--concurrency', default=16, show_default=True, help='Number of concurrent connections.')
+@click.option('-t', '--duration', default=10.0, show_default=True, help='Seconds to run each benchmark.')
+@click.option('--warmup', default=1.0, show_default=True, help='Seconds to warm up before measuring.')
+@click.option('-w', '--workers', metavar='LIST', help='Numbers of workers to sweep (comma-separated).')
+@click.option('-k', '--worker-class', metavar='LIST', help='Worker classes to sweep (comma-separated).')
+@click.option('--worker-connections', metavar='LIST', help='Worker connections to sweep (comma-separated).')
+@click.option('--threads', metavar='LIST', help='Worker threads to sweep (comma-separated).')
+def main(active_profiles, routes, concurrency, duration, warmup, workers, worker_class, worker_connections,
+         threads):
+    """
+    Benchmark application.
+    """
+    Bench().run(active_profiles, routes, concurrency, duration, warmup,
+                workers=workers, worker_class=worker_class,
+                worker_connections=worker_connections, threads=threads)
+
+
+class Bench:
+    def run(self, active_profiles, routes, concurrency, duration, warmup, **matrix):
+        if active_profiles:
+            os.environ['GUNIFLASK_ACTIVE_PROFILES'] = active_profiles
+        os.environ.setdefault('GUNIFLASK_ACTIVE_PROFILES', 'prod')
+        routes = list(routes) or ['/health']
+
+        results = []
+        for opt in self.make_matrix(matrix):
+            port = free_port()
+            opt.update({
+                'daemon': False,
+                'bind': f'127.0.0.1:{port}',
+                'reload': False,
+            })
+            app = GunicornApplication(**opt)
+            settings = {
+                'workers': app.cfg.workers,
+                'worker_class': app.cfg.worker_class_str,
+                'threads': app.cfg.threads,
+                'worker_connections': app.cfg.worker_connections,
+            }
+            print(f'Benchmarking {format_settings(settings)}', flush=True)
+
+            ctx = multiprocessing.get_context('fork')
+            server = ctx.Process(target=app.run, daemon=True)
+            server.start()
+            try:
+                wait_for_server('127.0.0.1', port, routes[0], server)
+                if warmup > 0:
+                    LoadGenerator('127.0.0.1', port, routes, concurrency, warmup).run()
+                result = LoadGenerator('127.0.0.1', port, routes, concurrency, duration).run()
+                if not server.is_alive():
+                    raise UsageError('Application exited during benchmark')
+            finally:
+                server.terminate()
+                server.join(30)
+                if server.is_alive():
+                    server.kill()
+            result.settings = settings
+            results.append(result)
+        self.print_results(results)
+
+    @staticmethod
+    def make_matrix(matrix: dict):
+        keys = []
+        values = []
+        for k, v in matrix.items():
+            if v:
+                keys.append(k)
+                values.append([parse_option_value(i) for i in v.split(',') if i.strip()])
+        for combination in itertools.product(*values):
+            yield dict(zip(keys, combination))
+
+    @staticmethod
+    def print_results(results):
+        headers = ['workers', 'worker_class', 'threads', 'worker_connections',
+                   'requests', 'errors', 'req/s', 'p50(ms)', 'p90(ms)', 'p99(ms)', 'max(ms)']
+        rows = []
+        for r in results:
+            rows.append([
+                r.settings['workers'],
+                r.settings['worker_class'],
+                r.settings['threads'],
+                r.settings['worker_connections'],
+                r.requests,
+                r.errors,
+                f'{r.throughput:.1f}',
+                f'{r.percentile(50) * 1000:.2f}',
+                f'{r.percentile(90) * 1000:.2f}',
+                f'{r.percentile(99) * 1000:.2f}',
+                f'{r.percentile(100) * 1000:.2f}',
+            ])
+        print(format_table(headers, rows), flush=True)
+
+
+class BenchResult:
+    def __init__(self, latencies, errors, elapsed):
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        self.settings = {}
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return len(self.latencies) / self.elapsed
+
+    def percentile(self, p):
+        return percentile(self.latencies, p)
+
+
+class LoadGenerator:
+    """
+    Closed-loop HTTP load generator, each thread keeps its own keep-alive connection.
+    """
+
+    def __init__(self, host, port, routes, concurrency, duration):
+        self.host = host
+        self.port = port
+        self.routes = routes
+        self.concurrency = concurrency
+        self.duration = duration
+
+    def run(self) -> BenchResult:
+        latencies = [[] for _ in range(self.concurrency)]
+        errors = [0] * self.concurrency
+        deadline = time.perf_counter() + self.duration
+        threads = [threading.Thread(target=self._worker, args=(i, deadline, latencies, errors), daemon=True)
+                   for i in range(self.concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        return BenchResult(itertools.chain.from_iterable(latencies), sum(errors), elapsed)
+
+    def _worker(self, index, deadline, latencies, errors):
+        conn = None
+        offset = index % len(self.routes)
+        routes = itertools.cycle(self.routes[offset:] + self.routes[:offset])
+        result = latencies[index]
+        while time.perf_counter() < deadline:
+            route = next(routes)
+            if conn is None:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            t = time.perf_counter()
+            try:
+                conn.request('GET', route)
+                resp = conn.getresponse()
+                resp.read()
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                conn.close()
+                conn = None
+                continue
+            result.append(time.perf_counter() - t)
+            if resp.status >= 500:
+                errors[index] += 1
+            if resp.will_close:
+                conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(host, port, route, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not process.is_alive():
+            raise UsageError('Application exited before serving requests')
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        try:
+            conn.request('GET', route)
+            conn.getresponse().read()
+            return
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.1)
+        finally:
+            conn.close()
+    raise UsageError(f'Application is not ready after {timeout} seconds')
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = max(0, math.ceil(len(sorted_values) * p / 100) - 1)
+    return sorted_values[k]
+
+
+def parse_option_value(s: str):
+    s = s.strip()
+    try:
+        return int(s)
+    except ValueError:
+        return s
+
+
+def format_settings(settings: dict):
+    return ', '.join(f'{k}={v}' for k, v in settings.items())
+
+
+def format_table(headers, rows):
+    rows = [[str(i) for i in row] for row in rows]
+    widths = [max([len(h)] + [len(row[i]) for row in rows]) for i, h in enumerate(headers)]
+    lines = ['  '.join(h.rjust(w) for h, w in zip(headers, widths)),
+             '  '.join('-' * w for w in widths)]
+    for row in rows:
+        lines.append('  '.join(c.rjust(w) for c, w in zip(row, widths)))
+    return '\n'.join(lines)
@@ -1,7 +1,12 @@
+import hashlib
+import json
 import os
+import re
 import shutil
+import stat
+import sys
 from importlib import import_module
-from os.path import join, basename, exists, isdir, dirname
+from os.path import join, basename, exists, isdir, dirname, relpath
 
 import click
 
@@ -36,6 +41,7 @@ class Build:
 
         self.copy_files(dist_dir, home_dir, includes)
         self.build(dist_dir, app_name)
+        self.make_layers(dist_dir, app_name, app_version)
 
     def copy_files(self, dist_dir, home_dir, includes):
         if exists(dist_dir):
@@ -44,7 +50,9 @@ class Build:
 
         self.copy_ignore = ['*.pyc', '__pycache__']
         for d in includes:
-            self.copy_tree(join(home_dir, d), join(dist_dir, d))
+            # e.g. docker-compose.yml is not generated for every project
+            if exists(join(home_dir, d)):
+                self.copy_tree(join(home_dir, d), join(dist_dir, d))
 
     def copy_tree(self, src, dst):
         if not isdir(src):
@@ -127,6 +135,153 @@ class Build:
             py_file = join(self.build_dist, src, name)
             os.remove(py_file)
 
+    def get_layers(self, app_name):
+        """
+        Layers of the image in order, from the least to the most frequently changed.
+        """
+        layers = [
+            ('deps', ['requirements']),
+            ('config', ['bin', 'conf']),
+            ('app', [app_name]),
+        ]
+        return layers
+
+    def make_layers(self, dist_dir, app_name, app_version=None):
+        """
+        Copy the built files into a directory for each layer named by the hash of its content,
+        and write the manifest and a Dockerfile copying the layers in order.
+        """
+        layers_dir = join(dist_dir, 'layers')
+        if exists(layers_dir):
+            shutil.rmtree(layers_dir)
+        mtime = int(os.environ.get('SOURCE_DATE_EPOCH', LAYER_MTIME))
+        manifest = []
+        for name, includes in self.get_layers(app_name):
+            tmp_dir = join(layers_dir, f'.{name}')
+            for d in includes:
+                if exists(join(dist_dir, d)):
+                    self.copy_tree(join(dist_dir, d), join(tmp_dir, d))
+            if not exists(tmp_dir):
+                os.makedirs(tmp_dir)
+            digest, files, size = layer_digest(tmp_dir)
+            layer_dir = join(layers_dir, f'{name}-{digest[:12]}')
+            os.rename(tmp_dir, layer_dir)
+            normalize_tree(layer_dir, mtime)
+            manifest.append({
+                'name': name,
+                'path': relpath(layer_dir, dist_dir),
+                'sha256': digest,
+                'files': files,
+                'size': size,
+            })
+            print(f'Layer {basename(layer_dir)}: {files} files, {size} bytes')
+        with open(join(dist_dir, 'layers.json'), 'w', encoding='utf-8') as f:
+            json.dump({'app_name': app_name, 'version': app_version, 'layers': manifest}, f, indent=2)
+            f.write('\n')
+        layer_paths = {i['name']: i['path'] for i in manifest}
+        with open(join(dist_dir, 'Dockerfile.layers'), 'w', encoding='utf-8') as f:
+            f.write(layers_dockerfile.format(
+                python_version=f'{sys.version_info.major}.{sys.version_info.minor}',
+                timezone=project_timezone(join(dist_dir, 'Dockerfile')),
+                app_name=app_name,
+                deps=layer_paths['deps'],
+                config=layer_paths['config'],
+                app=layer_paths['app'],
+            ))
+
+
+def project_timezone(dockerfile):
+    """
+    The timezone set in the Dockerfile of the project, or the local timezone as the project is generated with.
+    """
+    try:
+        with open(dockerfile, 'r', encoding='utf-8') as f:
+            m = re.search(r'^ENV\s+TZ=(\S+)', f.read(), re.MULTILINE)
+    except OSError:
+        m = None
+    if m:
+        return m.group(1)
+    from tzlocal import get_localzone
+
+    return str(get_localzone())
+
+
+# 1980-01-01, the earliest time zip files can record
+LAYER_MTIME = 315532800
+
+
+def layer_digest(root):
+    """
+    sha256 of the paths, executable bits and contents of the files under ``root``,
+    with the number of files and their total size.
+    """
+    entries = []
+    size = 0
+    for d, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            path = join(d, name)
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 16), b''):
+                    h.update(chunk)
+            executable = os.stat(path).st_mode & stat.S_IXUSR
+            entries.append(f'{relpath(path, root)}\0{"x" if executable else "-"}\0{h.hexdigest()}\n')
+            size += os.path.getsize(path)
+    digest = hashlib.sha256(''.join(sorted(entries)).encode('utf-8')).hexdigest()
+    return digest, len(entries), size
+
+
+def normalize_tree(root, mtime):
+    """
+    Make the metadata of a layer reproducible: permissions by executable bit and a fixed mtime.
+    """
+    for d, dirs, files in os.walk(root, topdown=False):
+        for name in files:
+            path = join(d, name)
+            executable = os.stat(path).st_mode & stat.S_IXUSR
+            os.chmod(path, 0o755 if executable else 0o644)
+            os.utime(path, (mtime, mtime))
+        os.chmod(d, 0o755)
+        os.utime(d, (mtime, mtime))
+
+
+layers_dockerfile = """# syntax=docker/dockerfile:1
+# generated by guniflask build, each layer is copied from a directory named by the hash of its content
+ARG PYTHON_VERSION={python_version}
+
+FROM python:${{PYTHON_VERSION}} AS builder
+
+COPY ./{deps}/requirements /opt/requirements
+RUN --mount=type=cache,target=/root/.cache/pip \\
+  pip wheel --wheel-dir /opt/wheels -r /opt/requirements/app.txt
+
+FROM python:${{PYTHON_VERSION}}-slim
+
+ENV TZ={timezone} \\
+  PYTHONDONTWRITEBYTECODE=1 \\
+  PYTHONUNBUFFERED=1
+
+# the slim image ships without zoneinfo
+RUN apt-get update \\
+  && apt-get install -y --no-install-recommends tzdata \\
+  && rm -rf /var/lib/apt/lists/* \\
+  && ln -fs /usr/share/zoneinfo/${{TZ}} /etc/localtime \\
+  && echo ${{TZ}} > /etc/timezone
+
+COPY ./{deps}/requirements /opt/requirements
+RUN --mount=type=bind,from=builder,source=/opt/wheels,target=/opt/wheels \\
+  pip install --no-cache-dir --no-index --find-links=/opt/wheels -r /opt/requirements/app.txt
+
+WORKDIR /opt/{app_name}
+COPY ./{config}/ ./
+COPY ./{app}/ ./
+RUN python -m compileall -q -j 0 --invalidation-mode unchecked-hash {app_name} \\
+  && chmod +x bin/manage
+
+ENTRYPOINT ["bin/manage", "start", "--daemon-off"]
+"""
+
 
 build_py_script = """import sys
 from distutils.core import setup
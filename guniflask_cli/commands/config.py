@@ -0,0 +1,142 @@
+import os
+import sys
+
+import click
+
+from guniflask_cli.errors import ConfigError
+from guniflask_cli.frozen_config import ENV_SETTINGS, diff_dict, flatten_dict, freeze_config, freeze_value, \
+    frozen_config_file, live_app_settings, live_gunicorn_options, read_frozen_config, source_digests, \
+    write_frozen_config
+from guniflask_cli.gunicorn import GunicornApplication
+from guniflask_cli.workers import validate_worker_options
+
+
+@click.group()
+def cli_config():
+    pass
+
+
+@cli_config.group('config')
+def main():
+    """
+    Manage the frozen config.
+    """
+
+
+@main.command('freeze')
+@click.option('-p', '--active-profiles', metavar='PROFILES', help='Active profiles (comma-separated).')
+def freeze(active_profiles):
+    """
+    Resolve the config of active profiles into a snapshot that start boots from.
+    """
+    f = ConfigFreeze()
+    f.run(active_profiles)
+    sys.exit(f.exitcode)
+
+
+@main.command('diff')
+@click.option('-p', '--active-profiles', metavar='PROFILES',
+              help='Active profiles (comma-separated), default to the profiles of the snapshot.')
+def diff(active_profiles):
+    """
+    Compare the frozen config with the live config.
+    """
+    d = ConfigDiff()
+    d.run(active_profiles)
+    sys.exit(d.exitcode)
+
+
+def resolve_live_config(active_profiles):
+    """
+    Resolve the gunicorn settings and app settings by executing conf modules like start does.
+    """
+    from guniflask.config import app_name_from_env
+
+    os.environ['GUNIFLASK_ACTIVE_PROFILES'] = active_profiles
+    # set the environment which the settings of the app depend on
+    app = GunicornApplication(use_frozen_config=False)
+    validate_worker_options(app.options)
+    conf_dir = os.environ['GUNIFLASK_CONF_DIR']
+    app_name = app_name_from_env()
+    return conf_dir, app_name, live_gunicorn_options(conf_dir, active_profiles), live_app_settings(app_name)
+
+
+class ConfigFreeze:
+    exitcode = 0
+
+    def run(self, active_profiles):
+        active_profiles = active_profiles or os.environ.get('GUNIFLASK_ACTIVE_PROFILES') or 'prod'
+        try:
+            conf_dir, app_name, gunicorn_options, app_settings = resolve_live_config(active_profiles)
+            snapshot = freeze_config(conf_dir, app_name, active_profiles, gunicorn_options, app_settings)
+        except ConfigError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            self.exitcode = 1
+            return
+        fname = write_frozen_config(conf_dir, snapshot)
+        print(f"Froze the config of profiles '{active_profiles}' into {fname}")
+
+
+class ConfigDiff:
+    exitcode = 0
+
+    def run(self, active_profiles):
+        from guniflask.config import set_app_default_env
+
+        set_app_default_env()
+        conf_dir = os.environ['GUNIFLASK_CONF_DIR']
+        try:
+            snapshot = read_frozen_config(conf_dir)
+        except ConfigError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            self.exitcode = 1
+            return
+        if snapshot is None:
+            print(f'Config is not frozen: {frozen_config_file(conf_dir)} not found', file=sys.stderr)
+            self.exitcode = 1
+            return
+        frozen_profiles = snapshot.get('active_profiles')
+        active_profiles = active_profiles or frozen_profiles
+        try:
+            _, _, gunicorn_options, app_settings = resolve_live_config(active_profiles)
+        except ConfigError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            self.exitcode = 1
+            return
+        sections = [
+            ('profiles', {'active_profiles': frozen_profiles}, {'active_profiles': active_profiles}),
+            ('sources', snapshot.get('sources', {}), source_digests(conf_dir)),
+            ('gunicorn', snapshot.get('gunicorn', {}), self.freeze_dict(gunicorn_options)),
+            ('settings', flatten_dict(snapshot.get('settings', {})),
+             flatten_dict(self.freeze_dict({k: v for k, v in app_settings.items() if k not in ENV_SETTINGS},
+                                           tag_callables=True))),
+        ]
+        changed = False
+        for name, old, new in sections:
+            changes = diff_dict(old, new)
+            if not changes:
+                continue
+            changed = True
+            print(f'{name}:')
+            for k, (a, b) in changes.items():
+                if a is ...:
+                    print(f'  + {k}: {b!r}')
+                elif b is ...:
+                    print(f'  - {k}: {a!r}')
+                else:
+                    print(f'  ~ {k}: {a!r} -> {b!r}')
+        if changed:
+            self.exitcode = 1
+        else:
+            print(f"Frozen config of profiles '{frozen_profiles}' is up to date")
+
+    @staticmethod
+    def freeze_dict(d: dict, tag_callables: bool = False) -> dict:
+        frozen = {}
+        for k, v in d.items():
+            try:
+                frozen[k] = freeze_value(k, v, tag_callables)
+            except ConfigError:
+                # cannot be frozen, which is a difference anyway
+                frozen[k] = repr(v)
+        return frozen
@@ -13,15 +13,20 @@ def cli_debug():
 @cli_debug.command('debug')
 @click.option('-d', '--daemon', default=False, is_flag=True, help='Run in daemon mode.')
 @click.option('-p', '--active-profiles', metavar='PROFILES', help='Active profiles (comma-separated).')
-def main(daemon, active_profiles):
+@click.option('--profile', default=False, is_flag=True, help='Profile each request under .log/profiles.')
+@click.option('--profile-route', metavar='PATTERN', help='Only profile requests matching the pattern.')
+@click.option('--profile-sample', metavar='RATE', type=float,
+              help='Use the sampling profiler taking RATE samples per second instead of cProfile.')
+def main(daemon, active_profiles, profile, profile_route, profile_sample):
     """
     Debug application.
     """
-    Debug().run(daemon, active_profiles)
+    Debug().run(daemon, active_profiles, profile=profile, profile_route=profile_route,
+                profile_sample=profile_sample)
 
 
 class Debug:
-    def run(self, daemon, active_profiles):
+    def run(self, daemon, active_profiles, profile=False, profile_route=None, profile_sample=None):
         if active_profiles:
             os.environ['GUNIFLASK_ACTIVE_PROFILES'] = active_profiles
         os.environ['GUNIFLASK_DEBUG'] = '1'
@@ -30,5 +35,11 @@ class Debug:
         opt = {}
         if daemon:
             opt['daemon'] = True
+        if profile or profile_route or profile_sample:
+            opt['request_profiler'] = 'sampling' if profile_sample else 'cprofile'
+            if profile_route:
+                opt['request_profiler_route'] = profile_route
+            if profile_sample:
+                opt['request_profiler_sample_rate'] = profile_sample
         app = GunicornApplication(**opt)
         app.run()
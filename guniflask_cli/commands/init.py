@@ -63,6 +63,8 @@ class Init:
         )
         default_authentication_type = old_settings.get('authentication_type')
         default_port = old_settings.get('port', 8000)
+        default_traffic_profile = old_settings.get('traffic_profile', 'api')
+        default_benchmark = old_settings.get('benchmark', False)
         questions = [
             inquirer.Text(
                 'project_name',
@@ -85,6 +87,21 @@ class Init:
                 ],
                 default=default_authentication_type,
             ),
+            inquirer.List(
+                'traffic_profile',
+                message='What kind of traffic do you expect?',
+                choices=[
+                    ('Latency-sensitive API', 'api'),
+                    ('Long-polling or streaming', 'long_polling'),
+                    ('CPU-bound', 'cpu_bound'),
+                ],
+                default=default_traffic_profile,
+            ),
+            inquirer.Confirm(
+                'benchmark',
+                message='Would you like to generate benchmark tests of routes?',
+                default=default_benchmark,
+            ),
         ]
         answers = inquirer.prompt(questions, theme=GreenPassion(), raise_keyboard_interrupt=True)
         settings = {
@@ -137,6 +154,9 @@ class Init:
             settings['guniflask_max_version'] = f'{int(version_info[0]) + 1}.0'
         self.infer_project_version(project_dir, settings)
         settings['timezone'] = str(get_localzone())
+        # projects generated before the question was asked
+        settings.setdefault('traffic_profile', 'api')
+        settings.setdefault('benchmark', False)
 
     def infer_project_version(self, project_dir, settings):
         project_name = settings['project_name']
@@ -157,6 +177,9 @@ class Init:
         project_name = settings['project_name']
         if settings['authentication_type'] != 'jwt':
             ignore_files.add(f'{project_name}/config/jwt_config.py')
+        if not settings['benchmark']:
+            for name in ['__init__.py', 'baseline.json', 'conftest.py', 'test_routes.py']:
+                ignore_files.add(f'tests/benchmarks/{name}')
         return ignore_files
 
     def make_filename_mapping(self, settings):
@@ -0,0 +1,294 @@
+import builtins
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from importlib.util import resolve_name
+from os.path import join, dirname, exists
+
+import click
+
+from guniflask_cli.gunicorn import GunicornApplication
+
+
+@click.group()
+def cli_profile_startup():
+    pass
+
+
+@cli_profile_startup.command('profile-startup')
+@click.option('-p', '--active-profiles', metavar='PROFILES', help='Active profiles (comma-separated).')
+@click.option('-o', '--output', metavar='FILE', help='Speedscope JSON file (default: .log/startup.speedscope.json).')
+@click.option('--min-time', default=1.0, show_default=True, help='Hide imports taking less milliseconds.')
+@click.option('--top', default=10, show_default=True, help='Number of top memory allocations to show.')
+def main(active_profiles, output, min_time, top):
+    """
+    Profile startup of application.
+    """
+    ProfileStartup().run(active_profiles, output, min_time, top)
+
+
+class ProfileStartup:
+    def run(self, active_profiles, output, min_time, top):
+        if active_profiles:
+            os.environ['GUNIFLASK_ACTIVE_PROFILES'] = active_profiles
+        os.environ.setdefault('GUNIFLASK_ACTIVE_PROFILES', 'prod')
+
+        tracemalloc.start()
+        profiler = StartupProfiler()
+        profiler.install()
+        try:
+            self.boot(profiler)
+        finally:
+            profiler.uninstall()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+        if output is None:
+            output = join(os.environ['GUNIFLASK_HOME'], '.log', 'startup.speedscope.json')
+        d = dirname(output)
+        if d and not exists(d):
+            os.makedirs(d)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(profiler.to_speedscope(), f)
+
+        self.print_phases(profiler)
+        self.print_imports(profiler, min_time)
+        self.print_memory(profiler, snapshot, top)
+        print(f'Speedscope profile is written to {output}', flush=True)
+
+    @staticmethod
+    def boot(profiler):
+        """
+        Boot the app as GunicornApplication.load does, timing each step of app initialization.
+        """
+        with profiler.phase('load_config'):
+            gunicorn_app = GunicornApplication(daemon=False)
+        if gunicorn_app.frozen_config_error is not None:
+            print(f'Warning: the live config is loaded: {gunicorn_app.frozen_config_error}', flush=True)
+        with profiler.phase('load_app_env'):
+            from flask import Flask
+            from guniflask.app import AppInitializer
+            from guniflask.config import load_app_env
+            gunicorn_app.prepare_app()
+            load_app_env()
+        with profiler.phase('load_app_settings'):
+            initializer = AppInitializer()
+            app = Flask(initializer.name)
+        with profiler.phase('make_settings'):
+            initializer._make_settings(app)
+        with profiler.phase('create_bean_context'):
+            initializer._create_bean_context(app)
+        with profiler.phase('init_app'):
+            initializer._init_app(app)
+        with app.app_context():
+            with profiler.phase('register_blueprints'):
+                initializer._register_blueprints(app)
+            with profiler.phase('refresh_bean_context'):
+                initializer._refresh_bean_context(app)
+        return app
+
+    @staticmethod
+    def print_phases(profiler):
+        print('Phases:')
+        print(f'{"ms":>10}  phase')
+        for node in profiler.root.children:
+            print(f'{node.duration * 1000:>10.2f}  {node.name}')
+        print(f'{profiler.root.duration * 1000:>10.2f}  total', flush=True)
+
+    @staticmethod
+    def print_imports(profiler, min_time):
+        print(f'\nImports (at least {min_time} ms):')
+        print(f'{"cumulative":>10}  {"self":>10}  module')
+
+        def _print(node, depth):
+            for child in sorted(node.children, key=lambda n: n.duration, reverse=True):
+                if child.duration * 1000 < min_time:
+                    continue
+                if child.kind == 'import':
+                    print(f'{child.duration * 1000:>10.2f}  {child.self_time * 1000:>10.2f}  '
+                          f'{"  " * depth}{child.name}')
+                    _print(child, depth + 1)
+                else:
+                    _print(child, depth)
+
+        _print(profiler.root, 0)
+        sys.stdout.flush()
+
+    @staticmethod
+    def print_memory(profiler, snapshot, top):
+        nodes = []
+
+        def _collect(node):
+            for child in node.children:
+                if child.kind == 'import':
+                    nodes.append(child)
+                _collect(child)
+
+        _collect(profiler.root)
+        nodes.sort(key=lambda n: n.self_memory, reverse=True)
+        print(f'\nTop {top} modules by memory allocated on import:')
+        print(f'{"KiB":>10}  module')
+        for node in nodes[:top]:
+            print(f'{node.self_memory / 1024:>10.1f}  {node.name}')
+
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, '<frozen *>'),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        stats = snapshot.statistics('lineno')
+        print(f'\nTop {top} memory allocations:')
+        print(f'{"KiB":>10}  {"count":>8}  location')
+        for s in stats[:top]:
+            frame = s.traceback[0]
+            print(f'{s.size / 1024:>10.1f}  {s.count:>8}  {frame.filename}:{frame.lineno}')
+        sys.stdout.flush()
+
+
+class ProfileNode:
+    def __init__(self, name, kind, start):
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.end = start
+        self.memory_start = tracemalloc.get_traced_memory()[0]
+        self.memory_end = self.memory_start
+        self.children = []
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def self_time(self):
+        return self.duration - sum(c.duration for c in self.children)
+
+    @property
+    def memory(self):
+        return self.memory_end - self.memory_start
+
+    @property
+    def self_memory(self):
+        return self.memory - sum(c.memory for c in self.children)
+
+
+class StartupProfiler:
+    """
+    Record phases and module imports of the main thread as a tree of nested timings.
+    """
+
+    def __init__(self):
+        self.root = ProfileNode('startup', 'root', time.perf_counter())
+        self._stack = [self.root]
+        self._events = []
+        self._thread_id = threading.get_ident()
+        self._import = builtins.__import__
+        self._import_module = importlib.import_module
+
+    def install(self):
+        builtins.__import__ = self._timed_import
+        importlib.import_module = self._timed_import_module
+
+    def uninstall(self):
+        builtins.__import__ = self._import
+        importlib.import_module = self._import_module
+        self.root.end = time.perf_counter()
+        self.root.memory_end = tracemalloc.get_traced_memory()[0]
+
+    @contextmanager
+    def phase(self, name):
+        self._enter(name, 'phase')
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def _enter(self, name, kind):
+        node = ProfileNode(name, kind, time.perf_counter())
+        self._stack[-1].children.append(node)
+        self._stack.append(node)
+        self._events.append(('O', node))
+
+    def _exit(self):
+        node = self._stack.pop()
+        node.end = time.perf_counter()
+        node.memory_end = tracemalloc.get_traced_memory()[0]
+        self._events.append(('C', node))
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self._thread_id:
+            return self._import(name, globals, locals, fromlist, level)
+        fullname = name
+        if level > 0 and globals:
+            package = globals.get('__package__') or globals.get('__name__', '')
+            fullname = resolve_name('.' * level + name, package)
+        label = self._import_label(fullname, fromlist)
+        if label is None:
+            return self._import(name, globals, locals, fromlist, level)
+        self._enter(label, 'import')
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            self._exit()
+
+    def _timed_import_module(self, name, package=None):
+        if threading.get_ident() != self._thread_id:
+            return self._import_module(name, package)
+        fullname = resolve_name(name, package) if name.startswith('.') else name
+        if fullname in sys.modules:
+            return self._import_module(name, package)
+        self._enter(fullname, 'import')
+        try:
+            return self._import_module(name, package)
+        finally:
+            self._exit()
+
+    @staticmethod
+    def _import_label(name, fromlist):
+        """
+        Return the name of modules to be imported, or None if they have been imported.
+        """
+        module = sys.modules.get(name)
+        if module is None:
+            return name
+        if not fromlist:
+            return None
+        missing = [i for i in fromlist if i != '*' and not hasattr(module, i)]
+        if not missing:
+            return None
+        if len(missing) == 1:
+            return f'{name}.{missing[0]}'
+        return f'{name}.{{{",".join(missing)}}}'
+
+    def to_speedscope(self) -> dict:
+        frames = []
+        frame_index = {}
+        events = []
+        for t, node in self._events:
+            key = (node.kind, node.name)
+            if key not in frame_index:
+                frame_index[key] = len(frames)
+                frames.append({'name': node.name if node.kind == 'import' else f'[{node.name}]'})
+            at = (node.start if t == 'O' else node.end) - self.root.start
+            events.append({'type': t, 'frame': frame_index[key], 'at': at * 1000})
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [
+                {
+                    'type': 'evented',
+                    'name': 'guniflask startup',
+                    'unit': 'milliseconds',
+                    'startValue': 0,
+                    'endValue': self.root.duration * 1000,
+                    'events': events,
+                }
+            ],
+            'name': 'guniflask startup',
+            'exporter': 'guniflask-cli',
+        }
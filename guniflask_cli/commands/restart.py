@@ -1,9 +1,14 @@
 import os
 import signal
+import subprocess
+import sys
+import time
 
 import click
 
+from guniflask_cli.config_state import config_state, diff_config_state, read_config_state
 from guniflask_cli.gunicorn import GunicornApplication
+from guniflask_cli.instances import child_pids, instance_pidfiles
 from guniflask_cli.utils import pid_exists, read_pid
 
 
@@ -14,15 +19,22 @@ def cli_restart():
 
 @cli_restart.command('restart')
 @click.option('-p', '--active-profiles', metavar='PROFILES', help='Active profiles (comma-separated).')
-def main(active_profiles):
+@click.option('--force', default=False, is_flag=True, help='Reload even if nothing has changed.')
+@click.option('--check-timeout', default=120, show_default=True,
+              help='Seconds to wait for the app to be created by the check before reload.')
+def main(active_profiles, force, check_timeout):
     """
     Restart application.
     """
-    Restart().run(active_profiles)
+    r = Restart()
+    r.run(active_profiles, force=force, check_timeout=check_timeout)
+    sys.exit(r.exitcode)
 
 
 class Restart:
-    def run(self, active_profiles):
+    exitcode = 0
+
+    def run(self, active_profiles, force=False, check_timeout=120):
         not_found = True
         if active_profiles:
             profile_list = [active_profiles]
@@ -33,17 +45,100 @@ class Restart:
             app = GunicornApplication()
             pidfile = app.options.get('pidfile')
             if pidfile:
-                pid = read_pid(pidfile)
-                if self.send_hup(pid):
-                    not_found = False
+                masters = []
+                for f in instance_pidfiles(pidfile):
+                    pid = read_pid(f)
+                    if pid is not None and pid_exists(pid):
+                        masters.append((pid, f))
+                if not masters:
+                    continue
+                not_found = False
+                # the masters would reload into a broken config and workers would crash-loop
+                if not self.check_app(check_timeout):
+                    self.exitcode = 1
                     break
+                state = config_state(p, app.profile_options)
+                masters = [(pid, f) for pid, f in masters if self.is_changed(pid, f, state, force)]
+                if len(masters) > 1:
+                    # restart instances one at a time so that the others keep serving
+                    timeout = app.cfg.graceful_timeout + app.cfg.timeout
+                    for pid, _ in masters:
+                        old_workers = set(child_pids(pid))
+                        self.send_hup(pid)
+                        self.wait_workers_replaced(pid, old_workers, timeout)
+                elif masters:
+                    self.send_hup(masters[0][0])
+                break
         if not_found:
             print('No application to restart')
             self.exitcode = 1
 
+    @staticmethod
+    def check_app(timeout):
+        print('Checking config and app before reload', flush=True)
+        try:
+            p = subprocess.run([sys.executable, '-c', 'from guniflask_cli.config_state import check_app; check_app()'],
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print(f'Error: app is not created after {timeout} seconds, the masters are not reloaded',
+                  file=sys.stderr)
+            return False
+        output = p.stdout.decode('utf-8', errors='replace').rstrip()
+        if p.returncode != 0:
+            lines = output.splitlines()
+            print('\n'.join(lines[-30:]), file=sys.stderr)
+            print(f'Error: check failed with exit code {p.returncode}, the masters are not reloaded',
+                  file=sys.stderr)
+            return False
+        if output:
+            print(output)
+        return True
+
+    @staticmethod
+    def is_changed(pid, pidfile, state, force):
+        old_state = read_config_state(pidfile)
+        if old_state is None:
+            # started by a previous version, or the state is not written
+            return True
+        changes = diff_config_state(old_state, state)
+        if not changes and not force:
+            print(f'Nothing has changed since master (pid: {pid}) loaded the config, skip reload '
+                  f'(use --force to reload anyway)')
+            return False
+        for name, c in changes.items():
+            if name == 'app':
+                print(f'app: {len(c)} files changed')
+                continue
+            print(f'{name}:')
+            for k, (a, b) in c.items():
+                if name == 'sources':
+                    print(f'  {"+" if a is ... else "-" if b is ... else "~"} {k}')
+                elif a is ...:
+                    print(f'  + {k}: {b!r}')
+                elif b is ...:
+                    print(f'  - {k}: {a!r}')
+                else:
+                    print(f'  ~ {k}: {a!r} -> {b!r}')
+        return True
+
     def send_hup(self, pid):
         if pid is None or not pid_exists(pid):
             return False
         print(f'Sending HUB signal to master (pid: {pid})')
         os.kill(pid, signal.SIGHUP)
         return True
+
+    @staticmethod
+    def wait_workers_replaced(pid, old_workers, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not pid_exists(pid):
+                print(f'Master (pid: {pid}) exited during restart')
+                return False
+            workers = set(child_pids(pid))
+            if workers and not workers & old_workers:
+                print(f'Workers of master (pid: {pid}) are replaced')
+                return True
+            time.sleep(0.5)
+        print(f'Workers of master (pid: {pid}) are not replaced after {timeout} seconds')
+        return False
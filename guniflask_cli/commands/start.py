@@ -1,8 +1,16 @@
 import os
+import signal
+import sys
+import time
+import traceback
 
 import click
 
 from guniflask_cli.gunicorn import GunicornApplication
+from guniflask_cli.instances import available_cpus, cpu_sets, instance_path
+from guniflask_cli.readiness import can_connect, health_status, local_binds, read_ready_events, ready_file, \
+    tail_file
+from guniflask_cli.utils import pid_exists, read_pid
 
 
 @click.group()
@@ -13,15 +21,29 @@ def cli_start():
 @cli_start.command('start')
 @click.option('--daemon-off', default=False, is_flag=True, help='Turn off daemon mode.')
 @click.option('-p', '--active-profiles', metavar='PROFILES', help='Active profiles (comma-separated).')
-def main(daemon_off, active_profiles):
+@click.option('-n', '--instances', default=1, show_default=True,
+              help='Number of masters sharing the bind address with SO_REUSEPORT.')
+@click.option('--cpu-affinity', default=False, is_flag=True,
+              help='Pin each instance to its own subset of CPUs within a NUMA node.')
+@click.option('--wait-ready', default=False, is_flag=True,
+              help='Wait until the master and all workers have booted and the bind accepts connections.')
+@click.option('--timeout', default=60.0, show_default=True, help='Seconds to wait for the application to be ready.')
+@click.option('--health-path', metavar='PATH', help='Path which must return 2xx when ready, e.g. /health.')
+def main(daemon_off, active_profiles, instances, cpu_affinity, wait_ready, timeout, health_path):
     """
     Start application.
     """
-    Start().run(daemon_off, active_profiles)
+    start = Start()
+    start.run(daemon_off, active_profiles, instances=instances, cpu_affinity=cpu_affinity,
+              wait_ready=wait_ready, timeout=timeout, health_path=health_path)
+    sys.exit(start.exitcode)
 
 
 class Start:
-    def run(self, daemon_off, active_profiles):
+    exitcode = 0
+
+    def run(self, daemon_off, active_profiles, instances=1, cpu_affinity=False, wait_ready=False, timeout=60.0,
+            health_path=None):
         if active_profiles:
             os.environ['GUNIFLASK_ACTIVE_PROFILES'] = active_profiles
         os.environ.setdefault('GUNIFLASK_ACTIVE_PROFILES', 'prod')
@@ -29,6 +51,199 @@ class Start:
         opt = {}
         if daemon_off:
             opt['daemon'] = False
+        if wait_ready:
+            self.start_and_wait(opt, instances, cpu_affinity, timeout, health_path)
+            return
+        if instances > 1:
+            self.start_instances(opt, instances, cpu_affinity)
+            return
         app = GunicornApplication(**opt)
 
         app.run()
+
+    def start_and_wait(self, opt, instances, cpu_affinity, timeout, health_path):
+        """
+        Start daemonized masters, then wait for them to be ready and report the time taken.
+        """
+        start_time = time.time()
+        app = GunicornApplication(**opt)
+        cfg = app.cfg
+        if not cfg.daemon or not cfg.pidfile:
+            print('Error: --wait-ready requires daemon mode with a pid file', file=sys.stderr)
+            self.exitcode = 1
+            return
+        if instances > 1:
+            masters = [(instance_path(cfg.pidfile, i), instance_path(cfg.errorlog, i)) for i in range(instances)]
+        else:
+            masters = [(cfg.pidfile, cfg.errorlog)]
+        for pidfile, _ in masters:
+            # events of the last start
+            if os.path.exists(ready_file(pidfile)):
+                os.remove(ready_file(pidfile))
+        if instances > 1:
+            self.start_instances(opt, instances, cpu_affinity)
+        else:
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    # exits once gunicorn is daemonized
+                    app.run()
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else 1
+                except BaseException:
+                    traceback.print_exc()
+                    code = 1
+                finally:
+                    os._exit(code)
+            _, status = os.waitpid(pid, 0)
+            if exit_status(status) != 0:
+                self.exitcode = 1
+        if self.exitcode != 0:
+            print('Error: failed to start application', file=sys.stderr)
+            return
+        deadline = start_time + timeout
+        binds = local_binds(cfg.bind)
+        for pidfile, errorlog in masters:
+            if not self.wait_master_ready(pidfile, errorlog, binds, health_path, start_time, deadline):
+                self.exitcode = 1
+                return
+
+    def wait_master_ready(self, pidfile, errorlog, binds, health_path, start_time, deadline):
+        master = None
+        ready = None
+        workers = {}
+        connected = False
+        while True:
+            events = read_ready_events(pidfile)
+            for e in events:
+                if e['event'] == 'starting':
+                    master = e
+                elif e['event'] == 'master_ready':
+                    ready = e
+                elif e['event'] == 'worker_ready' and master is not None and e.get('ppid') == master['pid']:
+                    workers.setdefault(e['pid'], e)
+            if master is not None and not pid_exists(master['pid']):
+                return self.fail(f"Master (pid: {master['pid']}) exited before it was ready", errorlog)
+            if ready is not None and len(workers) >= ready['workers'] and read_pid(pidfile) == master['pid']:
+                if not connected:
+                    connected = all(can_connect(b) for b in binds)
+                    connected_time = time.time()
+                if connected:
+                    status = health_status(binds[0], health_path) if health_path and binds else None
+                    if not health_path or not binds or (status is not None and 200 <= status < 300):
+                        break
+            if time.time() >= deadline:
+                if master is None:
+                    reason = 'master did not start'
+                elif ready is None or len(workers) < ready['workers']:
+                    reason = f"{len(workers)} of {ready['workers'] if ready else '?'} workers have booted"
+                elif not connected:
+                    reason = 'the bind does not accept connections'
+                else:
+                    reason = f'GET {health_path} returned {status}'
+                return self.fail(f'Application is not ready after {deadline - start_time:.0f} seconds: {reason}',
+                                 errorlog)
+            time.sleep(0.1)
+
+        now = time.time()
+        print(f"Master (pid: {master['pid']}) started in {master['time'] - start_time:.2f}s, "
+              f"ready in {ready['time'] - start_time:.2f}s")
+        for pid, e in sorted(workers.items(), key=lambda i: i[1]['time']):
+            print(f"  Worker (pid: {pid}) booted in {e['time'] - start_time:.2f}s")
+        if binds:
+            print(f'Accepting connections in {connected_time - start_time:.2f}s')
+        if health_path and binds:
+            print(f'GET {health_path} returned {status} in {now - start_time:.2f}s')
+        return True
+
+    @staticmethod
+    def fail(message, errorlog):
+        print(f'Error: {message}', file=sys.stderr)
+        if errorlog and errorlog != '-':
+            lines = tail_file(errorlog)
+            if lines:
+                print(f'Last lines of {errorlog}:', file=sys.stderr)
+                for line in lines:
+                    print(f'  {line}', file=sys.stderr)
+        return False
+
+    def start_instances(self, opt, instances, cpu_affinity):
+        """
+        Fork a master for each instance, daemonized masters are started one after another.
+        """
+        daemon = GunicornApplication(**opt).cfg.daemon
+        cpu_share = max(len(available_cpus()) // instances, 1)
+        cpus_list = cpu_sets(instances) if cpu_affinity else [None] * instances
+        pids = []
+        for i, cpus in enumerate(cpus_list):
+            pid = os.fork()
+            if pid == 0:
+                self.run_instance(i, cpus, cpu_share, opt)
+            if daemon:
+                _, status = os.waitpid(pid, 0)
+                if exit_status(status) != 0:
+                    print(f'Failed to start instance {i}', file=sys.stderr, flush=True)
+                    self.exitcode = 1
+                    return
+            else:
+                pids.append(pid)
+        if pids:
+            self.wait_instances(pids)
+
+    @staticmethod
+    def run_instance(i, cpus, cpu_share, opt):
+        code = 0
+        try:
+            os.environ['GUNIFLASK_INSTANCE'] = str(i)
+            os.environ['GUNIFLASK_CPU_COUNT'] = str(len(cpus) if cpus else cpu_share)
+            if cpus:
+                os.sched_setaffinity(0, cpus)
+            app = GunicornApplication(**opt)
+            print(f'Starting instance {i}' + (f' on CPUs {format_cpus(cpus)}' if cpus else ''), flush=True)
+            app.run()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def wait_instances(self, pids):
+        def _forward(signum, frame):
+            for pid in pids:
+                try:
+                    os.kill(pid, signum)
+                except OSError:
+                    pass
+
+        for s in [signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGQUIT]:
+            signal.signal(s, _forward)
+        remaining = set(pids)
+        while remaining:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            remaining.discard(pid)
+            if exit_status(status) != 0:
+                self.exitcode = 1
+
+
+def exit_status(status):
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return 1
+
+
+def format_cpus(cpus):
+    ranges = []
+    for i in cpus:
+        if ranges and ranges[-1][1] == i - 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return ','.join(str(a) if a == b else f'{a}-{b}' for a, b in ranges)
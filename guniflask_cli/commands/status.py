@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import click
+
+from guniflask_cli.autoscale import autoscale_metrics_file
+from guniflask_cli.gunicorn import GunicornApplication
+from guniflask_cli.instances import child_pids, instance_pidfiles
+from guniflask_cli.utils import pid_exists, read_pid
+
+
+@click.group()
+def cli_status():
+    pass
+
+
+@cli_status.command('status')
+@click.option('-p', '--active-profiles', metavar='PROFILES', help='Active profiles (comma-separated).')
+def main(active_profiles):
+    """
+    Show status of application.
+    """
+    s = Status()
+    s.run(active_profiles)
+    sys.exit(s.exitcode)
+
+
+class Status:
+    exitcode = 0
+
+    def run(self, active_profiles):
+        not_found = True
+        if active_profiles:
+            profile_list = [active_profiles]
+        else:
+            profile_list = ['prod', 'dev']
+        for p in profile_list:
+            os.environ['GUNIFLASK_ACTIVE_PROFILES'] = p
+            app = GunicornApplication()
+            masters = []
+            for pidfile in instance_pidfiles(app.options.get('pidfile')):
+                pid = read_pid(pidfile)
+                if pid is not None and pid_exists(pid):
+                    masters.append((pid, pidfile))
+            if masters:
+                not_found = False
+                print(f"Profiles '{p}'")
+                for pid, pidfile in masters:
+                    self.print_master(pid, pidfile)
+                break
+        if not_found:
+            print('Application is not running')
+            self.exitcode = 1
+
+    def print_master(self, pid, pidfile):
+        workers = child_pids(pid)
+        print(f'Master (pid: {pid}) with {len(workers)} workers: {" ".join(str(i) for i in sorted(workers))}')
+        metrics = self.read_metrics(pidfile)
+        if metrics is None or metrics.get('pid') != pid:
+            return
+        age = time.time() - metrics['time']
+        print(f"  autoscaler: {metrics['workers']} workers (min {metrics['min_workers']}, "
+              f"max {metrics['max_workers']}), {metrics['inflight']} in-flight, "
+              f"utilization {metrics['utilization']:.2f} (average {metrics['average_utilization']:.2f}), "
+              f"backlog {metrics['backlog']}, {age:.0f}s ago")
+        for d in metrics.get('decisions', [])[-5:]:
+            t = datetime.fromtimestamp(d['time']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"  {t} scaled to {d['workers']} workers: {d['reason']}")
+
+    @staticmethod
+    def read_metrics(pidfile):
+        try:
+            with open(autoscale_metrics_file(pidfile), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
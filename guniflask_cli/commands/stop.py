@@ -5,6 +5,7 @@ import time
 import click
 
 from guniflask_cli.gunicorn import GunicornApplication
+from guniflask_cli.instances import instance_pidfiles
 from guniflask_cli.utils import pid_exists, read_pid
 
 
@@ -32,27 +33,33 @@ class Stop:
         for p in profile_list:
             os.environ['GUNIFLASK_ACTIVE_PROFILES'] = p
             app = GunicornApplication()
-            pidfile = app.options.get('pidfile')
-            pid = read_pid(pidfile)
-            if self.kill_pid(pid):
+            pids = []
+            for pidfile in instance_pidfiles(app.options.get('pidfile')):
+                pid = read_pid(pidfile)
+                if pid is not None and pid_exists(pid):
+                    pids.append(pid)
+            if self.kill_pids(pids):
                 not_found = False
                 break
         if not_found:
             self.exitcode = 1
             print('No application to stop')
 
-    def kill_pid(self, pid):
-        if pid is None or not pid_exists(pid):
+    def kill_pids(self, pids):
+        pids = [pid for pid in pids if pid_exists(pid)]
+        if not pids:
             return False
-        print(f'kill {pid}')
-        os.kill(pid, signal.SIGTERM)
+        for pid in pids:
+            print(f'kill {pid}')
+            os.kill(pid, signal.SIGTERM)
         time.sleep(3)
-        try:
-            os.kill(pid, 0)
-        except OSError:
-            pass
-        else:
-            print('Application did not stop gracefully after 3 seconds')
-            print(f'kill -9 {pid}')
-            os.kill(pid, signal.SIGKILL)
+        for pid in pids:
+            try:
+                os.kill(pid, 0)
+            except OSError:
+                pass
+            else:
+                print(f'Application (pid: {pid}) did not stop gracefully after 3 seconds')
+                print(f'kill -9 {pid}')
+                os.kill(pid, signal.SIGKILL)
         return True
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+from importlib import metadata
+from os.path import join, isdir, relpath, splitext
+
+from .errors import ConfigError
+from .frozen_config import FROZEN_CONFIG_FILE, diff_dict, freeze_value, source_digests
+
+CONFIG_STATE_VERSION = 2
+
+
+def config_state_file(pidfile: str) -> str:
+    """
+    The state of the config loaded by a master is kept next to its pid file, e.g. ``foo.pid`` -> ``foo.state.json``.
+    """
+    return f'{splitext(pidfile)[0]}.state.json'
+
+
+def app_digests(home: str, app_name: str) -> dict:
+    """
+    sha256 of the files of the app, templates and data files are loaded by the app as well as its modules.
+    """
+    digests = {}
+    app_dir = join(home, app_name)
+    if not isdir(app_dir):
+        return digests
+    for root, dirs, files in os.walk(app_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__' and not d.startswith('.'))
+        for name in sorted(files):
+            if name.endswith(('.pyc', '.pyo')):
+                continue
+            path = join(root, name)
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(chunk)
+            digests[relpath(path, home)] = h.hexdigest()
+    return digests
+
+
+def installed_distributions() -> dict:
+    """
+    Versions of the installed distributions, upgrading a dependency changes the app without changing its files.
+    """
+    dists = {}
+    for dist in metadata.distributions():
+        name = dist.metadata['Name']
+        if name:
+            dists[name.lower()] = dist.version
+    return dists
+
+
+def state_value(key: str, value):
+    try:
+        return freeze_value(key, value)
+    except ConfigError:
+        if callable(value):
+            # a hook defined in a conf module, compared by name since its address differs in each process
+            return f"{getattr(value, '__module__', None)}.{getattr(value, '__qualname__', repr(value))}"
+        return repr(value)
+
+
+def config_state(active_profiles: str, gunicorn_options: dict) -> dict:
+    """
+    What a reload depends on: the conf files, the files of the app, the installed distributions
+    and the resolved gunicorn settings.
+    """
+    from guniflask.config import app_name_from_env
+
+    home = os.environ['GUNIFLASK_HOME']
+    conf_dir = os.environ['GUNIFLASK_CONF_DIR']
+    sources = source_digests(conf_dir)
+    frozen = join(conf_dir, FROZEN_CONFIG_FILE)
+    if os.path.isfile(frozen):
+        with open(frozen, 'rb') as f:
+            sources[FROZEN_CONFIG_FILE] = hashlib.sha256(f.read()).hexdigest()
+    return {
+        'version': CONFIG_STATE_VERSION,
+        'active_profiles': active_profiles or None,
+        'sources': sources,
+        'app': app_digests(home, app_name_from_env()),
+        'packages': installed_distributions(),
+        'gunicorn': {k: state_value(k, v) for k, v in gunicorn_options.items()},
+    }
+
+
+def write_config_state(server):
+    """
+    Record the state of the config loaded by the master on starting and on reload.
+    """
+    pidfile = server.cfg.pidfile
+    if not pidfile:
+        return
+    try:
+        state = config_state(os.environ.get('GUNIFLASK_ACTIVE_PROFILES'), server.app.profile_options)
+        fname = config_state_file(pidfile)
+        tmp = f'{fname}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp, fname)
+    except Exception as e:
+        # restart will reload anyway without the state
+        server.log.warning('Failed to write the config state: %s', e)
+
+
+def read_config_state(pidfile: str):
+    try:
+        with open(config_state_file(pidfile), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != CONFIG_STATE_VERSION:
+        return None
+    return state
+
+
+def diff_config_state(old: dict, new: dict) -> dict:
+    """
+    Changes of each part of the state, parts without changes are omitted.
+    """
+    changes = {}
+    for name in ['active_profiles', 'sources', 'app', 'packages', 'gunicorn']:
+        if name == 'active_profiles':
+            c = diff_dict({name: old.get(name)}, {name: new.get(name)})
+        else:
+            c = diff_dict(old.get(name, {}), new.get(name, {}))
+        if c:
+            changes[name] = c
+    return changes
+
+
+def check_app():
+    """
+    Load the config and create the app as a worker would, exit non-zero on any error.
+
+    It is run in a subprocess by restart, so that a broken app is found before the master reloads.
+    """
+    from .gevent_patch import patch_for_profiles
+
+    # patched as the master would be before loading the app
+    patch_for_profiles(os.environ.get('GUNIFLASK_ACTIVE_PROFILES'))
+
+    from guniflask.app import create_app
+
+    from .frozen_config import install_frozen_settings
+    from .gunicorn import GunicornApplication
+    from .module_index import install_module_index
+    from .workers import validate_worker_options
+
+    logging.basicConfig(level=logging.WARNING)
+    app = GunicornApplication(daemon=False)
+    if app.frozen_config_error is not None:
+        logging.getLogger(__name__).warning('The live config will be reloaded: %s', app.frozen_config_error)
+    try:
+        validate_worker_options(app.options)
+    except ConfigError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+    install_module_index(app.module_index())
+    if app.frozen_config is not None:
+        install_frozen_settings(app.frozen_config)
+    create_app()
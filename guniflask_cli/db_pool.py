@@ -0,0 +1,65 @@
+import math
+import os
+
+from flask import Flask
+
+# the default pool of SQLAlchemy allows 5 + 10 overflow connections
+DEFAULT_POOL_LIMIT = 15
+
+DEFAULT_POOL_RECYCLE = 1800
+
+
+def pool_options(workers: int, concurrency: int, budget: int = None, pool_recycle: int = DEFAULT_POOL_RECYCLE) -> dict:
+    """
+    Size the connection pool of each worker so that all workers together stay within the budget.
+
+    A worker never needs more connections than the requests it serves at the same time.
+    Half of them are kept in the pool and the rest are opened as overflow on bursts.
+    """
+    workers = max(workers, 1)
+    limit = max(concurrency, 1)
+    if budget:
+        limit = min(limit, max(budget // workers, 1))
+    else:
+        limit = min(limit, DEFAULT_POOL_LIMIT)
+    pool_size = math.ceil(limit / 2)
+    return {
+        'pool_size': pool_size,
+        'max_overflow': limit - pool_size,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': True,
+    }
+
+
+def configure_db_pool(app: Flask):
+    """
+    Set default ``SQLALCHEMY_ENGINE_OPTIONS`` according to the workers of gunicorn and ``DB_CONNECTION_BUDGET``.
+
+    It should be invoked before initializing Flask-SQLAlchemy. Options configured explicitly are kept.
+    """
+    workers = os.environ.get('GUNIFLASK_WORKERS')
+    if not workers:
+        # not served by gunicorn
+        return None
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if uri.startswith('sqlite'):
+        return None
+    workers = int(workers)
+    concurrency = int(os.environ.get('GUNIFLASK_WORKER_CONCURRENCY') or 1)
+    budget = app.config.get('DB_CONNECTION_BUDGET')
+    budget = int(budget) if budget else None
+    pool_recycle = int(app.config.get('DB_POOL_RECYCLE') or DEFAULT_POOL_RECYCLE)
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    for k, v in pool_options(workers, concurrency, budget=budget, pool_recycle=pool_recycle).items():
+        options.setdefault(k, v)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    per_worker = options['pool_size'] + options['max_overflow']
+    app.logger.info('DB pool of each worker: pool_size=%s, max_overflow=%s, pool_recycle=%s, pool_pre_ping=%s '
+                    '(%s workers, %s concurrent requests per worker, up to %s connections in total)',
+                    options['pool_size'], options['max_overflow'], options['pool_recycle'],
+                    options['pool_pre_ping'], workers, concurrency, per_worker * workers)
+    if budget and per_worker * workers > budget:
+        app.logger.warning('DB connections of %s workers exceed DB_CONNECTION_BUDGET %s', workers, budget)
+    return options
@@ -18,3 +18,9 @@ class TemplateError(Exception):
     """
     Template error
     """
+
+
+class ConfigError(Exception):
+    """
+    Config error
+    """
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+from importlib import import_module
+from os.path import join, isfile
+
+from gunicorn.config import Config, KNOWN_SETTINGS
+
+from .errors import ConfigError
+
+FROZEN_CONFIG_VERSION = 1
+
+FROZEN_CONFIG_FILE = '.frozen.json'
+
+# keyword arguments passed to conf modules of the app by guniflask, they follow the current environment
+ENV_SETTINGS = ('home', 'debug', 'host', 'port', 'active_profiles', 'app_name')
+
+# a callable in the settings of the app is frozen as {CALLABLE_KEY: <dotted path>}
+CALLABLE_KEY = '$callable'
+
+
+def frozen_config_file(conf_dir: str) -> str:
+    return join(conf_dir, FROZEN_CONFIG_FILE)
+
+
+def live_gunicorn_options(conf_dir: str, active_profiles: str = None) -> dict:
+    """
+    Gunicorn settings resolved from the profiles of ``gunicorn`` in the conf dir.
+    """
+    from guniflask.config import load_profile_config
+
+    gc = load_profile_config(conf_dir, 'gunicorn', active_profiles=active_profiles)
+    names = set([i.name for i in KNOWN_SETTINGS])
+    return {k: v for k, v in gc.items() if k in names}
+
+
+def live_app_settings(app_name: str) -> dict:
+    """
+    Settings of the app resolved from its profiles, which depend on the environment set for gunicorn.
+    """
+    from guniflask.config.load_utils import load_app_settings
+
+    return load_app_settings(app_name)
+
+
+def source_digests(conf_dir: str) -> dict:
+    """
+    sha256 of the files in the conf dir which the snapshot is resolved from.
+    """
+    digests = {}
+    for name in sorted(os.listdir(conf_dir)):
+        path = join(conf_dir, name)
+        if name == FROZEN_CONFIG_FILE or name.startswith('.') or not isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            digests[name] = hashlib.sha256(f.read()).hexdigest()
+    return digests
+
+
+def freeze_value(key: str, value, tag_callables: bool = False):
+    """
+    Make a value serializable as JSON, callables are referenced by their dotted paths.
+
+    Gunicorn resolves dotted paths of hooks by itself, callables in the settings of the app are tagged
+    if ``tag_callables`` so that they are imported back by ``thaw_value``.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [freeze_value(key, i, tag_callables) for i in value]
+    if isinstance(value, dict):
+        return {str(k): freeze_value(f'{key}.{k}', v, tag_callables) for k, v in value.items()}
+    if callable(value):
+        module = getattr(value, '__module__', None)
+        qualname = getattr(value, '__qualname__', '')
+        # gunicorn imports the module of a hook path and takes a single attribute of it
+        names = qualname.split('.') if tag_callables else [qualname]
+        if module and module != '__config__' and all(i.isidentifier() for i in names):
+            path = f'{module}.{qualname}'
+            return {CALLABLE_KEY: path} if tag_callables else path
+        raise ConfigError(f"Cannot freeze '{key}': {value!r} is not a module-level callable of the app, "
+                          f'please move it into a module of the app and reference it by dotted path')
+    raise ConfigError(f"Cannot freeze '{key}': {type(value).__name__} is not serializable")
+
+
+def thaw_value(value):
+    """
+    A frozen setting of the app, with tagged callables imported back.
+    """
+    if isinstance(value, list):
+        return [thaw_value(i) for i in value]
+    if isinstance(value, dict):
+        if len(value) == 1 and CALLABLE_KEY in value:
+            return import_callable(value[CALLABLE_KEY])
+        return {k: thaw_value(v) for k, v in value.items()}
+    return value
+
+
+def import_callable(path: str):
+    parts = path.split('.')
+    for i in range(len(parts) - 1, 0, -1):
+        try:
+            obj = import_module('.'.join(parts[:i]))
+        except ImportError:
+            continue
+        try:
+            for name in parts[i:]:
+                obj = getattr(obj, name)
+        except AttributeError:
+            break
+        return obj
+    raise ConfigError(f'Cannot import {path} of frozen config')
+
+
+def freeze_config(conf_dir: str, app_name: str, active_profiles: str, gunicorn_options: dict,
+                  app_settings: dict) -> dict:
+    gunicorn_options = {k: freeze_value(k, v) for k, v in gunicorn_options.items()}
+    app_settings = {k: freeze_value(k, v, tag_callables=True) for k, v in app_settings.items()
+                    if k not in ENV_SETTINGS}
+    validate_gunicorn_options(gunicorn_options)
+    return {
+        'version': FROZEN_CONFIG_VERSION,
+        'app_name': app_name,
+        'active_profiles': active_profiles,
+        'sources': source_digests(conf_dir),
+        'gunicorn': gunicorn_options,
+        'settings': app_settings,
+    }
+
+
+def validate_gunicorn_options(options: dict):
+    cfg = Config()
+    for k, v in options.items():
+        try:
+            cfg.set(k, v)
+        except (ValueError, TypeError) as e:
+            raise ConfigError(f"Invalid gunicorn setting '{k}': {e}")
+
+
+def write_frozen_config(conf_dir: str, snapshot: dict) -> str:
+    fname = frozen_config_file(conf_dir)
+    tmp = f'{fname}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, fname)
+    return fname
+
+
+def read_frozen_config(conf_dir: str):
+    try:
+        with open(frozen_config_file(conf_dir), 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        raise ConfigError(f'Cannot read frozen config: {e}')
+    if snapshot.get('version') != FROZEN_CONFIG_VERSION:
+        raise ConfigError(f"Frozen config of version {snapshot.get('version')} is not supported, "
+                          f'please freeze the config again')
+    return snapshot
+
+
+def load_frozen_config(conf_dir: str, active_profiles: str = None):
+    """
+    The snapshot to boot from, or None if the config is not frozen for the active profiles.
+
+    ConfigError is raised if the conf files have changed since the config was frozen,
+    so that a stale snapshot is never booted from silently.
+    """
+    snapshot = read_frozen_config(conf_dir)
+    if snapshot is None or (snapshot.get('active_profiles') or None) != (active_profiles or None):
+        return None
+    changed = diff_dict(snapshot.get('sources', {}), source_digests(conf_dir))
+    if changed:
+        raise ConfigError(f'Conf files {list(changed)} have changed since the config was frozen, '
+                          f'please freeze the config again or remove {frozen_config_file(conf_dir)}')
+    return snapshot
+
+
+def install_frozen_settings(snapshot: dict):
+    """
+    Make guniflask take the settings of the app from the snapshot instead of executing conf modules.
+    """
+    from guniflask.app import initializer
+    from guniflask.config.load_utils import get_settings_from_env
+
+    def load_app_settings(app_name):
+        settings = thaw_value(snapshot['settings'])
+        settings.update(get_settings_from_env())
+        settings['app_name'] = app_name
+        return settings
+
+    initializer.load_app_settings = load_app_settings
+
+
+def diff_dict(old: dict, new: dict) -> dict:
+    """
+    Changed keys mapping to ``(old, new)``, a missing value is represented by ``...``.
+    """
+    changes = {}
+    for k in sorted(set(old) | set(new), key=str):
+        a = old.get(k, ...)
+        b = new.get(k, ...)
+        if a != b:
+            changes[k] = (a, b)
+    return changes
+
+
+def flatten_dict(d: dict, prefix: str = '') -> dict:
+    flat = {}
+    for k, v in d.items():
+        if isinstance(v, dict) and v:
+            flat.update(flatten_dict(v, f'{prefix}{k}.'))
+        else:
+            flat[f'{prefix}{k}'] = v
+    return flat
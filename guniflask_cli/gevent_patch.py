@@ -0,0 +1,154 @@
+import ast
+import json
+import os
+import sys
+from importlib import import_module
+from os.path import join, isfile
+
+SERVING_COMMANDS = {'start': 'prod', 'debug': 'dev', 'bench': 'prod'}
+
+BLOCKING_DB_DRIVERS = {
+    'MySQLdb': 'mysqlclient, use PyMySQL instead',
+    'pymssql': 'pymssql',
+    'pyodbc': 'pyodbc',
+    'cx_Oracle': 'cx_Oracle',
+    'ibm_db': 'ibm_db',
+}
+
+
+def early_patch(argv=None):
+    """
+    Patch all with gevent if the command is going to serve the app with gevent workers.
+
+    It is invoked before importing the app or any of its dependencies,
+    so only the standard library is used until it decides to patch.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in SERVING_COMMANDS:
+        return False
+    active_profiles = os.environ.get('GUNIFLASK_ACTIVE_PROFILES') or SERVING_COMMANDS[argv[0]]
+    for i, arg in enumerate(argv):
+        if arg in ('-p', '--active-profiles') and i + 1 < len(argv):
+            active_profiles = argv[i + 1]
+        elif arg.startswith('--active-profiles='):
+            active_profiles = arg.split('=', 1)[1]
+    return patch_for_profiles(active_profiles)
+
+
+def patch_for_profiles(active_profiles) -> bool:
+    """
+    Patch all with gevent if the gunicorn config of the profiles uses gevent workers.
+    """
+    home_dir = os.environ.get('GUNIFLASK_HOME') or os.getcwd()
+    conf_dir = os.environ.get('GUNIFLASK_CONF_DIR') or join(home_dir, 'conf')
+    try:
+        config = peek_gunicorn_config(conf_dir, active_profiles)
+    except Exception:
+        # e.g. a malformed YAML file or PyYAML not installed,
+        # leave the errors to be reported when loading config
+        return False
+    worker_class = config.get('worker_class', 'gevent')
+    if not isinstance(worker_class, str) or not worker_class.startswith('gevent') \
+            or not config.get('gevent_early_patch', True):
+        return False
+    patch_all()
+    return True
+
+
+def patch_all():
+    from gevent import monkey
+
+    monkey.patch_all()
+    install_psycopg2_wait_callback()
+
+
+def original(module: str, name: str):
+    """
+    The function of the standard library as it was before gevent monkey-patching.
+    """
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None:
+        return monkey.get_original(module, name)
+    return getattr(import_module(module), name)
+
+
+def start_os_thread(func, *args):
+    """
+    Start a real thread even if threading is monkey-patched by gevent.
+
+    A greenlet would survive fork and keep running in every gevent worker.
+    """
+    return original('_thread', 'start_new_thread')(func, args)
+
+
+def install_psycopg2_wait_callback():
+    """
+    Make psycopg2 wait for the server cooperatively, otherwise each query blocks the whole worker.
+    """
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    extensions.set_wait_callback(gevent_wait_callback)
+    return True
+
+
+def gevent_wait_callback(conn, timeout=None):
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import extensions, OperationalError
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f'Bad result from poll: {state}')
+
+
+def find_blocking_db_drivers():
+    drivers = [desc for name, desc in BLOCKING_DB_DRIVERS.items() if name in sys.modules]
+    psycopg2_extensions = sys.modules.get('psycopg2.extensions')
+    if psycopg2_extensions is not None and psycopg2_extensions.get_wait_callback() is None:
+        drivers.append('psycopg2 without a cooperative wait callback')
+    return drivers
+
+
+def peek_gunicorn_config(conf_dir, active_profiles=None) -> dict:
+    """
+    Read literal settings from gunicorn profile config without executing the config modules.
+    """
+    names = ['gunicorn']
+    if active_profiles:
+        names += [f'gunicorn_{p}' for p in reversed(active_profiles.split(',')) if p]
+    config = {}
+    for name in names:
+        for ext in ['.py', '.yaml', '.yml', '.json']:
+            fname = join(conf_dir, name + ext)
+            if isfile(fname):
+                config.update(_peek_config_file(fname))
+                break
+    return config
+
+
+def _peek_config_file(fname) -> dict:
+    with open(fname, 'r', encoding='utf-8') as f:
+        raw = f.read()
+    if fname.endswith('.json'):
+        return json.loads(raw)
+    if fname.endswith('.yaml') or fname.endswith('.yml'):
+        import yaml
+
+        return yaml.safe_load(raw) or {}
+
+    config = {}
+    for node in ast.parse(raw, filename=fname).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try:
+                config[node.targets[0].id] = ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError):
+                pass
+    return config
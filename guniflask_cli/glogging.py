@@ -0,0 +1,108 @@
+import json
+import os
+import traceback
+import zlib
+from datetime import datetime
+from fnmatch import fnmatchcase
+
+from gunicorn.glogging import Logger as _Logger
+
+from . import settings  # register guniflask settings of gunicorn
+
+
+class Logger(_Logger):
+
+    def setup(self, cfg):
+        super().setup(cfg)
+        self.access_sampler = AccessLogSampler(
+            rates=cfg.access_log_sampling,
+            slow_threshold=cfg.access_log_slow_threshold,
+        )
+        header = cfg.access_log_request_id_header
+        self.request_id_key = 'HTTP_' + header.upper().replace('-', '_') if header else None
+
+    def access(self, resp, req, environ, request_time):
+        if not self.cfg.access_log_json:
+            return super().access(resp, req, environ, request_time)
+        if not self._access_log_enabled():
+            return
+
+        duration = (request_time.days * 86400 + request_time.seconds) * 1000000 + request_time.microseconds
+        status = resp.status
+        if isinstance(status, str):
+            status = status.split(None, 1)[0]
+        try:
+            status = int(status)
+        except (TypeError, ValueError):
+            status = 0
+        path = environ.get('PATH_INFO') or '/'
+        request_id = environ.get(self.request_id_key) if self.request_id_key else None
+
+        if not self.access_sampler.should_log(path, status, duration, request_id=request_id):
+            return
+
+        record = {
+            'time': datetime.now().astimezone().isoformat(timespec='milliseconds'),
+            'remote_addr': environ.get('REMOTE_ADDR'),
+            'method': environ.get('REQUEST_METHOD'),
+            'path': path,
+            'query': environ.get('QUERY_STRING') or None,
+            'protocol': environ.get('SERVER_PROTOCOL'),
+            'status': status,
+            'bytes': getattr(resp, 'sent', None),
+            'duration_us': duration,
+            'pid': os.getpid(),
+            'request_id': request_id,
+            'referer': environ.get('HTTP_REFERER'),
+            'user_agent': environ.get('HTTP_USER_AGENT'),
+        }
+        try:
+            self.access_log.info(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        except Exception:
+            self.error(traceback.format_exc())
+
+    def _access_log_enabled(self):
+        cfg = self.cfg
+        return bool(
+            cfg.accesslog or cfg.logconfig or cfg.logconfig_dict
+            or getattr(cfg, 'logconfig_json', None)
+            or (cfg.syslog and not cfg.disable_redirect_access_to_syslog)
+        )
+
+
+class AccessLogSampler:
+    """
+    Decide whether a request should be written to the access log.
+
+    Errors (5xx) and slow requests are always kept. Other requests are sampled by the rate of
+    the first route pattern matching their path: by a hash of the request id when there is one,
+    so that every service sees the same decision, otherwise by counting requests of the pattern.
+    """
+
+    def __init__(self, rates: dict = None, slow_threshold: float = None):
+        self.rates = list((rates or {}).items())
+        self.slow_threshold = None if slow_threshold is None else slow_threshold * 1000
+        self._counters = {}
+
+    def should_log(self, path: str, status: int, duration: int, request_id: str = None) -> bool:
+        if status >= 500:
+            return True
+        if self.slow_threshold is not None and duration >= self.slow_threshold:
+            return True
+
+        pattern, rate = self.match(path)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        if request_id:
+            return zlib.crc32(request_id.encode('utf-8')) % 10000 < rate * 10000
+        n = self._counters.get(pattern, 0)
+        self._counters[pattern] = n + 1
+        return int((n + 1) * rate) > int(n * rate)
+
+    def match(self, path: str):
+        for pattern, rate in self.rates:
+            if fnmatchcase(path, pattern):
+                return pattern, rate
+        return None, 1.0
@@ -1,18 +1,44 @@
 import logging
 import os
-from functools import partial
+import sys
+from collections import defaultdict
 from os.path import join, dirname, exists
 
 from gunicorn.app.base import Application
-from gunicorn.config import KNOWN_SETTINGS
+from gunicorn.config import KNOWN_SETTINGS, validate_callable
+from gunicorn.util import get_arity
 
+from . import settings  # register guniflask settings of gunicorn
+from .autoscale import assign_worker_slot, count_request_end, count_request_start, create_worker_counters, \
+    peak_workers, start_autoscaler
+from .binds import chmod_unix_sockets, default_host_port, parse_binds, systemd_listen_fds
+from .config_state import write_config_state
+from .errors import ConfigError
+from .frozen_config import install_frozen_settings, live_gunicorn_options, load_frozen_config
+from .gevent_patch import find_blocking_db_drivers
+from .instances import instance_id, instance_path
+from .logrotate import start_log_rotator
+from .module_index import ModuleIndex, SCAN_MARKERS, install_module_index
+from .profiler import ProfilerMiddleware
+from .query_inspector import QueryInspector
+from .readiness import mark_master_ready, mark_starting, mark_worker_ready
+from .shared_cache import configure_shared_cache, create_shared_cache, invalidate_shared_cache
+from .stackdump import dump_stacks_on_abort, install_stack_dump, start_stuck_worker_monitor
+from .tracing import install_tracing, trace_post_request, trace_pre_request
 from .utils import walk_files, redirect_app_logger, redirect_logger
+from .warmup import WARMUP_EXTENSION, warm_up
+from .watchdog import start_memory_watchdog
+from .workers import apply_worker_defaults, validate_worker_options, worker_concurrency, worker_type, wsgi_to_asgi
 
 
 class GunicornApplication(Application):
 
-    def __init__(self, **options):
+    def __init__(self, use_frozen_config=True, **options):
         self.options: dict = options
+        self.use_frozen_config = use_frozen_config
+        self._config_loaded = False
+        # options are made again from the given ones on reload
+        self._given_options = dict(options)
         super().__init__()
 
     def set_option(self, key, value):
@@ -22,25 +48,86 @@ class GunicornApplication(Application):
     def load_config(self):
         from guniflask.config import set_app_default_env
         set_app_default_env()
-        self.options = self._make_options(self.options)
+        self.options = self._make_options(self._given_options)
         for key, value in self.options.items():
             if key in self.cfg.settings and value is not None:
                 self.cfg.set(key.lower(), value)
         self._set_default_env()
+        if self.cfg.shared_cache_slots:
+            configure_shared_cache(self.cfg.shared_cache_slots, self.cfg.shared_cache_slot_size)
+        self._config_loaded = True
 
     def load(self):
         from guniflask.app import create_app
-        from guniflask.config import app_name_from_env
 
         gunicorn_logger = logging.getLogger('gunicorn.error')
-        app_name = app_name_from_env()
-        redirect_logger('guniflask', gunicorn_logger)
-        redirect_logger(app_name, gunicorn_logger)
-
+        self.prepare_app()
         app = create_app()
         redirect_app_logger(app, gunicorn_logger)
+        if self.cfg.query_inspector:
+            QueryInspector(app, burst_threshold=self.cfg.query_inspector_burst_threshold,
+                           slow_threshold=self.cfg.query_inspector_slow_threshold)
+        if self.cfg.preload_app:
+            # warm up in each worker rather than in the master
+            self.flask_app = app
+        else:
+            self.warm_up(app)
+        t = worker_type(self.cfg.worker_class_str)
+        if t == 'gevent':
+            for driver in find_blocking_db_drivers():
+                gunicorn_logger.warning('Blocking DB driver would stall the gevent worker: %s', driver)
+        if self.cfg.request_profiler:
+            app = ProfilerMiddleware(app, join(os.environ['GUNIFLASK_HOME'], '.log', 'profiles'),
+                                     mode=self.cfg.request_profiler,
+                                     route=self.cfg.request_profiler_route,
+                                     sample_rate=self.cfg.request_profiler_sample_rate,
+                                     max_bytes=self.cfg.request_profiler_max_bytes)
+            gunicorn_logger.info('Profiling requests of %s with %s', app.route, app.mode)
+        if t == 'asgi':
+            return wsgi_to_asgi(app)
         return app
 
+    def prepare_app(self):
+        """
+        Set up what creating the app depends on: its loggers, the module index and the frozen settings.
+        """
+        from guniflask.config import app_name_from_env
+
+        gunicorn_logger = logging.getLogger('gunicorn.error')
+        redirect_logger('guniflask', gunicorn_logger)
+        redirect_logger(app_name_from_env(), gunicorn_logger)
+        install_module_index(self.module_index())
+        if self.frozen_config is not None:
+            install_frozen_settings(self.frozen_config)
+
+    def warm_up(self, app):
+        if not self.cfg.warmup_requests and not app.extensions.get(WARMUP_EXTENSION):
+            return True
+        gunicorn_logger = logging.getLogger('gunicorn.error')
+        if self.cfg.timeout and self.cfg.warmup_timeout >= self.cfg.timeout:
+            gunicorn_logger.warning('warmup_timeout %s is not shorter than timeout %s, '
+                                    'the worker may be killed during warm-up',
+                                    self.cfg.warmup_timeout, self.cfg.timeout)
+        return warm_up(app, self.cfg.warmup_requests, timeout=self.cfg.warmup_timeout, logger=gunicorn_logger)
+
+    def _warm_up_worker(self, worker):
+        self.warm_up(self.flask_app)
+
+    def module_index(self) -> ModuleIndex:
+        index_file = join(os.environ['GUNIFLASK_HOME'], '.cache', 'module_index.json')
+        return ModuleIndex(index_file, prefilter=self.cfg.module_scan_prefilter,
+                           markers=SCAN_MARKERS.union(self.cfg.module_scan_markers))
+
+    def run(self):
+        try:
+            if self.frozen_config_error is not None:
+                raise self.frozen_config_error
+            validate_worker_options(self.options)
+        except ConfigError as e:
+            print(f'\nError: {e}', file=sys.stderr, flush=True)
+            sys.exit(1)
+        super().run()
+
     def _make_options(self, opt: dict):
         from guniflask.config import app_name_from_env
         home_dir = os.environ.get('GUNIFLASK_HOME')
@@ -49,9 +136,9 @@ class GunicornApplication(Application):
         app_name = app_name_from_env()
         options = {
             'daemon': True,
-            'workers': os.cpu_count(),
             'worker_class': 'gevent',
-            'proc_name': app_name
+            'proc_name': app_name,
+            'logger_class': 'guniflask_cli.glogging.Logger',
         }
         profile_options = self._make_profile_options(os.environ.get('GUNIFLASK_ACTIVE_PROFILES'))
         options.update(profile_options)
@@ -60,6 +147,12 @@ class GunicornApplication(Application):
         if os.environ.get('GUNIFLASK_DEBUG'):
             self._update_debug_options(options)
         options.update(opt)
+        if systemd_listen_fds():
+            # sockets activated by systemd are passed to the pid started by systemd
+            options['daemon'] = False
+        # the share of CPUs when running multiple instances
+        cpu_count = os.environ.get('GUNIFLASK_CPU_COUNT')
+        apply_worker_defaults(options, cpu_count=int(cpu_count) if cpu_count else None)
 
         if options.get('daemon'):
             # pid file
@@ -68,21 +161,82 @@ class GunicornApplication(Application):
             options.setdefault('accesslog', join(log_dir, f'{app_name}.access.log'))
             options.setdefault('errorlog', join(log_dir, f'{app_name}.error.log'))
 
+        if options.get('tracing'):
+            options.setdefault('tracing_file', join(log_dir, f'{app_name}.traces.jsonl'))
+
+        instance = instance_id()
+        if instance is not None:
+            # masters of all instances listen on the same address
+            options['reuse_port'] = True
+            options['proc_name'] = f'{options["proc_name"]}.{instance}'
+            for c in ['pidfile', 'accesslog', 'errorlog', 'tracing_file']:
+                if options.get(c):
+                    options[c] = instance_path(options[c], instance)
+
         self._makedirs(options)
         # hook wrapper
-        HookWrapper.wrap(options)
+        sys_hooks = defaultdict(list)
+        if options.get('pidfile'):
+            # let restart know what the running master has loaded
+            sys_hooks['on_starting'].append(write_config_state)
+            sys_hooks['on_reload'].append(write_config_state)
+            # let start --wait-ready know when the master and workers have booted
+            sys_hooks['on_starting'].append(mark_starting)
+            sys_hooks['when_ready'].append(mark_master_ready)
+        if options.get('log_rotate_max_bytes') or options.get('log_rotate_when'):
+            sys_hooks['when_ready'].append(start_log_rotator)
+            sys_hooks['on_reload'].append(start_log_rotator)
+        if options.get('unix_socket_mode') is not None:
+            sys_hooks['when_ready'].append(chmod_unix_sockets)
+            sys_hooks['on_reload'].append(chmod_unix_sockets)
+        if options.get('memory_soft_limit') or options.get('memory_hard_limit'):
+            sys_hooks['when_ready'].append(start_memory_watchdog)
+            sys_hooks['on_reload'].append(start_memory_watchdog)
+        if options.get('stack_dump'):
+            sys_hooks['when_ready'].append(start_stuck_worker_monitor)
+            sys_hooks['on_reload'].append(start_stuck_worker_monitor)
+            sys_hooks['post_worker_init'].append(install_stack_dump)
+            sys_hooks['worker_abort'].append(dump_stacks_on_abort)
+        if options.get('preload_app'):
+            sys_hooks['post_worker_init'].append(self._warm_up_worker)
+        if options.get('shared_cache_slots'):
+            sys_hooks['on_starting'].append(create_shared_cache)
+            sys_hooks['on_reload'].append(invalidate_shared_cache)
+        if options.get('autoscale'):
+            sys_hooks['on_starting'].append(create_worker_counters)
+            sys_hooks['pre_fork'].append(assign_worker_slot)
+            sys_hooks['pre_request'].append(count_request_start)
+            sys_hooks['post_request'].append(count_request_end)
+            sys_hooks['when_ready'].append(start_autoscaler)
+            sys_hooks['on_reload'].append(create_worker_counters)
+            sys_hooks['on_reload'].append(start_autoscaler)
+        if options.get('tracing'):
+            sys_hooks['post_worker_init'].append(install_tracing)
+            sys_hooks['pre_request'].append(trace_pre_request)
+            sys_hooks['post_request'].append(trace_post_request)
+        if options.get('pidfile'):
+            # after all other hooks run on boot of the worker
+            sys_hooks['post_worker_init'].append(mark_worker_ready)
+        HookWrapper.wrap(options, **sys_hooks)
         return options
 
     def _make_profile_options(self, active_profiles):
-        from guniflask.config import load_profile_config
         conf_dir = os.environ['GUNIFLASK_CONF_DIR']
-        gc = load_profile_config(conf_dir, 'gunicorn', active_profiles=active_profiles)
-        settings = {}
-        snames = set([i.name for i in KNOWN_SETTINGS])
-        for name in gc:
-            if name in snames:
-                settings[name] = gc[name]
-        return settings
+        self.frozen_config = None
+        self.frozen_config_error = None
+        if self.use_frozen_config and not os.environ.get('GUNIFLASK_DEBUG'):
+            try:
+                self.frozen_config = load_frozen_config(conf_dir, active_profiles)
+            except ConfigError as e:
+                # fail on start, but let other commands and reloads work with the live config
+                self.frozen_config_error = e
+                if self._config_loaded:
+                    logging.getLogger('gunicorn.error').warning('Reloaded the live config: %s', e)
+        if self.frozen_config is not None:
+            self.profile_options = dict(self.frozen_config['gunicorn'])
+        else:
+            self.profile_options = live_gunicorn_options(conf_dir, active_profiles)
+        return dict(self.profile_options)
 
     @staticmethod
     def _update_debug_options(options: dict):
@@ -99,10 +253,11 @@ class GunicornApplication(Application):
         if 'reload_extra_files' in options:
             opt['reload_extra_files'].extend(options['reload_extra_files'])
         options.update(opt)
+        options.setdefault('query_inspector', True)
 
     @staticmethod
     def _makedirs(opts):
-        for c in ['pidfile', 'accesslog', 'errorlog']:
+        for c in ['pidfile', 'accesslog', 'errorlog', 'tracing_file']:
             p = opts.get(c)
             if p:
                 d = dirname(p)
@@ -110,22 +265,34 @@ class GunicornApplication(Application):
                     os.makedirs(d)
 
     def _set_default_env(self):
-        bind = self.options.get('bind', '127.0.0.1:8000')
-        if not isinstance(bind, str):
-            raise ValueError(f'Invalid bind: {bind}')
-
-        port = 80
-        s = bind.split(':')
-        host = s[0]
-        if len(s) > 1:
-            port = int(s[1])
-
-        os.environ['GUNIFLASK_HOST'] = host
-        os.environ['GUNIFLASK_PORT'] = str(port)
+        binds = parse_binds(self.options.get('bind', '127.0.0.1:8000'))
+        host, port = default_host_port(binds)
+        if host is None:
+            os.environ.pop('GUNIFLASK_HOST', None)
+            os.environ.pop('GUNIFLASK_PORT', None)
+        else:
+            os.environ['GUNIFLASK_HOST'] = host
+            os.environ['GUNIFLASK_PORT'] = str(port)
+        # let the app size its resources, e.g. DB pool, by the workers,
+        # as many as the autoscaler may run so that they stay within the budget together
+        workers = peak_workers(self.cfg) if self.cfg.autoscale else self.options['workers']
+        os.environ['GUNIFLASK_WORKERS'] = str(workers)
+        os.environ['GUNIFLASK_WORKER_CONCURRENCY'] = str(worker_concurrency(self.options))
 
 
 class HookWrapper:
-    HOOKS = ['on_starting', 'on_reload', 'on_exit']
+    # server hooks and the number of their arguments
+    HOOKS = {
+        'on_starting': 1,
+        'on_reload': 1,
+        'when_ready': 1,
+        'on_exit': 1,
+        'pre_fork': 2,
+        'post_worker_init': 1,
+        'worker_abort': 1,
+        'pre_request': 2,
+        'post_request': 4,
+    }
 
     def __init__(self, user_hooks, sys_hooks):
         self.user_hooks = user_hooks
@@ -136,15 +303,36 @@ class HookWrapper:
         user_hooks = {}
         for h in cls.HOOKS:
             if h in config:
-                user_hooks[h] = config[h]
-        w = cls(user_hooks, kwargs)
-        for h in cls.HOOKS:
+                # hooks can be given by dotted paths, e.g. in a frozen config
+                user_hooks[h] = validate_callable(-1)(config[h])
+        sys_hooks = {}
+        for h, v in kwargs.items():
+            if v:
+                sys_hooks[h] = list(v) if isinstance(v, (list, tuple)) else [v]
+        defaults = {i.name: i.default for i in KNOWN_SETTINGS}
+        for h in sys_hooks:
+            # keep the default hook of gunicorn, e.g. pre_request logs requests
+            user_hooks.setdefault(h, defaults[h])
+        w = cls(user_hooks, sys_hooks)
+        for h, arity in cls.HOOKS.items():
             if h in w.user_hooks or h in w.sys_hooks:
-                config[h] = partial(w.on_event, key=h)
+                config[h] = w._make_hook(h, arity)
         return w
 
-    def on_event(self, server, key=None):
+    def _make_hook(self, key, arity):
+        # gunicorn checks the arity of hooks
+        if arity == 1:
+            return lambda a: self.on_event(a, key=key)
+        if arity == 2:
+            return lambda a, b: self.on_event(a, b, key=key)
+        if arity == 3:
+            return lambda a, b, c: self.on_event(a, b, c, key=key)
+        return lambda a, b, c, d: self.on_event(a, b, c, d, key=key)
+
+    def on_event(self, *args, key=None):
         if key in self.user_hooks:
-            self.user_hooks[key](server)
-        if key in self.sys_hooks:
-            self.sys_hooks[key](server)
+            hook = self.user_hooks[key]
+            # post_request may take 2 to 4 arguments
+            hook(*args[:get_arity(hook)])
+        for hook in self.sys_hooks.get(key, []):
+            hook(*args)
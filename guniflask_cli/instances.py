@@ -0,0 +1,117 @@
+import glob
+import os
+import re
+from os.path import splitext, join
+
+_instance_pidfile = re.compile(r'\.(\d+)\.pid$')
+
+
+def instance_id():
+    """
+    The index of the master when running multiple instances, or None.
+    """
+    i = os.environ.get('GUNIFLASK_INSTANCE')
+    return int(i) if i else None
+
+
+def instance_path(path: str, instance: int) -> str:
+    """
+    Append the index of the instance to a file path, e.g. ``foo.pid`` -> ``foo.1.pid``.
+    """
+    if not path or path == '-':
+        return path
+    root, ext = splitext(path)
+    if root.endswith('.access') or root.endswith('.error'):
+        root, kind = splitext(root)
+        ext = kind + ext
+    return f'{root}.{instance}{ext}'
+
+
+def instance_pidfiles(pidfile: str) -> list:
+    """
+    The pidfile of a single master followed by the pidfiles of instances in order.
+    """
+    if not pidfile:
+        return []
+    root, ext = splitext(pidfile)
+    files = []
+    for f in glob.glob(f'{glob.escape(root)}.*{ext}'):
+        m = _instance_pidfile.search(f)
+        if m and f == instance_path(pidfile, int(m.group(1))):
+            files.append((int(m.group(1)), f))
+    return [pidfile] + [f for _, f in sorted(files)]
+
+
+def available_cpus() -> list:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def numa_nodes(cpus=None) -> list:
+    """
+    The available CPUs grouped by NUMA node, or a single group if the topology is unknown.
+    """
+    cpus = available_cpus() if cpus is None else cpus
+    nodes = []
+    for d in sorted(glob.glob('/sys/devices/system/node/node[0-9]*'), key=lambda s: int(s.rsplit('node', 1)[1])):
+        try:
+            with open(join(d, 'cpulist'), 'r') as f:
+                node_cpus = parse_cpulist(f.read())
+        except OSError:
+            continue
+        node_cpus = [i for i in node_cpus if i in cpus]
+        if node_cpus:
+            nodes.append(node_cpus)
+    return nodes or [list(cpus)]
+
+
+def parse_cpulist(s: str) -> list:
+    cpus = []
+    for part in s.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            a, b = part.split('-', 1)
+            cpus.extend(range(int(a), int(b) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def cpu_sets(n: int, nodes=None) -> list:
+    """
+    Split CPUs into ``n`` contiguous subsets, keeping each subset within a NUMA node when possible.
+    """
+    nodes = numa_nodes() if nodes is None else nodes
+    if n % len(nodes) == 0:
+        groups = nodes
+        per_group = n // len(nodes)
+    else:
+        groups = [sorted(i for node in nodes for i in node)]
+        per_group = n
+    sets = []
+    for cpus in groups:
+        for k in range(per_group):
+            subset = cpus[k * len(cpus) // per_group:(k + 1) * len(cpus) // per_group]
+            # more instances than CPUs
+            sets.append(subset or [cpus[k % len(cpus)]])
+    return sets
+
+
+def child_pids(pid: int) -> list:
+    pids = []
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children', 'r') as f:
+            return [int(i) for i in f.read().split()]
+    except OSError:
+        pass
+    for stat in glob.glob('/proc/[0-9]*/stat'):
+        try:
+            with open(stat, 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            pids.append(int(stat.split('/')[2]))
+    return pids
@@ -0,0 +1,184 @@
+import glob
+import gzip
+import os
+import re
+import shutil
+import signal
+import tempfile
+import time
+from datetime import datetime, timedelta
+from os.path import basename, dirname
+
+from .gevent_patch import start_os_thread
+from .master_thread import MasterThread
+
+# <log>.<time>[-<n>][.gz], n counts rotations within the same second
+_rotated_suffix = re.compile(r'\.(\d{8}-\d{6})(?:-(\d+))?(?:\.gz)?$')
+
+# seconds a rotated file has not been written to before it is compressed,
+# workers may still be writing to it until they reopen their logs
+QUIET_PERIOD = 2.0
+
+
+def rotated_files(path: str) -> list:
+    """
+    Rotated files of a log, the newest first.
+    """
+    files = []
+    for f in glob.glob(glob.escape(path) + '.*'):
+        m = _rotated_suffix.fullmatch(f[len(path):])
+        if m:
+            files.append(((m.group(1), int(m.group(2) or 0)), f))
+    return [f for _, f in sorted(files, reverse=True)]
+
+
+def rotate_file(path: str, suffix: str):
+    """
+    Move the log aside to ``<path>.<suffix>``, never onto an existing file. Return the new path,
+    or None if the log does not exist.
+    """
+    n = 0
+    while True:
+        dst = f'{path}.{suffix}' if n == 0 else f'{path}.{suffix}-{n}'
+        try:
+            # unlike rename, link fails if the destination exists
+            os.link(path, dst)
+        except FileExistsError:
+            n += 1
+            continue
+        except FileNotFoundError:
+            return None
+        os.unlink(path)
+        return dst
+
+
+def next_rollover(when: str, now: datetime) -> datetime:
+    if when == 'hourly':
+        return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+def compress_file(path: str):
+    fd, tmp = tempfile.mkstemp(prefix=f'{basename(path)}.', suffix='.gz.tmp', dir=dirname(path) or '.')
+    try:
+        with open(path, 'rb') as src, gzip.open(os.fdopen(fd, 'wb'), 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        shutil.copystat(path, tmp)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, f'{path}.gz')
+    os.remove(path)
+
+
+def remove_expired(path: str, backup_count: int, max_age: float):
+    """
+    Keep the newest ``backup_count`` rotated files of a log which are not older than ``max_age`` days.
+    """
+    now = time.time()
+    removed = []
+    for i, f in enumerate(rotated_files(path)):
+        try:
+            expired = (backup_count and i >= backup_count) or (max_age and now - os.stat(f).st_mtime > max_age * 86400)
+            if expired:
+                os.remove(f)
+                removed.append(f)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class LogRotator(MasterThread):
+    """
+    Rotate the access log and the error log, which the loggers of the app are redirected to, by size or time.
+
+    The master renames the logs and then sends USR1 to itself, so that the arbiter reopens its logs and
+    tells all workers to reopen theirs. Lines written in between go to the renamed file, none is lost
+    as with copytruncate. Rotated files are compressed in a background thread once no one writes to them.
+    """
+
+    name = 'log-rotator'
+
+    interval = 1.0
+
+    def __init__(self, server):
+        super().__init__(server)
+        self.rollover_at = None
+        # compress files rotated before a restart
+        self.pending = [f for p in self.log_files() for f in rotated_files(p) if not f.endswith('.gz')]
+
+    def log_files(self) -> list:
+        cfg = self.server.cfg
+        files = []
+        for p in (cfg.accesslog, cfg.errorlog):
+            if p and p != '-' and p not in files:
+                files.append(p)
+        return files
+
+    def check(self):
+        cfg = self.server.cfg
+        files = self.log_files()
+        now = datetime.now()
+        due = []
+        if cfg.log_rotate_when:
+            if self.rollover_at is None:
+                self.rollover_at = next_rollover(cfg.log_rotate_when, now)
+            elif now >= self.rollover_at:
+                self.rollover_at = next_rollover(cfg.log_rotate_when, now)
+                due = [p for p in files if _size(p) > 0]
+        if cfg.log_rotate_max_bytes:
+            due.extend(p for p in files if p not in due and _size(p) >= cfg.log_rotate_max_bytes)
+        if due:
+            self.rotate(due, now)
+        if self.pending:
+            self.compress_pending()
+
+    def rotate(self, files, now):
+        suffix = now.strftime('%Y%m%d-%H%M%S')
+        for p in files:
+            dst = rotate_file(p, suffix)
+            if dst is None:
+                continue
+            self.log.info('Rotated log %s to %s', p, dst)
+            self.pending.append(dst)
+        # reopen the logs in the master and all workers
+        os.kill(self.server.pid, signal.SIGUSR1)
+        for p in files:
+            for f in remove_expired(p, self.server.cfg.log_rotate_backup_count, self.server.cfg.log_rotate_max_age):
+                self.log.info('Removed expired log %s', f)
+
+    def compress_pending(self):
+        now = time.time()
+        ready = []
+        for f in self.pending:
+            try:
+                if now - os.stat(f).st_mtime >= QUIET_PERIOD:
+                    ready.append(f)
+            except FileNotFoundError:
+                ready.append(f)
+        if not ready:
+            return
+        self.pending = [f for f in self.pending if f not in ready]
+        if self.server.cfg.log_rotate_compress:
+            # each file is handed to a single compressor
+            start_os_thread(self.compress, ready)
+
+    def compress(self, files):
+        for f in files:
+            if not os.path.exists(f):
+                continue
+            try:
+                compress_file(f)
+            except Exception as e:
+                self.log.warning('Failed to compress log %s: %s', f, e)
+
+
+def _size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def start_log_rotator(server):
+    LogRotator.start(server)
@@ -1,21 +1,33 @@
+from .gevent_patch import early_patch
+
+early_patch()
+
 import click
 
+from .commands.bench import cli_bench
 from .commands.build import cli_build
+from .commands.config import cli_config
 from .commands.debug import cli_debug
 from .commands.init import cli_init
+from .commands.profile_startup import cli_profile_startup
 from .commands.restart import cli_restart
 from .commands.start import cli_start
+from .commands.status import cli_status
 from .commands.stop import cli_stop
 from .commands.table2model import cli_table2model
 from .commands.version import cli_version
 
 main = click.CommandCollection(
     sources=[
+        cli_bench,
         cli_build,
+        cli_config,
         cli_debug,
         cli_init,
+        cli_profile_startup,
         cli_restart,
         cli_start,
+        cli_status,
         cli_stop,
         cli_table2model,
         cli_version,
@@ -0,0 +1,63 @@
+import os
+from abc import ABC, abstractmethod
+
+from .gevent_patch import original, start_os_thread
+
+
+class MasterThread(ABC):
+    """
+    A background thread in the gunicorn master, started by server hooks.
+    """
+
+    name = 'master-thread'
+
+    def __init__(self, server):
+        self.server = server
+        self.log = server.log
+
+    @property
+    @abstractmethod
+    def interval(self) -> float:
+        """
+        Seconds between checks, a class attribute or a property following the config.
+        """
+
+    @classmethod
+    def start(cls, server):
+        """
+        Start the thread once for the master, it keeps running across reloads.
+        """
+        attr = '_guniflask_' + cls.name.replace('-', '_')
+        if getattr(server, attr, None) is not None:
+            return
+        t = cls(server)
+        setattr(server, attr, t)
+        # a real thread, which does not survive fork as a greenlet would under gevent
+        start_os_thread(t.run)
+
+    def run(self):
+        sleep = original('time', 'sleep')
+        while True:
+            sleep(self.interval)
+            if os.getpid() != self.server.pid:
+                # a forked worker, where the arbiter is a stale copy
+                return
+            try:
+                self.check()
+            except Exception:
+                self.log.exception('Error in %s of master', self.name)
+
+    @abstractmethod
+    def check(self):
+        """
+        Check once, errors are logged and the thread keeps running.
+        """
+
+    def workers(self) -> dict:
+        # the arbiter may change WORKERS while copying
+        for _ in range(3):
+            try:
+                return dict(self.server.WORKERS)
+            except RuntimeError:
+                pass
+        return {}
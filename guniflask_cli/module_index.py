@@ -0,0 +1,163 @@
+import ast
+import hashlib
+import json
+import logging
+import os
+import sys
+from importlib import import_module
+from importlib.util import find_spec
+from os.path import dirname, exists
+from pkgutil import iter_modules
+
+log = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# decorators and classes which make a module worth importing when scanning the app
+SCAN_MARKERS = frozenset([
+    'Blueprint',
+    'blueprint',
+    'component',
+    'configuration',
+    'controller',
+    'repository',
+    'service',
+])
+
+
+class ModuleIndex:
+    """
+    Enumerate the submodules of a package through the file system without importing them.
+
+    The result of the static prefilter of each module is persisted in an index file
+    keyed by its mtime and size, and by the hash of its source if they changed,
+    so that unchanged modules are not parsed again on the next boot.
+    """
+
+    def __init__(self, index_file: str = None, prefilter: bool = False, markers=SCAN_MARKERS):
+        self.index_file = index_file
+        self.prefilter = prefilter
+        self.markers = frozenset(markers)
+        self._entries = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        if not self.index_file or not exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            log.warning('Ignored broken module index: %s', self.index_file)
+            return
+        if data.get('version') == INDEX_VERSION and data.get('markers') == sorted(self.markers):
+            self._entries = data.get('modules', {})
+
+    def save(self):
+        if not self.index_file or not self._dirty:
+            return
+        d = dirname(self.index_file)
+        if d and not exists(d):
+            os.makedirs(d, exist_ok=True)
+        data = {
+            'version': INDEX_VERSION,
+            'markers': sorted(self.markers),
+            'modules': self._entries,
+        }
+        # workers may boot at the same time
+        tmp_file = f'{self.index_file}.{os.getpid()}'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_file, self.index_file)
+        self._dirty = False
+
+    def find_modules(self, path: str) -> list:
+        """
+        Return ``(name, origin, ispkg)`` of the package and all its submodules in the order of ``walk_modules``.
+        """
+        spec = find_spec(path)
+        if spec is None:
+            raise ModuleNotFoundError(f'No module named {path!r}', name=path)
+        modules = [(path, spec.origin, spec.submodule_search_locations is not None)]
+        if spec.submodule_search_locations is not None:
+            self._find_submodules(path, spec.submodule_search_locations, modules)
+        return modules
+
+    def _find_submodules(self, path, search_locations, modules):
+        for finder, subpath, ispkg in iter_modules(search_locations):
+            fullpath = path + '.' + subpath
+            spec = finder.find_spec(fullpath)
+            if spec is None:
+                continue
+            modules.append((fullpath, spec.origin, ispkg))
+            if ispkg and spec.submodule_search_locations:
+                self._find_submodules(fullpath, spec.submodule_search_locations, modules)
+
+    def walk_modules(self, path: str) -> list:
+        """
+        Import and return the package and its submodules, skipping those rejected by the prefilter.
+        """
+        mods = []
+        for i, (name, origin, ispkg) in enumerate(self.find_modules(path)):
+            if i == 0 or name in sys.modules or not self.prefilter or self.is_relevant(name, origin):
+                mods.append(import_module(name))
+        self.save()
+        return mods
+
+    def is_relevant(self, name: str, origin: str) -> bool:
+        if not origin or not origin.endswith('.py'):
+            return True
+        try:
+            st = os.stat(origin)
+        except OSError:
+            return True
+        entry = self._entries.get(name)
+        if entry and entry['origin'] == origin and entry['mtime_ns'] == st.st_mtime_ns \
+                and entry['size'] == st.st_size:
+            return entry['relevant']
+
+        with open(origin, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+        if entry and entry['origin'] == origin and entry['sha256'] == digest:
+            relevant = entry['relevant']
+        else:
+            relevant = self.scan_source(source, origin)
+        self._entries[name] = {
+            'origin': origin,
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'sha256': digest,
+            'relevant': relevant,
+        }
+        self._dirty = True
+        return relevant
+
+    def scan_source(self, source: bytes, filename: str = '<unknown>') -> bool:
+        """
+        Whether the module references any of the markers, e.g. it is decorated by ``@service``
+        or creates a ``Blueprint``.
+        """
+        try:
+            tree = ast.parse(source, filename=filename)
+        except (SyntaxError, ValueError):
+            # let the import report the error
+            return True
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and node.id in self.markers:
+                return True
+            if isinstance(node, ast.Attribute) and node.attr in self.markers:
+                return True
+        return False
+
+
+def install_module_index(index: ModuleIndex):
+    """
+    Make guniflask scan blueprints and beans of the app through the module index.
+    """
+    from guniflask.app import initializer
+    from guniflask.context import annotation_config_registry
+
+    initializer.walk_modules = index.walk_modules
+    annotation_config_registry.walk_modules = index.walk_modules
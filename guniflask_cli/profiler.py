@@ -0,0 +1,237 @@
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from fnmatch import fnmatchcase
+from os.path import join, exists, getmtime, getsize
+
+from .gevent_patch import start_os_thread
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+_slug_invalid_chars = re.compile(r'[^a-zA-Z\d]+')
+
+
+class ProfilerMiddleware:
+    """
+    WSGI middleware which profiles requests matching a route pattern and writes one profile per request.
+
+    The ``cprofile`` mode traces every function call deterministically and writes a pstats file
+    as well as the collapsed stacks derived from it. The ``sampling`` mode snapshots the stack of
+    the request thread (or greenlet) ``sample_rate`` times a second from a background thread,
+    which adds little overhead and also captures where the request waits for I/O.
+
+    Only one request is traced by cProfile at a time in a worker, the others wait for it. Requests served
+    concurrently in the same thread, e.g. by greenlets, would replace the profile function of each other.
+    """
+
+    def __init__(self, app, output_dir, mode='cprofile', route='*', sample_rate=1000.0, max_bytes=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f'Unknown profile mode: {mode}')
+        self.app = app
+        self.output_dir = output_dir
+        self.mode = mode
+        self.route = route or '*'
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # greenlet-aware once threading is patched by gevent
+        self._cprofile_lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO') or '/'
+        if not fnmatchcase(path, self.route):
+            return self.app(environ, start_response)
+        if self.mode == 'sampling':
+            return self.profile(SamplingProfiler(self.sample_rate), environ, start_response)
+        with self._cprofile_lock:
+            return self.profile(cProfile.Profile(), environ, start_response)
+
+    def profile(self, profiler, environ, start_response):
+        profiler.enable()
+        try:
+            # consume the response so that lazy bodies are profiled too
+            result = self.app(environ, start_response)
+            try:
+                body = list(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            profiler.disable()
+            self.dump(profiler, environ)
+        return body
+
+    def dump(self, profiler, environ):
+        if not exists(self.output_dir):
+            os.makedirs(self.output_dir, exist_ok=True)
+        now = time.time()
+        slug = _slug_invalid_chars.sub('_', environ.get('PATH_INFO') or '/').strip('_') or 'root'
+        name = (f'{time.strftime("%Y%m%d-%H%M%S", time.localtime(now))}-{int(now * 1000) % 1000:03d}'
+                f'-{os.getpid()}-{environ.get("REQUEST_METHOD", "GET")}-{slug[:80]}')
+        fname = join(self.output_dir, name)
+        if isinstance(profiler, SamplingProfiler):
+            stacks = profiler.stacks
+        else:
+            profiler.dump_stats(fname + '.prof')
+            stacks = collapse_stats(pstats.Stats(profiler))
+        write_collapsed(fname + '.collapsed', stacks)
+        if self.max_bytes:
+            with self._lock:
+                rotate_profiles(self.output_dir, self.max_bytes)
+
+
+class SamplingProfiler:
+    """
+    Sample the stack of the current thread, or the current greenlet if running with gevent.
+    """
+
+    def __init__(self, sample_rate=1000.0):
+        self.interval = 1.0 / sample_rate
+        self.stacks = Counter()
+        self._thread_ident = None
+        self._greenlet = None
+        self._stopped = None
+
+    def enable(self):
+        self._thread_ident = _os_thread_ident()
+        greenlet = sys.modules.get('greenlet')
+        if greenlet is not None:
+            self._greenlet = greenlet.getcurrent()
+        self._stopped = _os_event()
+        start_os_thread(self._run)
+
+    def disable(self):
+        self._stopped.set()
+
+    def _run(self):
+        while True:
+            frame = None
+            if self._greenlet is not None:
+                # gr_frame is None while the greenlet is running
+                frame = self._greenlet.gr_frame
+            if frame is None:
+                frame = sys._current_frames().get(self._thread_ident)
+            if frame is not None:
+                self.stacks[format_stack(frame)] += 1
+            if self._stopped.wait(self.interval):
+                break
+
+
+def format_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+def collapse_stats(stats: pstats.Stats, max_depth=100) -> Counter:
+    """
+    Approximate collapsed stacks in microseconds from the caller graph of cProfile.
+
+    The time of a function is split among its callers in proportion to the time spent
+    on each call edge, the same way as flameprof does.
+    """
+    raw = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, v in raw.items() if not v[4]]
+
+    stacks = Counter()
+
+    def _label(func):
+        filename, lineno, name = func
+        if filename == '~':
+            return name
+        return f'{name} ({filename}:{lineno})'
+
+    def _walk(func, budget, path, labels):
+        _, _, tt, ct, _ = raw[func]
+        if ct <= 0 or budget < 0.000001:
+            return
+        scale = min(budget / ct, 1.0)
+        labels = labels + [_label(func)]
+        stack = ';'.join(labels)
+        self_time = int(tt * scale * 1000000)
+        if self_time > 0:
+            stacks[stack] += self_time
+        if len(labels) >= max_depth:
+            return
+        for callee, edge_time in callees.get(func, []):
+            if callee not in path:
+                _walk(callee, edge_time * scale, path | {callee}, labels)
+
+    for root in roots:
+        _walk(root, raw[root][3], {root}, [])
+    return stacks
+
+
+def write_collapsed(fname, stacks: Counter):
+    with open(fname, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+
+
+def rotate_profiles(output_dir, max_bytes):
+    """
+    Remove the oldest profiles until the total size of the directory is within ``max_bytes``.
+    """
+    files = []
+    for name in os.listdir(output_dir):
+        fname = join(output_dir, name)
+        try:
+            files.append((getmtime(fname), name, getsize(fname)))
+        except OSError:
+            pass
+    total = sum(i[2] for i in files)
+    for _, name, size in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(join(output_dir, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def _os_thread_ident():
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None and monkey.is_module_patched('threading'):
+        return monkey.get_original('_thread', 'get_ident')()
+    return threading.get_ident()
+
+
+def _os_event():
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None and monkey.is_module_patched('threading'):
+        return _RawEvent(monkey.get_original('_thread', 'allocate_lock')())
+    return threading.Event()
+
+
+class _RawEvent:
+    """
+    A minimal event based on a real lock, which can be waited on from a real thread under gevent.
+    """
+
+    def __init__(self, lock):
+        self._lock = lock
+        self._lock.acquire()
+
+    def set(self):
+        if self._lock.locked():
+            self._lock.release()
+
+    def wait(self, timeout):
+        if self._lock.acquire(timeout=timeout):
+            self._lock.release()
+            return True
+        return False
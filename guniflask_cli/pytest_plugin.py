@@ -0,0 +1,86 @@
+"""
+Fail tests whose requests exceed their query budget or issue N+1 queries.
+
+Enable it in ``conftest.py`` of the project, which provides the ``app`` fixture::
+
+    pytest_plugins = ['guniflask_cli.pytest_plugin']
+
+Then set a default budget by the ``query_budget`` ini option, or the budget of a test by
+``@pytest.mark.query_budget(n)``. ``@pytest.mark.query_budget(None)`` exempts a test from the budget.
+"""
+
+import pytest
+
+from .query_inspector import QUERY_INSPECTOR_EXTENSION, QueryInspector
+
+
+def pytest_addoption(parser):
+    parser.addini('query_budget', 'Maximum queries of each request, unlimited if not set.')
+    parser.addini('query_burst_threshold',
+                  'Fail requests repeating a query fingerprint this many times, as N+1 queries.')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'query_budget(n): maximum queries of each request in the test')
+
+
+@pytest.fixture
+def query_inspector(app):
+    """
+    The inspector of queries installed on the app.
+    """
+    inspector = app.extensions.get(QUERY_INSPECTOR_EXTENSION)
+    if inspector is not None:
+        yield inspector
+        return
+    # report nothing in logs, failures are reported by the test
+    inspector = QueryInspector(app, burst_threshold=1 << 30, slow_threshold=None)
+    yield inspector
+    inspector.sql_listener.remove()
+
+
+@pytest.fixture(autouse=True)
+def _guniflask_query_budget(request):
+    config = request.config
+    marker = request.node.get_closest_marker('query_budget')
+    if marker is not None:
+        budget = marker.args[0] if marker.args else marker.kwargs.get('n')
+    else:
+        budget = _int_ini(config, 'query_budget')
+    burst_threshold = _int_ini(config, 'query_burst_threshold')
+    if budget is None and burst_threshold is None:
+        yield
+        return
+    try:
+        inspector = request.getfixturevalue('query_inspector')
+    except pytest.FixtureLookupError:
+        # no app to inspect
+        yield
+        return
+
+    violations = request.node._guniflask_query_violations = []
+
+    def check(queries):
+        if budget is not None and queries.count > budget:
+            violations.append(f'{queries.name} issued {queries.count} queries, over the budget of {budget}')
+        if burst_threshold is not None:
+            for count, fingerprint, site in queries.bursts(burst_threshold):
+                violations.append(f'{queries.name} issued {count} queries of "{fingerprint}"'
+                                  f'{inspector.format_site(site)}')
+
+    inspector.listeners.append(check)
+    yield
+    inspector.listeners.remove(check)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    outcome = yield
+    violations = getattr(item, '_guniflask_query_violations', None)
+    if violations and outcome.excinfo is None:
+        outcome.force_exception(pytest.fail.Exception('\n'.join(violations), pytrace=False))
+
+
+def _int_ini(config, name):
+    value = config.getini(name)
+    return int(value) if value else None
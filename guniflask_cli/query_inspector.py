@@ -0,0 +1,123 @@
+import os
+import sys
+from os.path import dirname
+
+from flask import Flask, current_app, g, has_request_context, request, request_finished, request_started
+
+from .tracing import SqlEventListener, statement_fingerprint
+
+QUERY_INSPECTOR_EXTENSION = 'guniflask_query_inspector'
+
+
+class RequestQueries:
+    """
+    Queries executed while serving a request, grouped by fingerprint.
+    """
+
+    def __init__(self, method: str, path: str, route: str = None):
+        self.method = method
+        self.path = path
+        self.route = route
+        self.count = 0
+        self.duration = 0.0
+        # fingerprint -> [count, duration, call site of the first query]
+        self.fingerprints = {}
+
+    @property
+    def name(self) -> str:
+        s = f'{self.method} {self.path}'
+        if self.route and self.route != self.path:
+            s += f' ({self.route})'
+        return s
+
+    def bursts(self, threshold: int) -> list:
+        """
+        Fingerprints repeated at least ``threshold`` times, which are likely N+1 queries.
+        """
+        return sorted(((c, f, site) for f, (c, _, site) in self.fingerprints.items() if c >= threshold),
+                      key=lambda i: i[0], reverse=True)
+
+
+class QueryInspector:
+    """
+    Count the queries of each request by fingerprint, and report repeated queries (N+1) and slow queries
+    with the call site in the app.
+    """
+
+    def __init__(self, app: Flask = None, burst_threshold: int = 5, slow_threshold: float = 100.0,
+                 stack_depth: int = 5, logger=None):
+        self.burst_threshold = burst_threshold
+        self.slow_threshold = slow_threshold
+        self.stack_depth = stack_depth
+        self.logger = logger
+        # callbacks taking RequestQueries of each finished request
+        self.listeners = []
+        self.app_dirs = []
+        self.sql_listener = SqlEventListener(self.on_query)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.extensions[QUERY_INSPECTOR_EXTENSION] = self
+        if self.logger is None:
+            self.logger = app.logger
+        self.app_dirs.append(dirname(app.root_path) + os.sep)
+        request_started.connect(self.on_request_started, app, weak=False)
+        request_finished.connect(self.on_request_finished, app, weak=False)
+        self.sql_listener.listen()
+
+    def on_request_started(self, sender, **kwargs):
+        route = request.url_rule.rule if request.url_rule is not None else None
+        g._guniflask_queries = RequestQueries(request.method, request.path, route)
+
+    def on_request_finished(self, sender, response=None, **kwargs):
+        queries = g.pop('_guniflask_queries', None)
+        if queries is None:
+            return
+        for count, fingerprint, site in queries.bursts(self.burst_threshold):
+            self.logger.warning('Possible N+1 queries in %s: %s queries of "%s"%s',
+                                queries.name, count, fingerprint, self.format_site(site))
+        for listener in self.listeners:
+            listener(queries)
+
+    def on_query(self, statement, rows, duration, error=None):
+        # the listener of SQLAlchemy is global, the queries belong to the inspector of the current app only
+        if not has_request_context() or current_app.extensions.get(QUERY_INSPECTOR_EXTENSION) is not self:
+            return
+        queries = g.get('_guniflask_queries')
+        if queries is None:
+            return
+        fingerprint = statement_fingerprint(statement)
+        queries.count += 1
+        queries.duration += duration
+        stats = queries.fingerprints.get(fingerprint)
+        if stats is None:
+            stats = queries.fingerprints[fingerprint] = [0, 0.0, self.call_site()]
+        stats[0] += 1
+        stats[1] += duration
+        if self.slow_threshold is not None and duration * 1000 >= self.slow_threshold:
+            self.logger.warning('Slow query in %s took %.1f ms: "%s"%s',
+                                queries.name, duration * 1000, fingerprint, self.format_site(self.call_site()))
+
+    def call_site(self) -> list:
+        """
+        The innermost frames of the app issuing the query.
+        """
+        frames = []
+        f = sys._getframe(1)
+        while f is not None and len(frames) < self.stack_depth:
+            if self.is_app_file(f.f_code.co_filename):
+                frames.append((f.f_code.co_filename, f.f_lineno, f.f_code.co_name))
+            f = f.f_back
+        return frames
+
+    def is_app_file(self, filename: str) -> bool:
+        if 'site-packages' in filename or 'dist-packages' in filename:
+            return False
+        return any(filename.startswith(d) for d in self.app_dirs)
+
+    @staticmethod
+    def format_site(frames) -> str:
+        if not frames:
+            return ''
+        return ''.join(f'\n  at {filename}:{lineno} in {name}' for filename, lineno, name in frames)
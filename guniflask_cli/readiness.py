@@ -0,0 +1,144 @@
+import http.client
+import json
+import os
+import socket
+import time
+from os.path import splitext
+
+from .binds import parse_binds
+
+
+def ready_file(pidfile: str) -> str:
+    """
+    Events of the startup of a master and its workers are kept next to its pid file,
+    e.g. ``foo.pid`` -> ``foo.ready.jsonl``.
+    """
+    return f'{splitext(pidfile)[0]}.ready.jsonl'
+
+
+def _append_event(pidfile, event: str, **kwargs):
+    if not pidfile:
+        return
+    record = dict(event=event, pid=os.getpid(), time=time.time(), **kwargs)
+    fd = os.open(ready_file(pidfile), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        # a single write of a line, workers booting at the same time do not interleave
+        os.write(fd, (json.dumps(record) + '\n').encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def mark_starting(server):
+    pidfile = server.cfg.pidfile
+    if pidfile:
+        with open(ready_file(pidfile), 'w'):
+            pass
+    _append_event(pidfile, 'starting')
+
+
+def mark_master_ready(server):
+    _append_event(server.cfg.pidfile, 'master_ready', workers=server.num_workers)
+
+
+def mark_worker_ready(worker):
+    # the last hook of post_worker_init, the worker accepts connections next
+    _append_event(worker.cfg.pidfile, 'worker_ready', ppid=worker.ppid)
+
+
+def read_ready_events(pidfile: str) -> list:
+    events = []
+    try:
+        with open(ready_file(pidfile), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # being written
+                    pass
+    except OSError:
+        pass
+    return events
+
+
+def connect_address(bind: tuple):
+    """
+    The address to connect to a bind from the local host, or None for inherited sockets.
+    """
+    if bind[0] == 'unix':
+        return socket.AF_UNIX, bind[1]
+    if bind[0] == 'tcp':
+        host = bind[1]
+        if host in ('0.0.0.0', ''):
+            host = '127.0.0.1'
+        elif host == '::':
+            host = '::1'
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        return family, (host, bind[2])
+    return None
+
+
+def can_connect(bind: tuple, timeout: float = 1.0) -> bool:
+    address = connect_address(bind)
+    if address is None:
+        return True
+    family, addr = address
+    s = socket.socket(family, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    try:
+        s.connect(addr)
+        return True
+    except OSError:
+        return False
+    finally:
+        s.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def health_status(bind: tuple, path: str, timeout: float = 5.0):
+    """
+    The status code of GET ``path`` through the bind, or None if the request fails.
+    """
+    address = connect_address(bind)
+    if address is None:
+        return None
+    family, addr = address
+    if family == socket.AF_UNIX:
+        conn = _UnixHTTPConnection(addr, timeout)
+    else:
+        conn = http.client.HTTPConnection(addr[0], addr[1], timeout=timeout)
+    try:
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+def local_binds(bind) -> list:
+    return [b for b in parse_binds(bind) if b[0] != 'fd']
+
+
+def tail_file(path: str, lines: int = 20) -> list:
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 64 * 1024))
+            data = f.read()
+    except OSError:
+        return []
+    return data.decode('utf-8', errors='replace').splitlines()[-lines:]
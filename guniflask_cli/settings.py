@@ -0,0 +1,584 @@
+from gunicorn.config import Setting, validate_bool, validate_dict, validate_list_string, validate_pos_int, \
+    validate_string
+
+
+def validate_float(val):
+    if val is None:
+        return None
+    if isinstance(val, bool):
+        raise TypeError(f'Not a number: {val}')
+    val = float(val)
+    if val < 0:
+        raise ValueError(f'Value must not be negative: {val}')
+    return val
+
+
+def validate_positive_float(val):
+    val = validate_float(val)
+    if val is not None and val == 0:
+        raise ValueError(f'Value must be positive: {val}')
+    return val
+
+
+def validate_profile_mode(val):
+    val = validate_string(val)
+    if val is not None and val not in ('cprofile', 'sampling'):
+        raise ValueError(f'Profile mode must be cprofile or sampling: {val}')
+    return val
+
+
+def validate_size(val):
+    """
+    Size in bytes, or a string with a unit, e.g. ``'512M'`` or ``'1.5G'``.
+    """
+    if val is None:
+        return None
+    if isinstance(val, str):
+        units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+        s = val.strip().upper().rstrip('B').rstrip('I')
+        if s and s[-1] in units:
+            return int(float(s[:-1]) * units[s[-1]])
+        return int(s)
+    if isinstance(val, bool) or not isinstance(val, int) or val < 0:
+        raise ValueError(f'Invalid size: {val}')
+    return val
+
+
+def validate_fraction(val):
+    val = validate_float(val)
+    if val is not None and val > 1:
+        raise ValueError(f'Value must be between 0 and 1: {val}')
+    return val
+
+
+def validate_memory_metric(val):
+    val = validate_string(val)
+    if val not in ('rss', 'pss'):
+        raise ValueError(f'Memory metric must be rss or pss: {val}')
+    return val
+
+
+def validate_file_mode(val):
+    if val is None:
+        return None
+    if isinstance(val, str):
+        val = int(val, 8)
+    if not isinstance(val, int) or isinstance(val, bool) or not 0 <= val <= 0o777:
+        raise ValueError(f'Invalid file mode: {val}')
+    return val
+
+
+def validate_sampling_rates(val):
+    val = validate_dict(val)
+    rates = {}
+    for pattern, rate in val.items():
+        rate = validate_float(rate)
+        if rate is None or rate > 1:
+            raise ValueError(f'Sampling rate of "{pattern}" must be between 0 and 1: {rate}')
+        rates[validate_string(pattern)] = rate
+    return rates
+
+
+def validate_rotate_when(val):
+    val = validate_string(val)
+    if val is not None and val not in ('hourly', 'daily'):
+        raise ValueError(f'Rotation interval must be hourly or daily: {val}')
+    return val
+
+
+class AccessLogJson(Setting):
+    name = 'access_log_json'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = False
+    desc = """\
+        Write access log as JSON lines instead of ``access_log_format``.
+
+        Each line contains the microsecond request duration, worker pid, bytes sent
+        and the upstream request id.
+        """
+
+
+class AccessLogSampling(Setting):
+    name = 'access_log_sampling'
+    section = 'Guniflask'
+    validator = validate_sampling_rates
+    default = {}
+    desc = """\
+        Sampling rates of JSON access log by route.
+
+        A dict mapping a route pattern (shell-style wildcards matched against the request path)
+        to a rate between 0 and 1, e.g. ``{'/health': 0, '/api/*': 0.1}``.
+        The first matching pattern wins and routes matching no pattern are always logged.
+        """
+
+
+class AccessLogSlowThreshold(Setting):
+    name = 'access_log_slow_threshold'
+    section = 'Guniflask'
+    validator = validate_float
+    default = None
+    desc = """\
+        Requests taking at least this many milliseconds are always logged regardless of sampling.
+        """
+
+
+class AccessLogRequestIdHeader(Setting):
+    name = 'access_log_request_id_header'
+    section = 'Guniflask'
+    validator = validate_string
+    default = 'X-Request-ID'
+    desc = """\
+        The request header carrying the upstream request id.
+        """
+
+
+class GeventEarlyPatch(Setting):
+    name = 'gevent_early_patch'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = True
+    desc = """\
+        Monkey-patch with gevent before the app or any DB driver is imported when using the gevent worker.
+
+        It must be set as a literal in the gunicorn profile config since it is read before the config is loaded.
+        """
+
+
+class ModuleScanPrefilter(Setting):
+    name = 'module_scan_prefilter'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = False
+    desc = """\
+        Only import the modules of the app which reference blueprints or component decorators
+        when scanning the app at boot.
+
+        Modules are parsed statically and the results are cached in ``.cache/module_index.json``
+        by file mtime and hash. Enable it only if no beans are declared by custom decorators
+        missing from ``module_scan_markers``.
+        """
+
+
+class ModuleScanMarkers(Setting):
+    name = 'module_scan_markers'
+    section = 'Guniflask'
+    validator = validate_list_string
+    default = []
+    desc = """\
+        Extra names of decorators or classes that make a module be imported by the scan prefilter.
+        """
+
+
+class RequestProfiler(Setting):
+    name = 'request_profiler'
+    section = 'Guniflask'
+    validator = validate_profile_mode
+    default = None
+    desc = """\
+        Profile each request and write the profiles to ``.log/profiles``, either ``cprofile`` or ``sampling``.
+
+        ``cprofile`` writes a pstats file and collapsed stacks for flame graphs,
+        ``sampling`` only writes collapsed stacks but adds much less overhead.
+        """
+
+
+class RequestProfilerRoute(Setting):
+    name = 'request_profiler_route'
+    section = 'Guniflask'
+    validator = validate_string
+    default = '*'
+    desc = """\
+        Only profile requests whose path matches this pattern (shell-style wildcards).
+        """
+
+
+class RequestProfilerSampleRate(Setting):
+    name = 'request_profiler_sample_rate'
+    section = 'Guniflask'
+    validator = validate_positive_float
+    default = 1000.0
+    desc = """\
+        Stack samples per second taken by the ``sampling`` profiler.
+        """
+
+
+class RequestProfilerMaxBytes(Setting):
+    name = 'request_profiler_max_bytes'
+    section = 'Guniflask'
+    validator = validate_pos_int
+    default = 100 * 1024 * 1024
+    desc = """\
+        The oldest profiles are removed once the total size of ``.log/profiles`` exceeds this many bytes.
+        """
+
+
+class UnixSocketMode(Setting):
+    name = 'unix_socket_mode'
+    section = 'Guniflask'
+    validator = validate_file_mode
+    default = None
+    desc = """\
+        Permissions of unix sockets in ``bind``, e.g. ``0o660`` or ``'660'``,
+        to let a reverse proxy running as another user in the same group connect to them.
+        """
+
+
+class MemorySoftLimit(Setting):
+    name = 'memory_soft_limit'
+    section = 'Guniflask'
+    validator = validate_size
+    default = None
+    desc = """\
+        Gracefully recycle workers using more memory than this, in bytes or with a unit, e.g. ``'512M'``.
+
+        Workers are recycled one by one as long as the serving workers stay above ``memory_capacity_floor``.
+        """
+
+
+class MemoryHardLimit(Setting):
+    name = 'memory_hard_limit'
+    section = 'Guniflask'
+    validator = validate_size
+    default = None
+    desc = """\
+        Kill workers using more memory than this immediately, in bytes or with a unit, e.g. ``'1G'``.
+        """
+
+
+class MemoryCheckInterval(Setting):
+    name = 'memory_check_interval'
+    section = 'Guniflask'
+    validator = validate_positive_float
+    default = 10.0
+    desc = """\
+        Seconds between checks of the memory of workers.
+        """
+
+
+class MemoryMetric(Setting):
+    name = 'memory_metric'
+    section = 'Guniflask'
+    validator = validate_memory_metric
+    default = 'pss'
+    desc = """\
+        Compare ``rss`` or ``pss`` of workers with the memory limits.
+
+        PSS splits the pages shared with the master and other workers among them,
+        so it is not inflated by memory shared after fork. RSS is used if PSS is not available.
+        """
+
+
+class MemoryCapacityFloor(Setting):
+    name = 'memory_capacity_floor'
+    section = 'Guniflask'
+    validator = validate_fraction
+    default = 0.75
+    desc = """\
+        The fraction of workers that must keep serving while workers above the soft limit are recycled.
+        """
+
+
+class StackDump(Setting):
+    name = 'stack_dump'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = False
+    desc = """\
+        Dump the stacks of threads and greenlets of a worker into the error log when it gets stuck.
+
+        The master sends SIGUSR2 to a worker which has not notified it for ``stack_dump_fraction`` of ``timeout``,
+        so that the stacks are logged before the worker is killed for the timeout.
+        """
+
+
+class StackDumpFraction(Setting):
+    name = 'stack_dump_fraction'
+    section = 'Guniflask'
+    validator = validate_fraction
+    default = 0.75
+    desc = """\
+        The fraction of ``timeout`` after which a silent worker is asked to dump its stacks.
+        """
+
+
+class WarmupRequests(Setting):
+    name = 'warmup_requests'
+    section = 'Guniflask'
+    validator = validate_list_string
+    default = []
+    desc = """\
+        Requests replayed through the app in each worker before it accepts requests, e.g. ``['GET /health']``.
+
+        They run after the warm-up callables registered by ``guniflask_cli.warmup.register_warmup``.
+        """
+
+
+class WarmupTimeout(Setting):
+    name = 'warmup_timeout'
+    section = 'Guniflask'
+    validator = validate_float
+    default = 10.0
+    desc = """\
+        Seconds that the warm-up of a worker may take, the rest of warm-up is skipped afterwards.
+
+        It should be shorter than ``timeout``, otherwise the master may kill the worker during warm-up.
+        """
+
+
+class Tracing(Setting):
+    name = 'tracing'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = False
+    desc = """\
+        Trace requests with a span for each SQL statement executed through SQLAlchemy.
+
+        Traces are written as JSON lines to ``tracing_file``, one line for each request.
+        """
+
+
+class TracingFile(Setting):
+    name = 'tracing_file'
+    section = 'Guniflask'
+    validator = validate_string
+    default = None
+    desc = """\
+        The file of traces, default to ``.log/<app>.traces.jsonl`` under the home of the app.
+        """
+
+
+class TracingSampleRate(Setting):
+    name = 'tracing_sample_rate'
+    section = 'Guniflask'
+    validator = validate_fraction
+    default = 0.1
+    desc = """\
+        The fraction of requests to trace, decided by the request id when there is one.
+        """
+
+
+class TracingSlowThreshold(Setting):
+    name = 'tracing_slow_threshold'
+    section = 'Guniflask'
+    validator = validate_float
+    default = 500.0
+    desc = """\
+        Requests taking at least this many milliseconds are always traced regardless of sampling,
+        so are requests failing with 5xx.
+        """
+
+
+class TracingMaxBytes(Setting):
+    name = 'tracing_max_bytes'
+    section = 'Guniflask'
+    validator = validate_size
+    default = 100 * 1024 * 1024
+    desc = """\
+        Rotate the file of traces when it grows above this size.
+        """
+
+
+class TracingBackupCount(Setting):
+    name = 'tracing_backup_count'
+    section = 'Guniflask'
+    validator = validate_pos_int
+    default = 5
+    desc = """\
+        The number of rotated files of traces to keep.
+        """
+
+
+class QueryInspector(Setting):
+    name = 'query_inspector'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = False
+    desc = """\
+        Report possible N+1 queries and slow queries of each request with the call site in the app.
+
+        It is enabled by ``guniflask debug`` unless disabled in the gunicorn profile config.
+        """
+
+
+class QueryInspectorBurstThreshold(Setting):
+    name = 'query_inspector_burst_threshold'
+    section = 'Guniflask'
+    validator = validate_pos_int
+    default = 5
+    desc = """\
+        Queries of the same fingerprint repeated this many times in a request are reported as N+1 queries.
+        """
+
+
+class QueryInspectorSlowThreshold(Setting):
+    name = 'query_inspector_slow_threshold'
+    section = 'Guniflask'
+    validator = validate_float
+    default = 100.0
+    desc = """\
+        Queries taking at least this many milliseconds are reported as slow queries.
+        """
+
+
+class SharedCacheSlots(Setting):
+    name = 'shared_cache_slots'
+    section = 'Guniflask'
+    validator = validate_pos_int
+    default = 0
+    desc = """\
+        The number of slots of the cache shared by workers, see ``guniflask_cli.shared_cache.shared_cache``.
+
+        The master creates the cache before forking workers if it is positive, and invalidates it on reload.
+        """
+
+
+class SharedCacheSlotSize(Setting):
+    name = 'shared_cache_slot_size'
+    section = 'Guniflask'
+    validator = validate_size
+    default = 1024
+    desc = """\
+        The size of each slot of the shared cache, the key and the pickled value of an entry must fit in a slot.
+        """
+
+
+class Autoscale(Setting):
+    name = 'autoscale'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = False
+    desc = """\
+        Add and remove workers by TTIN and TTOU according to in-flight requests and the accept backlog.
+
+        The master samples the utilization of workers, which is the in-flight requests over the requests that
+        all workers can handle at the same time, every ``autoscale_interval`` seconds. It adds a worker when the
+        average utilization of the last ``autoscale_window`` seconds reaches ``autoscale_scale_up`` or
+        connections are waiting to be accepted all the time, and removes one when the utilization never exceeds
+        ``autoscale_scale_down``, then waits for ``autoscale_cooldown`` seconds.
+        """
+
+
+class AutoscaleMinWorkers(Setting):
+    name = 'autoscale_min_workers'
+    section = 'Guniflask'
+    validator = validate_pos_int
+    default = 1
+    desc = """\
+        The minimum number of workers when autoscaling.
+        """
+
+
+class AutoscaleMaxWorkers(Setting):
+    name = 'autoscale_max_workers'
+    section = 'Guniflask'
+    validator = validate_pos_int
+    default = 0
+    desc = """\
+        The maximum number of workers when autoscaling, twice ``workers`` if it is 0.
+        """
+
+
+class AutoscaleScaleUp(Setting):
+    name = 'autoscale_scale_up'
+    section = 'Guniflask'
+    validator = validate_fraction
+    default = 0.8
+    desc = """\
+        Add a worker when the average utilization of workers reaches this fraction.
+        """
+
+
+class AutoscaleScaleDown(Setting):
+    name = 'autoscale_scale_down'
+    section = 'Guniflask'
+    validator = validate_fraction
+    default = 0.3
+    desc = """\
+        Remove a worker when the utilization of workers stays at or below this fraction.
+
+        It should be well below ``autoscale_scale_up``, so that removing a worker does not make the others
+        busy enough to add it back.
+        """
+
+
+class AutoscaleInterval(Setting):
+    name = 'autoscale_interval'
+    section = 'Guniflask'
+    validator = validate_positive_float
+    default = 1.0
+    desc = """\
+        Seconds between samples of the utilization of workers.
+        """
+
+
+class AutoscaleWindow(Setting):
+    name = 'autoscale_window'
+    section = 'Guniflask'
+    validator = validate_float
+    default = 10.0
+    desc = """\
+        Seconds of samples to decide on, a short burst of requests does not add workers.
+        """
+
+
+class AutoscaleCooldown(Setting):
+    name = 'autoscale_cooldown'
+    section = 'Guniflask'
+    validator = validate_float
+    default = 30.0
+    desc = """\
+        Seconds to wait after adding or removing a worker before the next decision.
+        """
+
+
+class LogRotateMaxBytes(Setting):
+    name = 'log_rotate_max_bytes'
+    section = 'Guniflask'
+    validator = validate_size
+    default = 0
+    desc = """\
+        Rotate the access log and the error log once they reach this size, e.g. ``'512M'``.
+
+        The master renames the logs and sends USR1 to itself, so that it and all workers reopen them.
+        """
+
+
+class LogRotateWhen(Setting):
+    name = 'log_rotate_when'
+    section = 'Guniflask'
+    validator = validate_rotate_when
+    default = None
+    desc = """\
+        Rotate the access log and the error log at the start of each hour (``'hourly'``) or day (``'daily'``).
+        """
+
+
+class LogRotateBackupCount(Setting):
+    name = 'log_rotate_backup_count'
+    section = 'Guniflask'
+    validator = validate_pos_int
+    default = 7
+    desc = """\
+        The number of rotated files kept for each log, unlimited if it is 0.
+        """
+
+
+class LogRotateMaxAge(Setting):
+    name = 'log_rotate_max_age'
+    section = 'Guniflask'
+    validator = validate_float
+    default = 0
+    desc = """\
+        Remove rotated files older than this many days, unlimited if it is 0.
+        """
+
+
+class LogRotateCompress(Setting):
+    name = 'log_rotate_compress'
+    section = 'Guniflask'
+    validator = validate_bool
+    default = True
+    desc = """\
+        Compress rotated files with gzip in a background thread of the master.
+        """
@@ -0,0 +1,306 @@
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import pickle
+import struct
+import time
+
+log = logging.getLogger(__name__)
+
+_MAGIC = b'GFCACHE1'
+
+# magic, generation
+_HEADER = struct.Struct('<8sQ')
+
+# seq, generation, key length, value length, key hash, expires at
+_SLOT_HEADER = struct.Struct('<QQIIQd')
+
+_SEQ = struct.Struct('<Q')
+
+# hash of the key of a slot, packed with the others of its set
+_TAG = struct.Struct('<Q')
+
+_ACCESS = struct.Struct('<q')
+
+# pid of the holder of a lock
+_OWNER = struct.Struct('<q')
+
+# seconds between tries of a busy lock
+LOCK_RETRY_INTERVAL = 0.001
+
+
+class SharedCache:
+    """
+    A cache in shared memory, which is created by the master before fork and shared by all workers.
+
+    Keys are hashed into sets of ``ways`` fixed-size slots, the least recently used slot of a set is evicted
+    when the set is full. Each slot is guarded by a sequence number (seqlock): writers serialized by
+    striped locks make it odd while writing, readers never lock and retry if it is odd or has changed.
+    Values are pickled, those not fitting in a slot are not cached.
+
+    A write never blocks on its lock: it tries again every millisecond with ``time.sleep``, which lets other
+    greenlets run in a gevent worker, and is skipped if the lock is still busy after ``lock_timeout`` seconds.
+    The lock held by a worker which died while writing, e.g. killed for the timeout, is released by the next
+    writer at once.
+    """
+
+    def __init__(self, slots: int = 4096, slot_size: int = 1024, ways: int = 8, locks: int = 64,
+                 lock_timeout: float = 0.1):
+        if slot_size <= _SLOT_HEADER.size:
+            raise ValueError(f'Slot size must be larger than {_SLOT_HEADER.size}: {slot_size}')
+        self.ways = max(1, min(ways, slots))
+        self.sets = max(1, slots // self.ways)
+        self.slots = self.sets * self.ways
+        self.slot_size = slot_size
+        self.capacity = slot_size - _SLOT_HEADER.size
+        # hashes of keys of a set are packed together, so that a lookup probes only the matching slots
+        self._tags = struct.Struct(f'<{self.ways}Q')
+        self._tags_offset = _HEADER.size
+        self._access_offset = self._tags_offset + self.slots * _TAG.size
+        nlocks = min(locks, self.sets)
+        self._owners_offset = self._access_offset + self.slots * _ACCESS.size
+        self._slots_offset = self._owners_offset + nlocks * _OWNER.size
+        self.size = self._slots_offset + self.slots * slot_size
+        # anonymous shared mapping is inherited by forked workers
+        self.buf = mmap.mmap(-1, self.size)
+        _HEADER.pack_into(self.buf, 0, _MAGIC, 1)
+        self.locks = [multiprocessing.Lock() for _ in range(nlocks)]
+        self.lock_timeout = lock_timeout
+        # serializes releasing the locks of dead writers
+        self._recover_lock = multiprocessing.Lock()
+
+    @property
+    def generation(self) -> int:
+        return _HEADER.unpack_from(self.buf, 0)[1]
+
+    def get(self, key: str, default=None):
+        k = key.encode('utf-8')
+        h = _hash(k)
+        gen = self.generation
+        now = time.time()
+        base = (h % self.sets) * self.ways
+        tags = self._tags.unpack_from(self.buf, self._tags_offset + base * _TAG.size)
+        for j, tag in enumerate(tags):
+            if tag != h:
+                continue
+            i = base + j
+            value = self._read(i, k, h, gen, now)
+            if value is not None:
+                _ACCESS.pack_into(self.buf, self._access_offset + i * _ACCESS.size, time.monotonic_ns())
+                return pickle.loads(value)
+        return default
+
+    def set(self, key: str, value, ttl: float = None) -> bool:
+        """
+        Cache the value for ``ttl`` seconds or until evicted, return False if it is too large to cache
+        or the lock is not acquired in time.
+        """
+        k = key.encode('utf-8')
+        v = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(k) + len(v) > self.capacity:
+            return False
+        h = _hash(k)
+        expires = time.time() + ttl if ttl else 0.0
+        s = h % self.sets
+        n = s % len(self.locks)
+        if not self._acquire(n):
+            return False
+        try:
+            gen = self.generation
+            i = self._find_slot(s, k, h, gen)
+            self._write(i, gen, k, v, h, expires)
+            _ACCESS.pack_into(self.buf, self._access_offset + i * _ACCESS.size, time.monotonic_ns())
+        finally:
+            self._release(n)
+        return True
+
+    def delete(self, key: str) -> bool:
+        k = key.encode('utf-8')
+        h = _hash(k)
+        s = h % self.sets
+        n = s % len(self.locks)
+        if not self._acquire(n):
+            return False
+        try:
+            gen = self.generation
+            base = s * self.ways
+            for i in range(base, base + self.ways):
+                if self._matches(i, k, h, gen):
+                    self._write(i, 0, b'', b'', 0, 0.0)
+                    return True
+        finally:
+            self._release(n)
+        return False
+
+    def get_or_set(self, key: str, func, ttl: float = None):
+        sentinel = _missing
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = func()
+            self.set(key, value, ttl=ttl)
+        return value
+
+    def clear(self):
+        """
+        Invalidate all entries at once by moving to the next generation.
+        """
+        _HEADER.pack_into(self.buf, 0, _MAGIC, self.generation + 1)
+        # slots left being written by dead writers are odd
+        for n in range(len(self.locks)):
+            if not self._acquire(n):
+                continue
+            try:
+                for s in range(n, self.sets, len(self.locks)):
+                    for i in range(s * self.ways, (s + 1) * self.ways):
+                        off = self._slots_offset + i * self.slot_size
+                        seq = _SEQ.unpack_from(self.buf, off)[0]
+                        if seq & 1:
+                            _SEQ.pack_into(self.buf, off, seq + 1)
+            finally:
+                self._release(n)
+
+    def _acquire(self, n) -> bool:
+        lock = self.locks[n]
+        deadline = time.monotonic() + self.lock_timeout
+        while not lock.acquire(False):
+            if self._release_dead_owner(n):
+                continue
+            if time.monotonic() >= deadline:
+                log.warning('Timed out acquiring lock %s of the shared cache', n)
+                return False
+            # cooperative once patched by gevent
+            time.sleep(LOCK_RETRY_INTERVAL)
+        _OWNER.pack_into(self.buf, self._owners_offset + n * _OWNER.size, os.getpid())
+        return True
+
+    def _release(self, n):
+        _OWNER.pack_into(self.buf, self._owners_offset + n * _OWNER.size, 0)
+        self.locks[n].release()
+
+    def _release_dead_owner(self, n) -> bool:
+        if not self._recover_lock.acquire(False):
+            # being recovered by another writer
+            return False
+        try:
+            # checked again, the lock may have been released by another writer meanwhile
+            owner = _OWNER.unpack_from(self.buf, self._owners_offset + n * _OWNER.size)[0]
+            if not owner or _is_alive(owner):
+                return False
+            log.warning('Released lock %s of the shared cache held by dead process %s', n, owner)
+            _OWNER.pack_into(self.buf, self._owners_offset + n * _OWNER.size, 0)
+            self.locks[n].release()
+            return True
+        finally:
+            self._recover_lock.release()
+
+    def _read(self, i, k, h, gen, now):
+        off = self._slots_offset + i * self.slot_size
+        buf = self.buf
+        for _ in range(100):
+            seq, slot_gen, klen, vlen, slot_hash, expires = _SLOT_HEADER.unpack_from(buf, off)
+            if seq & 1:
+                # being written
+                continue
+            if slot_gen != gen or slot_hash != h or klen != len(k):
+                return None
+            start = off + _SLOT_HEADER.size
+            data = buf[start:start + klen + vlen]
+            if _SEQ.unpack_from(buf, off)[0] != seq:
+                continue
+            if data[:klen] != k or (expires and expires <= now):
+                return None
+            return data[klen:]
+        return None
+
+    def _matches(self, i, k, h, gen) -> bool:
+        off = self._slots_offset + i * self.slot_size
+        _, slot_gen, klen, _, slot_hash, _ = _SLOT_HEADER.unpack_from(self.buf, off)
+        if slot_gen != gen or slot_hash != h or klen != len(k):
+            return False
+        start = off + _SLOT_HEADER.size
+        return self.buf[start:start + klen] == k
+
+    def _find_slot(self, s, k, h, gen) -> int:
+        base = s * self.ways
+        now = time.time()
+        free = None
+        lru, lru_access = base, None
+        for i in range(base, base + self.ways):
+            off = self._slots_offset + i * self.slot_size
+            _, slot_gen, klen, _, slot_hash, expires = _SLOT_HEADER.unpack_from(self.buf, off)
+            if slot_gen != gen or (expires and expires <= now):
+                if free is None:
+                    free = i
+                continue
+            if slot_hash == h and klen == len(k) and self._matches(i, k, h, gen):
+                return i
+            access = _ACCESS.unpack_from(self.buf, self._access_offset + i * _ACCESS.size)[0]
+            if lru_access is None or access < lru_access:
+                lru, lru_access = i, access
+        return lru if free is None else free
+
+    def _write(self, i, gen, k, v, h, expires):
+        off = self._slots_offset + i * self.slot_size
+        buf = self.buf
+        # even again if a dead writer left it odd
+        seq = (_SEQ.unpack_from(buf, off)[0] + 1) & ~1
+        _SEQ.pack_into(buf, off, seq + 1)
+        _SLOT_HEADER.pack_into(buf, off, seq + 1, gen, len(k), len(v), h, expires)
+        start = off + _SLOT_HEADER.size
+        buf[start:start + len(k) + len(v)] = k + v
+        _TAG.pack_into(buf, self._tags_offset + i * _TAG.size, h)
+        _SEQ.pack_into(buf, off, seq + 2)
+
+
+_missing = object()
+
+
+def _hash(k: bytes) -> int:
+    # the same in all workers, unlike hash() of str which is salted for each interpreter
+    return int.from_bytes(hashlib.blake2b(k, digest_size=8).digest(), 'little')
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+_options = {}
+
+_cache = None
+
+
+def configure_shared_cache(slots: int, slot_size: int):
+    _options.update(slots=slots, slot_size=slot_size)
+
+
+def shared_cache() -> SharedCache:
+    """
+    The cache shared by workers, or a cache of the current process if it is not served by gunicorn
+    with ``shared_cache_slots``.
+    """
+    global _cache
+    if _cache is None:
+        _cache = SharedCache(**_options)
+    return _cache
+
+
+def create_shared_cache(server):
+    """
+    Create the cache in the master before workers are forked.
+    """
+    cache = shared_cache()
+    server.log.info('Shared cache of %s slots of %s bytes', cache.slots, cache.slot_size)
+
+
+def invalidate_shared_cache(server):
+    if _cache is not None:
+        _cache.clear()
+        server.log.info('Invalidated shared cache on reload')
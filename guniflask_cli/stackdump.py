@@ -0,0 +1,113 @@
+import faulthandler
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+
+from .master_thread import MasterThread
+from .workers import gevent_patched
+
+# the signal asking a worker to dump its stacks, it is not used by gunicorn workers
+DUMP_SIGNAL = signal.SIGUSR2
+
+
+def format_stacks() -> str:
+    """
+    Format the stacks of all threads, and all greenlets if patched by gevent.
+    """
+    if gevent_patched():
+        from gevent.util import format_run_info
+
+        return '\n'.join(format_run_info())
+    lines = []
+    names = {t.ident: t.name for t in threading.enumerate()}
+    for ident, frame in sys._current_frames().items():
+        lines.append(f'Thread {names.get(ident, ident)} (ident: {ident}):')
+        lines.extend(i.rstrip('\n') for i in traceback.format_stack(frame))
+    return '\n'.join(lines)
+
+
+def install_stack_dump(worker):
+    """
+    Make the worker dump its stacks on ``DUMP_SIGNAL`` and on fatal errors.
+
+    faulthandler writes the stacks of threads at once from the C signal handler, even if the worker
+    is blocked in C code. Then the Python handler logs the stacks of greenlets when it gets the chance.
+    """
+    fd = _error_log_fileno(worker.log)
+
+    def _dump(signum, frame):
+        worker.log.error('Stacks of worker (pid: %s):\n%s', os.getpid(), format_stacks())
+
+    signal.signal(DUMP_SIGNAL, _dump)
+    # dup the fd so that it is still valid after the error log is reopened
+    fd = os.dup(fd)
+    faulthandler.enable(file=fd, all_threads=True)
+    faulthandler.register(DUMP_SIGNAL, file=fd, all_threads=True, chain=True)
+
+
+def dump_stacks_on_abort(worker):
+    worker.log.error('Stacks of worker (pid: %s) on abort:\n%s', os.getpid(), format_stacks())
+
+
+def _error_log_fileno(logger) -> int:
+    error_log = getattr(logger, 'error_log', None)
+    for h in getattr(error_log, 'handlers', []):
+        stream = getattr(h, 'stream', None)
+        if stream is not None:
+            try:
+                return stream.fileno()
+            except (OSError, ValueError, AttributeError):
+                pass
+    return sys.stderr.fileno()
+
+
+class StuckWorkerMonitor(MasterThread):
+    """
+    Ask workers to dump their stacks when they have not notified the master
+    for ``stack_dump_fraction`` of ``timeout``, before they are killed for the timeout.
+    """
+
+    name = 'stuck-worker-monitor'
+
+    def __init__(self, server):
+        super().__init__(server)
+        self.dumped = {}
+
+    @property
+    def interval(self):
+        timeout = self.server.timeout
+        return min(1.0, timeout / 10) if timeout else 1.0
+
+    def check(self):
+        timeout = self.server.timeout
+        if not timeout:
+            return
+        threshold = timeout * self.server.cfg.stack_dump_fraction
+        workers = self.workers()
+        for pid in list(self.dumped):
+            if pid not in workers:
+                del self.dumped[pid]
+        now = time.monotonic()
+        for pid, worker in workers.items():
+            try:
+                last_update = worker.tmp.last_update()
+            except (OSError, ValueError):
+                continue
+            if now - last_update < threshold or self.dumped.get(pid) == last_update:
+                continue
+            self.log.warning('Worker (pid: %s) has not responded for %.1f seconds, dumping its stacks',
+                             pid, now - last_update)
+            try:
+                os.kill(pid, DUMP_SIGNAL)
+            except OSError:
+                continue
+            # dump once for each stall
+            self.dumped[pid] = last_update
+
+
+def start_stuck_worker_monitor(server):
+    if server.cfg.stack_dump:
+        StuckWorkerMonitor.start(server)
@@ -3,6 +3,7 @@ import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from guniflask.config import Settings
+from guniflask_cli.db_pool import configure_db_pool
 
 log = logging.getLogger(__name__)
 
@@ -24,4 +25,5 @@ def init_app(app: Flask, settings: Settings):
 
 def _init_sqlalchemy(app, settings):
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_db_pool(app)
     db.init_app(app)
@@ -0,0 +1,49 @@
+import json
+import os
+from os.path import join, dirname
+
+import pytest
+
+BASELINE_FILE = join(dirname(__file__), 'baseline.json')
+
+
+class Baseline:
+    """
+    Median latencies of benchmarks, a benchmark fails if it is slower than its baseline by the threshold.
+
+    Run with ``BENCHMARK_UPDATE_BASELINE=1`` on the machine running CI to record the baseline.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        with open(fname, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.threshold = data.get('threshold', 0.25)
+        self.benchmarks = data.get('benchmarks', {})
+        self.update = bool(os.environ.get('BENCHMARK_UPDATE_BASELINE'))
+
+    def check(self, name, benchmark):
+        if benchmark.stats is None:
+            # benchmarks are disabled
+            return
+        median = benchmark.stats.stats.median
+        if self.update:
+            self.benchmarks[name] = median
+            return
+        expected = self.benchmarks.get(name)
+        if expected is not None and median > expected * (1 + self.threshold):
+            pytest.fail(f'{name} regressed: median {median * 1000:.3f}ms, '
+                        f'baseline {expected * 1000:.3f}ms (threshold {self.threshold:.0%})')
+
+    def save(self):
+        with open(self.fname, 'w', encoding='utf-8') as f:
+            json.dump({'threshold': self.threshold, 'benchmarks': self.benchmarks}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+@pytest.fixture(scope='session')
+def baseline():
+    b = Baseline(BASELINE_FILE)
+    yield b
+    if b.update:
+        b.save()
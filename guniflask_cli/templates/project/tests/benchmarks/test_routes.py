@@ -0,0 +1,15 @@
+import pytest
+
+# routes to benchmark, add the critical routes of the application
+ROUTES = [
+    '/health',
+]
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_get_route(benchmark, client, baseline, route):
+    resp = client.get(route)
+    assert resp.status_code < 500
+
+    benchmark(client.get, route)
+    baseline.check(f'GET {route}', benchmark)
@@ -1,9 +1,24 @@
 import pytest
-from guniflask.test import app_test_client
+from guniflask.app import create_app
+from guniflask.test.env import set_test_env
+
+# fail tests whose requests issue N+1 queries or exceed the query_budget in pytest.ini
+# pytest_plugins = ['guniflask_cli.pytest_plugin']
+
+
+@pytest.fixture(scope='session')
+def app():
+    """
+    The app is created once per test session rather than for each test.
+    """
+    set_test_env()
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield app
 
 
 @pytest.fixture
-def client():
-    with app_test_client() as client:
-        client.application.config['TESTING'] = True
+def client(app):
+    with app.test_client() as client:
         yield client
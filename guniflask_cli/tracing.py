@@ -0,0 +1,296 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+
+# literals and lists of values do not change the shape of a statement
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_number_literal = re.compile(r'(?<![\w$.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', re.IGNORECASE)
+_placeholder = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+|\?')
+_value_list = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_values_rows = re.compile(r'(values\s*\(\?\))(?:\s*,\s*\(\?\))+', re.IGNORECASE)
+_whitespace = re.compile(r'\s+')
+
+
+# statements issued by an app are few, mostly compiled and cached by SQLAlchemy
+@lru_cache(maxsize=4096)
+def statement_fingerprint(statement: str) -> str:
+    """
+    Normalize a SQL statement so that statements differing only in parameters share a fingerprint.
+    """
+    s = _string_literal.sub('?', statement)
+    s = _placeholder.sub('?', s)
+    s = _number_literal.sub('?', s)
+    s = _whitespace.sub(' ', s).strip().lower()
+    s = _value_list.sub('(?)', s)
+    return _values_rows.sub(r'\1', s)
+
+
+def fingerprint_id(fingerprint: str) -> str:
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+class SqlEventListener:
+    """
+    Time every statement executed through SQLAlchemy engines and pass it to a callback.
+
+    The callback takes the statement, the number of rows affected and the duration in seconds.
+    Listening on the Engine class covers all engines, including those created later by Flask-SQLAlchemy.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def listen(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(Engine, 'handle_error', self.handle_error)
+
+    def remove(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        event.remove(Engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.remove(Engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.remove(Engine, 'handle_error', self.handle_error)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('guniflask_query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('guniflask_query_start')
+        if not stack:
+            return
+        duration = time.perf_counter() - stack.pop()
+        rowcount = getattr(cursor, 'rowcount', -1)
+        self.callback(statement, rowcount if rowcount is not None and rowcount >= 0 else None, duration)
+
+    def handle_error(self, context):
+        stack = context.connection.info.get('guniflask_query_start') if context.connection is not None else None
+        if not stack:
+            return
+        duration = time.perf_counter() - stack.pop()
+        self.callback(context.statement or '', None, duration, error=type(context.original_exception).__name__)
+
+
+class Tracer:
+    """
+    Record a span for each request and a child span for each SQL statement executed while serving it.
+
+    Whether a trace is exported is decided by the trace id when the request starts (head sampling),
+    but the spans are recorded anyway so that slow and failed requests are always exported.
+    """
+
+    def __init__(self, exporter, sample_rate: float = 1.0, slow_threshold: float = None,
+                 max_spans: int = 1000, trace_id_header: str = None):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_spans = max_spans
+        self.trace_id_header = trace_id_header.upper() if trace_id_header else None
+        self.local = threading.local()
+        self.sql_listener = SqlEventListener(self.on_query)
+
+    def install(self):
+        from flask import request_started
+
+        self.sql_listener.listen()
+        request_started.connect(self.on_flask_request, weak=False)
+
+    def pre_request(self, worker, req):
+        trace_id = None
+        if self.trace_id_header:
+            for k, v in req.headers:
+                if k == self.trace_id_header:
+                    trace_id = v
+                    break
+        self.start_trace(f'{req.method} {req.path}', trace_id=trace_id)
+
+    def post_request(self, worker, req, environ, resp):
+        status = getattr(resp, 'status_code', None) if resp is not None else None
+        self.end_trace(status=status, bytes=getattr(resp, 'sent', None) if resp is not None else None)
+
+    def start_trace(self, name: str, trace_id: str = None):
+        trace_id = trace_id or os.urandom(16).hex()
+        self.local.trace = {
+            'trace_id': trace_id,
+            'name': name,
+            'sampled': self.is_sampled(trace_id),
+            'start': time.time(),
+            'start_counter': time.perf_counter(),
+            'spans': [],
+            'dropped_spans': 0,
+            'sql_count': 0,
+            'sql_duration': 0.0,
+        }
+
+    def end_trace(self, **attrs):
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            return None
+        self.local.trace = None
+        duration = time.perf_counter() - trace['start_counter']
+        status = attrs.get('status')
+        keep = trace['sampled'] \
+            or (self.slow_threshold is not None and duration * 1000 >= self.slow_threshold) \
+            or (status is not None and status >= 500)
+        if not keep:
+            return None
+        record = {
+            'time': datetime.fromtimestamp(trace['start']).astimezone().isoformat(timespec='milliseconds'),
+            'trace_id': trace['trace_id'],
+            'name': trace['name'],
+            'route': trace.get('route'),
+            'pid': os.getpid(),
+            'duration_us': int(duration * 1e6),
+            'sql_count': trace['sql_count'],
+            'sql_duration_us': int(trace['sql_duration'] * 1e6),
+            'sampled': trace['sampled'],
+        }
+        record.update(attrs)
+        record['spans'] = trace['spans']
+        if trace['dropped_spans']:
+            record['dropped_spans'] = trace['dropped_spans']
+        self.exporter.export(record)
+        return record
+
+    def is_sampled(self, trace_id: str) -> bool:
+        if self.sample_rate >= 1:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        # the same decision for the same trace id in every service
+        return zlib.crc32(trace_id.encode('utf-8')) % 10000 < self.sample_rate * 10000
+
+    def on_flask_request(self, sender, **kwargs):
+        from flask import request
+
+        trace = getattr(self.local, 'trace', None)
+        if trace is not None and request.url_rule is not None:
+            trace['route'] = request.url_rule.rule
+
+    def on_query(self, statement, rows, duration, error=None):
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            return
+        trace['sql_count'] += 1
+        trace['sql_duration'] += duration
+        if len(trace['spans']) >= self.max_spans:
+            trace['dropped_spans'] += 1
+            return
+        fingerprint = statement_fingerprint(statement)
+        span = {
+            'name': 'sql',
+            'fingerprint': fingerprint,
+            'fingerprint_id': fingerprint_id(fingerprint),
+            'offset_us': int((time.perf_counter() - duration - trace['start_counter']) * 1e6),
+            'duration_us': int(duration * 1e6),
+            'rows': rows,
+        }
+        if error:
+            span['error'] = error
+        trace['spans'].append(span)
+
+
+class JsonLinesExporter:
+    """
+    Append records as JSON lines to a file shared by workers, rotating it by size.
+
+    Each record is written by a single ``write`` on a file opened for appending, so that lines of
+    workers do not interleave. The worker exceeding the size rotates the file under a lock,
+    the others reopen the file once they notice it has been rotated.
+    """
+
+    def __init__(self, path: str, max_bytes: int = None, backup_count: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.fd = None
+        self._lock = threading.Lock()
+        self._checked = 0
+
+    def export(self, record: dict):
+        data = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            if self.fd is None or self._rotated():
+                self._open()
+            os.write(self.fd, data)
+            if self.max_bytes and os.fstat(self.fd).st_size >= self.max_bytes:
+                self._rotate()
+
+    def close(self):
+        with self._lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def _open(self):
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _rotated(self) -> bool:
+        # stat the path at most once a second
+        now = time.monotonic()
+        if now - self._checked < 1:
+            return False
+        self._checked = now
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self.fd).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _rotate(self):
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # another worker may have rotated the file
+                if os.stat(self.path).st_ino == os.fstat(self.fd).st_ino:
+                    for i in range(self.backup_count - 1, 0, -1):
+                        src = f'{self.path}.{i}'
+                        if os.path.exists(src):
+                            os.replace(src, f'{self.path}.{i + 1}')
+                    if self.backup_count > 0:
+                        os.replace(self.path, f'{self.path}.1')
+                    else:
+                        os.truncate(self.path, 0)
+            except FileNotFoundError:
+                pass
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        self._open()
+
+
+_tracer = None
+
+
+def install_tracing(worker):
+    """
+    Start tracing requests of the worker, the spans are exported to ``tracing_file``.
+    """
+    global _tracer
+    cfg = worker.cfg
+    exporter = JsonLinesExporter(cfg.tracing_file, max_bytes=cfg.tracing_max_bytes,
+                                 backup_count=cfg.tracing_backup_count)
+    _tracer = Tracer(exporter, sample_rate=cfg.tracing_sample_rate, slow_threshold=cfg.tracing_slow_threshold,
+                     trace_id_header=cfg.access_log_request_id_header)
+    _tracer.install()
+
+
+def trace_pre_request(worker, req):
+    if _tracer is not None:
+        _tracer.pre_request(worker, req)
+
+
+def trace_post_request(worker, req, environ, resp):
+    if _tracer is not None:
+        _tracer.post_request(worker, req, environ, resp)
@@ -0,0 +1,98 @@
+import logging
+import time
+from contextlib import nullcontext
+
+from flask import Flask
+
+from .workers import gevent_patched
+
+log = logging.getLogger(__name__)
+
+WARMUP_EXTENSION = 'guniflask_warmup'
+
+# the header marking synthetic requests, so that views can skip side effects
+WARMUP_HEADER = 'X-Guniflask-Warmup'
+
+
+def register_warmup(app: Flask, func=None):
+    """
+    Register a callable taking the app, which is invoked in each worker before it accepts requests.
+
+    It can be used as a decorator once the app is available, e.g. in ``init_app``.
+    """
+    if func is None:
+        return lambda f: register_warmup(app, f)
+    app.extensions.setdefault(WARMUP_EXTENSION, []).append(func)
+    return func
+
+
+def parse_warmup_request(s: str) -> tuple:
+    """
+    Parse ``'GET /health'`` or ``'/health'`` into the method and the path.
+    """
+    parts = s.split(None, 1)
+    if len(parts) == 1:
+        return 'GET', parts[0]
+    return parts[0].upper(), parts[1].strip()
+
+
+def warm_up(app: Flask, requests=(), timeout: float = None, logger=None) -> bool:
+    """
+    Invoke the registered warm-up callables, then replay the requests through the app in process.
+
+    A step running past the timeout is interrupted under gevent. Otherwise the remaining steps are skipped
+    once the timeout is reached. Return whether all steps have been done.
+    """
+    logger = logger or log
+    steps = [(_name(f), f) for f in app.extensions.get(WARMUP_EXTENSION, [])]
+    if requests:
+        client = app.test_client()
+        for r in requests:
+            method, path = parse_warmup_request(r)
+            steps.append((f'{method} {path}', _request_step(client, method, path, logger)))
+    if not steps:
+        return True
+
+    start = time.monotonic()
+    deadline = start + timeout if timeout else None
+    for name, step in steps:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            logger.warning('Warm-up timed out after %.1f seconds, skipped the rest from %s', timeout, name)
+            return False
+        try:
+            with _timeout(remaining):
+                step(app)
+        except _Timeout:
+            logger.warning('Warm-up timed out after %.1f seconds in %s', timeout, name)
+            return False
+        except Exception:
+            logger.exception('Error in warm-up step %s', name)
+    logger.info('Warmed up in %.0f ms with %s steps', (time.monotonic() - start) * 1000, len(steps))
+    return True
+
+
+def _request_step(client, method, path, logger):
+    def step(app):
+        resp = client.open(path, method=method, headers={WARMUP_HEADER: '1'})
+        if resp.status_code >= 500:
+            logger.warning('Warm-up request %s %s responded %s', method, path, resp.status)
+        resp.close()
+
+    return step
+
+
+def _name(func) -> str:
+    return getattr(func, '__qualname__', None) or repr(func)
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _timeout(seconds):
+    if seconds is None or not gevent_patched():
+        return nullcontext()
+    from gevent import Timeout
+
+    return Timeout(seconds, _Timeout)
@@ -0,0 +1,115 @@
+import os
+import signal
+import time
+
+from .master_thread import MasterThread
+
+
+class MemoryWatchdog(MasterThread):
+    """
+    Recycle workers whose memory grows above the soft limit and kill those above the hard limit.
+
+    A worker is recycled gracefully only if the workers which are serving, excluding those being
+    recycled or just spawned, stay at least at the capacity floor afterwards.
+    """
+
+    name = 'memory-watchdog'
+
+    def __init__(self, server):
+        super().__init__(server)
+        self.first_seen = {}
+        self.recycling = {}
+
+    @property
+    def interval(self):
+        return self.server.cfg.memory_check_interval
+
+    def check(self):
+        cfg = self.server.cfg
+        soft_limit = cfg.memory_soft_limit
+        hard_limit = cfg.memory_hard_limit
+        workers = self.workers()
+        now = time.monotonic()
+        for pid in list(self.first_seen):
+            if pid not in workers:
+                del self.first_seen[pid]
+                self.recycling.pop(pid, None)
+        for pid in workers:
+            self.first_seen.setdefault(pid, now)
+
+        usage = {}
+        for pid in workers:
+            info = memory_info(pid)
+            if info:
+                usage[pid] = info
+
+        if hard_limit:
+            for pid, info in usage.items():
+                mem = info.get(cfg.memory_metric, info['rss'])
+                if mem > hard_limit:
+                    self.log.warning('Killing worker (pid: %s) above the hard memory limit %s: %s',
+                                     pid, format_size(hard_limit), format_memory_info(info))
+                    self.server.kill_worker(pid, signal.SIGKILL)
+                    self.recycling[pid] = now
+
+        if soft_limit:
+            ready = [pid for pid in workers
+                     if pid not in self.recycling and now - self.first_seen[pid] >= self.interval]
+            floor = int(self.server.num_workers * cfg.memory_capacity_floor)
+            candidates = []
+            for pid, info in usage.items():
+                mem = info.get(cfg.memory_metric, info['rss'])
+                if mem > soft_limit and pid not in self.recycling:
+                    candidates.append((mem, pid, info))
+            for mem, pid, info in sorted(candidates, reverse=True):
+                if pid not in ready or len(ready) - 1 < floor:
+                    self.log.debug('Deferred recycling worker (pid: %s) above the soft memory limit %s '
+                                   'to keep %s of %s workers serving: %s',
+                                   pid, format_size(soft_limit), floor, self.server.num_workers,
+                                   format_memory_info(info))
+                    continue
+                self.log.info('Recycling worker (pid: %s) above the soft memory limit %s: %s',
+                              pid, format_size(soft_limit), format_memory_info(info))
+                self.server.kill_worker(pid, signal.SIGTERM)
+                self.recycling[pid] = now
+                ready.remove(pid)
+
+
+def start_memory_watchdog(server):
+    if server.cfg.memory_soft_limit or server.cfg.memory_hard_limit:
+        MemoryWatchdog.start(server)
+
+
+_page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def memory_info(pid) -> dict:
+    """
+    RSS and PSS (if available) of a process in bytes, or None if the process is gone.
+    """
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            info = {'rss': int(f.read().split()[1]) * _page_size}
+    except (OSError, IndexError, ValueError):
+        return None
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    info['pss'] = int(line.split()[1]) * 1024
+                    break
+    except (OSError, IndexError, ValueError):
+        pass
+    return info
+
+
+def format_size(n) -> str:
+    if n < 1024 * 1024:
+        return f'{n / 1024:.1f}KiB'
+    if n < 1024 * 1024 * 1024:
+        return f'{n / 1024 / 1024:.1f}MiB'
+    return f'{n / 1024 / 1024 / 1024:.2f}GiB'
+
+
+def format_memory_info(info: dict) -> str:
+    return ', '.join(f'{k}={format_size(v)}' for k, v in info.items())
@@ -0,0 +1,117 @@
+import logging
+import os
+import sys
+from importlib.util import find_spec
+
+from .errors import ConfigError
+
+log = logging.getLogger(__name__)
+
+GUNICORN_ASGI_WORKER = 'gunicorn.workers.gasgi.ASGIWorker'
+UVICORN_WORKER = 'uvicorn.workers.UvicornWorker'
+
+DB_DRIVERS = ['pymysql', 'MySQLdb', 'psycopg2', 'psycopg', 'pymssql', 'cx_Oracle', 'oracledb']
+
+
+def resolve_worker_class(worker_class):
+    """
+    Resolve the ``asgi`` alias to a worker class, other values are passed to gunicorn as they are.
+    """
+    if worker_class == 'asgi':
+        if find_spec('uvicorn') is not None or find_spec('gunicorn.workers.gasgi') is None:
+            return UVICORN_WORKER
+        return GUNICORN_ASGI_WORKER
+    return worker_class
+
+
+def worker_type(worker_class, threads: int = 1):
+    """
+    Return ``sync``, ``gthread``, ``gevent`` or ``asgi`` for a worker class, or None if it is unknown.
+    """
+    if worker_class is None:
+        return None
+    if not isinstance(worker_class, str):
+        worker_class = f'{worker_class.__module__}.{worker_class.__name__}'
+    if worker_class in ('asgi', GUNICORN_ASGI_WORKER, UVICORN_WORKER):
+        return 'asgi'
+    if worker_class == 'sync' or worker_class.endswith('SyncWorker'):
+        return 'gthread' if threads and threads > 1 else 'sync'
+    if worker_class == 'gthread' or worker_class.endswith('ThreadWorker'):
+        return 'gthread'
+    if worker_class.startswith('gevent') or '.ggevent.' in worker_class:
+        return 'gevent'
+    return None
+
+
+def worker_concurrency(options: dict) -> int:
+    """
+    The number of requests that a single worker can handle at the same time.
+    """
+    t = worker_type(options.get('worker_class'), options.get('threads'))
+    if t == 'gthread':
+        return options.get('threads') or 1
+    if t in ('gevent', 'asgi'):
+        return options.get('worker_connections') or 1000
+    return 1
+
+
+def apply_worker_defaults(options: dict, cpu_count: int = None):
+    """
+    Fill in ``workers``, ``threads`` and ``worker_connections`` according to the worker class
+    unless they have been configured.
+    """
+    options['worker_class'] = resolve_worker_class(options.get('worker_class', 'gevent'))
+    t = worker_type(options['worker_class'], options.get('threads'))
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if t == 'sync':
+        # CPU-bound, each worker handles one request at a time
+        options.setdefault('workers', 2 * cpu_count + 1)
+    elif t == 'gthread':
+        options.setdefault('workers', cpu_count)
+        options.setdefault('threads', 4)
+    else:
+        options.setdefault('workers', cpu_count)
+        if t in ('gevent', 'asgi'):
+            options.setdefault('worker_connections', 1000)
+
+
+def validate_worker_options(options: dict):
+    worker_class = options.get('worker_class')
+    t = worker_type(worker_class, options.get('threads'))
+    if t == 'gevent':
+        if find_spec('gevent') is None:
+            raise ConfigError('The gevent worker requires gevent to be installed')
+        if not gevent_patched():
+            if options.get('preload_app'):
+                raise ConfigError('preload_app imports the app in the master before gevent monkey-patching, '
+                                  'please disable preload_app or use another worker class')
+            imported = [m for m in DB_DRIVERS if m in sys.modules]
+            if imported:
+                raise ConfigError(f'DB drivers {imported} have been imported before gevent monkey-patching, '
+                                  f'please enable gevent_early_patch')
+        if options.get('threads', 1) > 1:
+            log.warning('threads is ignored by the gevent worker')
+    elif t == 'asgi':
+        if find_spec('a2wsgi') is None and find_spec('asgiref') is None:
+            raise ConfigError('The asgi worker requires a2wsgi or asgiref to bridge the WSGI app')
+        if worker_class == UVICORN_WORKER and find_spec('uvicorn') is None:
+            raise ConfigError('The asgi worker requires uvicorn to be installed')
+        if options.get('threads', 1) > 1:
+            log.warning('threads is ignored by the asgi worker')
+    elif t == 'sync':
+        if options.get('worker_connections') is not None:
+            log.warning('worker_connections is ignored by the sync worker')
+
+
+def wsgi_to_asgi(app):
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        from asgiref.wsgi import WsgiToAsgi
+        return WsgiToAsgi(app)
+    return WSGIMiddleware(app)
+
+
+def gevent_patched() -> bool:
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
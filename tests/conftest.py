@@ -0,0 +1,68 @@
+import logging
+import os
+
+import pytest
+from gunicorn.config import Config
+
+from guniflask_cli import settings  # register guniflask settings of gunicorn
+
+pytest_plugins = ['pytester']
+
+
+class FakeTmp:
+    def __init__(self, last_update):
+        self.value = last_update
+
+    def last_update(self):
+        return self.value
+
+
+class FakeWorker:
+    def __init__(self, last_update=0.0):
+        self.tmp = FakeTmp(last_update)
+
+
+class FakeApp:
+    def __init__(self, options):
+        self.options = options
+
+
+class FakeArbiter:
+    """
+    The parts of the gunicorn arbiter which master threads use, workers killed through it are recorded.
+    """
+
+    def __init__(self, pids=(), **settings):
+        self.cfg = Config()
+        for k, v in settings.items():
+            self.cfg.set(k, v)
+        self.app = FakeApp(dict(settings))
+        self.log = logging.getLogger('test')
+        self.pid = os.getpid()
+        self.timeout = self.cfg.timeout
+        self.WORKERS = {pid: FakeWorker() for pid in pids}
+        self.LISTENERS = []
+        self.num_workers = len(self.WORKERS)
+        self.killed = []
+        self.signals = []
+
+    def kill_worker(self, pid, sig):
+        self.killed.append((pid, sig))
+
+
+@pytest.fixture
+def arbiter(monkeypatch):
+    """
+    Make fake arbiters, signals sent by os.kill are recorded in ``signals`` of the last one instead.
+    """
+    made = []
+
+    def kill(pid, sig):
+        made[-1].signals.append((pid, sig))
+
+    def make(pids=(), **settings):
+        made.append(FakeArbiter(pids, **settings))
+        return made[-1]
+
+    monkeypatch.setattr(os, 'kill', kill)
+    return make
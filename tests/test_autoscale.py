@@ -0,0 +1,163 @@
+import json
+import os
+import signal
+import socket
+import time
+
+from gunicorn.config import Config
+
+from guniflask_cli import autoscale
+from guniflask_cli.autoscale import Autoscaler, WorkerCounters, autoscale_metrics_file, listen_backlog, peak_workers
+from guniflask_cli.gunicorn import GunicornApplication
+
+
+class Worker:
+    pass
+
+
+def test_worker_counters():
+    counters = WorkerCounters(2)
+    a, b, c = Worker(), Worker(), Worker()
+    assert counters.assign(a, []) == 0
+    assert counters.assign(b, [a]) == 1
+    assert counters.assign(c, [a, b]) is None
+    counters.begin(0)
+    counters.begin(0)
+    counters.end(0)
+    assert counters.read(0) == (1, 1)
+    # the slot of an exited worker is reused
+    assert counters.assign(c, [b]) == 0
+    assert counters.read(0) == (0, 0)
+
+
+def test_listen_backlog():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    clients = []
+    try:
+        for _ in range(3):
+            c = socket.create_connection(server.getsockname())
+            clients.append(c)
+        time.sleep(0.1)
+        assert listen_backlog({os.fstat(server.fileno()).st_ino}) == 3
+        assert listen_backlog(set()) == 0
+    finally:
+        for c in clients:
+            c.close()
+        server.close()
+
+
+class App:
+    def __init__(self, **settings):
+        self.cfg = Config()
+        for k, v in settings.items():
+            self.cfg.set(k, v)
+        self.options = {'bind': '127.0.0.1:8000', 'worker_class': 'sync', **settings}
+
+
+def test_db_pool_sized_for_peak_workers(monkeypatch):
+    for k in ('GUNIFLASK_HOST', 'GUNIFLASK_PORT', 'GUNIFLASK_WORKERS', 'GUNIFLASK_WORKER_CONCURRENCY'):
+        monkeypatch.setenv(k, '')
+    GunicornApplication._set_default_env(App(workers=2))
+    assert os.environ['GUNIFLASK_WORKERS'] == '2'
+    GunicornApplication._set_default_env(App(workers=2, autoscale=True))
+    assert os.environ['GUNIFLASK_WORKERS'] == '4'
+    GunicornApplication._set_default_env(App(workers=2, autoscale=True, autoscale_max_workers=3,
+                                             autoscale_min_workers=6))
+    assert os.environ['GUNIFLASK_WORKERS'] == '6'
+    assert peak_workers(App(workers=2, autoscale_max_workers=8).cfg) == 8
+
+
+def make_autoscaler(arbiter, monkeypatch, workers, busy=0, **settings):
+    """
+    An autoscaler of sync workers, ``busy`` of which serve a request, deciding on the last 3 samples.
+    """
+    options = dict(worker_class='sync', autoscale_interval=1, autoscale_window=3, autoscale_cooldown=0)
+    options.update(settings)
+    server = arbiter(list(range(1, workers + 1)), workers=workers, **options)
+    counters = WorkerCounters(16)
+    monkeypatch.setattr(autoscale, '_counters', counters)
+    for w in server.WORKERS.values():
+        counters.assign(w, server.WORKERS.values())
+    set_busy(server, busy)
+    return Autoscaler(server)
+
+
+def set_busy(server, busy):
+    counters = autoscale._counters
+    for i, w in enumerate(server.WORKERS.values()):
+        slot = w._guniflask_slot
+        while counters.read(slot)[0] < (i < busy):
+            counters.begin(slot)
+        while counters.read(slot)[0] > (i < busy):
+            counters.end(slot)
+
+
+def check(scaler, times=1):
+    for _ in range(times):
+        scaler.check()
+    return scaler.server.signals
+
+
+def test_scale_up_on_utilization(arbiter, monkeypatch):
+    scaler = make_autoscaler(arbiter, monkeypatch, 2, busy=2)
+    assert check(scaler, 2) == []
+    assert check(scaler) == [(os.getpid(), signal.SIGTTIN)]
+    # decides again on a full window of samples with the new workers
+    assert len(check(scaler, 2)) == 1
+    assert len(check(scaler)) == 2
+
+
+def test_scale_up_on_sustained_backlog(arbiter, monkeypatch):
+    backlog = [5, 0, 5, 5, 5]
+    monkeypatch.setattr(autoscale, 'listen_backlog', lambda inodes: backlog.pop(0))
+    scaler = make_autoscaler(arbiter, monkeypatch, 2)
+    assert check(scaler, 4) == []
+    assert check(scaler) == [(os.getpid(), signal.SIGTTIN)]
+
+
+def test_scale_down_after_quiet_window(arbiter, monkeypatch):
+    scaler = make_autoscaler(arbiter, monkeypatch, 3, busy=2)
+    assert check(scaler) == []
+    set_busy(scaler.server, 0)
+    # the busy sample is still in the window
+    assert check(scaler, 2) == []
+    assert check(scaler) == [(os.getpid(), signal.SIGTTOU)]
+
+
+def test_cooldown(arbiter, monkeypatch):
+    scaler = make_autoscaler(arbiter, monkeypatch, 3, autoscale_cooldown=60)
+    assert check(scaler, 5) == []
+    scaler.last_change -= 60
+    assert check(scaler) == [(os.getpid(), signal.SIGTTOU)]
+
+
+def test_clamp_workers(arbiter, monkeypatch):
+    # at once, regardless of the window and the cooldown
+    scaler = make_autoscaler(arbiter, monkeypatch, 1, autoscale_min_workers=2, autoscale_cooldown=60)
+    assert check(scaler) == [(os.getpid(), signal.SIGTTIN)]
+    scaler = make_autoscaler(arbiter, monkeypatch, 5, autoscale_max_workers=4, autoscale_cooldown=60)
+    assert check(scaler) == [(os.getpid(), signal.SIGTTOU)]
+
+    # neither above the maximum nor below the minimum
+    scaler = make_autoscaler(arbiter, monkeypatch, 4, busy=4, autoscale_max_workers=4)
+    assert check(scaler, 5) == []
+    scaler = make_autoscaler(arbiter, monkeypatch, 2, autoscale_min_workers=2)
+    assert check(scaler, 5) == []
+
+
+def test_write_metrics(arbiter, monkeypatch, tmpdir):
+    pidfile = str(tmpdir.join('foo.pid'))
+    scaler = make_autoscaler(arbiter, monkeypatch, 2, busy=2, pidfile=pidfile)
+    # the decision of a check is written by the next one
+    check(scaler, 4)
+    with open(autoscale_metrics_file(pidfile)) as f:
+        metrics = json.load(f)
+    assert metrics['pid'] == os.getpid()
+    assert metrics['workers'] == 2
+    assert (metrics['min_workers'], metrics['max_workers']) == (1, 4)
+    assert metrics['inflight'] == 2
+    assert metrics['utilization'] == metrics['average_utilization'] == 1.0
+    assert [d['workers'] for d in metrics['decisions']] == [3]
+    assert os.listdir(str(tmpdir)) == ['foo.autoscale.json']
@@ -0,0 +1,70 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from guniflask_cli.commands.bench import Bench, LoadGenerator, format_table, parse_option_value, percentile
+
+
+def test_percentile():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert percentile(values, 50) == 5
+    assert percentile(values, 90) == 9
+    assert percentile(values, 99) == 10
+    assert percentile(values, 100) == 10
+    assert percentile(values, 0) == 1
+    assert percentile([], 50) == 0.0
+
+
+def test_parse_option_value():
+    assert parse_option_value(' 4 ') == 4
+    assert parse_option_value('gevent') == 'gevent'
+
+
+def test_make_matrix():
+    matrix = list(Bench.make_matrix({'workers': '1, 2', 'worker_class': 'sync,gevent', 'threads': None}))
+    assert matrix == [
+        {'workers': 1, 'worker_class': 'sync'},
+        {'workers': 1, 'worker_class': 'gevent'},
+        {'workers': 2, 'worker_class': 'sync'},
+        {'workers': 2, 'worker_class': 'gevent'},
+    ]
+    assert list(Bench.make_matrix({})) == [{}]
+
+
+def test_format_table():
+    assert format_table(['a', 'name'], [[1, 'x'], [100, 'yy']]).splitlines() == [
+        '  a  name',
+        '---  ----',
+        '  1     x',
+        '100    yy',
+    ]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status = 500 if self.path == '/error' else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def test_load_generator():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        result = LoadGenerator('127.0.0.1', server.server_address[1], ['/health', '/error'], 2, 0.3).run()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result.requests > 0
+    # every other request of each connection fails
+    assert result.requests // 2 <= result.errors <= result.requests // 2 + 2
+    assert result.throughput > 0
+    assert 0 < result.percentile(50) <= result.percentile(100)
@@ -0,0 +1,25 @@
+import socket
+
+from guniflask_cli.binds import default_host_port, parse_bind, parse_binds
+
+
+def test_parse_bind():
+    assert parse_bind('0.0.0.0:8000') == ('tcp', '0.0.0.0', 8000)
+    assert parse_bind('localhost') == ('tcp', 'localhost', 8000)
+    assert parse_bind('[::1]:9000') == ('tcp', '::1', 9000)
+    assert parse_bind('tcp://:9000') == ('tcp', '0.0.0.0', 9000)
+    assert parse_bind('unix:/run/foo.sock') == ('unix', '/run/foo.sock')
+    assert parse_bind('fd://3') == ('fd', 3)
+
+
+def test_default_host_port():
+    binds = parse_binds(['unix:/run/foo.sock', '127.0.0.1:9000'])
+    assert default_host_port(binds, listen_fds=[]) == ('127.0.0.1', 9000)
+    assert default_host_port(parse_binds('unix:/run/foo.sock'), listen_fds=[]) == (None, None)
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        binds = parse_binds(['unix:/run/foo.sock', f'fd://{sock.fileno()}'])
+        assert default_host_port(binds, listen_fds=[]) == ('127.0.0.1', port)
+        assert default_host_port(parse_binds('0.0.0.0:8000'), listen_fds=[sock.fileno()]) == ('127.0.0.1', port)
@@ -0,0 +1,46 @@
+import json
+import os
+import time
+
+from guniflask_cli.commands.build import Build, layer_digest
+
+
+def make_dist(root):
+    root.join('requirements', 'app.txt').write('flask\n', ensure=True)
+    root.join('bin', 'manage').write('#!/bin/sh\n', ensure=True)
+    root.join('conf', 'gunicorn.py').write("bind = '0.0.0.0:8000'\n", ensure=True)
+    root.join('foo', '__init__.py').write('', ensure=True)
+    root.join('foo', 'app.py').write('x = 1\n', ensure=True)
+    root.join('Dockerfile').write('FROM python:3.9-slim\n\nENV TZ=Asia/Shanghai \\\n  PYTHONUNBUFFERED=1\n')
+
+
+def test_make_layers(tmpdir):
+    dist = tmpdir.join('dist')
+    make_dist(dist)
+    build = Build()
+    build.copy_ignore = []
+    build.make_layers(str(dist), 'foo', '1.0')
+    manifest = json.loads(dist.join('layers.json').read())
+    assert [i['name'] for i in manifest['layers']] == ['deps', 'config', 'app']
+    paths = [i['path'] for i in manifest['layers']]
+    assert dist.join(paths[1], 'conf', 'gunicorn.py').exists()
+    assert os.stat(str(dist.join(paths[2], 'foo', 'app.py'))).st_mtime == 315532800
+    dockerfile = dist.join('Dockerfile.layers').read()
+    assert all(p in dockerfile for p in paths)
+    assert 'ENV TZ=Asia/Shanghai' in dockerfile
+    assert 'install -y --no-install-recommends tzdata' in dockerfile
+
+    # only the changed layer gets a new hash
+    time.sleep(0.01)
+    dist.join('foo', 'app.py').write('x = 2\n')
+    build.make_layers(str(dist), 'foo', '1.0')
+    new_paths = [i['path'] for i in json.loads(dist.join('layers.json').read())['layers']]
+    assert new_paths[:2] == paths[:2]
+    assert new_paths[2] != paths[2]
+
+
+def test_layer_digest_ignores_mtime(tmpdir):
+    tmpdir.join('a.py').write('x = 1\n')
+    digest, files, size = layer_digest(str(tmpdir))
+    os.utime(str(tmpdir.join('a.py')), (0, 0))
+    assert layer_digest(str(tmpdir)) == (digest, 1, 6)
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+from os.path import join
+
+from guniflask_cli import __version__
+from guniflask_cli.config_state import app_digests, config_state_file, diff_config_state, installed_distributions, \
+    state_value
+
+
+def test_config_state_file():
+    assert config_state_file('/a/.pid/foo.pid') == '/a/.pid/foo.state.json'
+    assert config_state_file('/a/.pid/foo.1.pid') == '/a/.pid/foo.1.state.json'
+
+
+def test_app_digests(tmpdir):
+    tmpdir.join('foo', 'app.py').write('x = 1\n', ensure=True)
+    tmpdir.join('foo', '__pycache__', 'app.cpython-311.pyc').write('', ensure=True)
+    tmpdir.join('foo', 'README').write('', ensure=True)
+    tmpdir.join('foo', 'templates', 'index.html').write('', ensure=True)
+    tmpdir.join('foo', '.git', 'HEAD').write('', ensure=True)
+    assert list(app_digests(str(tmpdir), 'foo')) == ['foo/README', 'foo/app.py', 'foo/templates/index.html']
+    assert app_digests(str(tmpdir), 'bar') == {}
+
+
+def test_installed_distributions():
+    assert installed_distributions()['gunicorn']
+
+
+def test_diff_config_state():
+    def hook(server):
+        pass
+
+    old = {'active_profiles': 'prod', 'sources': {'gunicorn.py': 'a'}, 'app': {},
+           'gunicorn': {'workers': 2, 'on_starting': state_value('on_starting', hook)}}
+    assert diff_config_state(old, old) == {}
+    new = dict(old, gunicorn={'workers': 4, 'on_starting': state_value('on_starting', hook)})
+    assert diff_config_state(old, new) == {'gunicorn': {'workers': (2, 4)}}
+    new = dict(old, packages={'flask': '3.1.0'})
+    assert diff_config_state(dict(old, packages={'flask': '3.0.0'}), new) == {'packages': {'flask': ('3.0.0', '3.1.0')}}
+
+
+def test_check_app_patched_with_gevent(tmpdir):
+    proj_dir = join(str(tmpdir), 'foo')
+    os.mkdir(proj_dir)
+    with open(join(proj_dir, '.guniflask-init.json'), 'w') as f:
+        json.dump({'cli_version': __version__, 'authentication_type': 'jwt', 'port': 8000, 'project_name': 'foo'}, f)
+    subprocess.run('guniflask init', shell=True, cwd=proj_dir, check=True, stdout=subprocess.DEVNULL)
+    conf = tmpdir.join('foo', 'conf')
+    settings = conf.join('foo.py')
+    settings.write(settings.read().replace("# SQLALCHEMY_DATABASE_URI = ''", "SQLALCHEMY_DATABASE_URI = 'sqlite://'"))
+    conf.join('gunicorn.py').write("worker_class = 'gevent'\npreload_app = True\n", mode='a')
+
+    def check():
+        return subprocess.run([sys.executable, '-c', 'from guniflask_cli.config_state import check_app; check_app()'],
+                              cwd=proj_dir, env=dict(os.environ, GUNIFLASK_ACTIVE_PROFILES='prod'),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    p = check()
+    assert p.returncode == 0, p.stdout
+    # preload_app is rejected without the early patch, as by the master
+    conf.join('gunicorn.py').write('gevent_early_patch = False\n', mode='a')
+    p = check()
+    assert p.returncode == 1 and b'preload_app' in p.stdout
@@ -0,0 +1,28 @@
+from flask import Flask
+
+from guniflask_cli.db_pool import configure_db_pool, pool_options
+
+
+def test_pool_options():
+    assert pool_options(workers=9, concurrency=1) == {
+        'pool_size': 1, 'max_overflow': 0, 'pool_recycle': 1800, 'pool_pre_ping': True}
+    opt = pool_options(workers=4, concurrency=1000)
+    assert (opt['pool_size'], opt['max_overflow']) == (8, 7)
+    opt = pool_options(workers=4, concurrency=1000, budget=50)
+    assert (opt['pool_size'], opt['max_overflow']) == (6, 6)
+    opt = pool_options(workers=4, concurrency=4, budget=50)
+    assert (opt['pool_size'], opt['max_overflow']) == (2, 2)
+
+
+def test_configure_db_pool(monkeypatch):
+    app = Flask('foo')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root@localhost/foo'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_recycle': 600}
+    app.config['DB_CONNECTION_BUDGET'] = 40
+    assert configure_db_pool(app) is None
+
+    monkeypatch.setenv('GUNIFLASK_WORKERS', '8')
+    monkeypatch.setenv('GUNIFLASK_WORKER_CONCURRENCY', '1000')
+    configure_db_pool(app)
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {
+        'pool_size': 3, 'max_overflow': 2, 'pool_recycle': 600, 'pool_pre_ping': True}
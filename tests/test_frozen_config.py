@@ -0,0 +1,69 @@
+import os
+import signal
+
+import pytest
+
+from guniflask_cli.errors import ConfigError
+from guniflask_cli.frozen_config import freeze_config, freeze_value, install_frozen_settings, live_app_settings, \
+    load_frozen_config, write_frozen_config
+
+
+def test_freeze_value():
+    assert freeze_value('a', {'b': (1, 'x'), 'c': None}) == {'b': [1, 'x'], 'c': None}
+    assert freeze_value('h', os.getpid) == 'posix.getpid'
+    assert freeze_value('h', [os.getpid], tag_callables=True) == [{'$callable': 'posix.getpid'}]
+    with pytest.raises(ConfigError):
+        freeze_value('h', ConfigError.__init__)
+    with pytest.raises(ConfigError):
+        freeze_value('h', lambda server: None)
+    with pytest.raises(ConfigError):
+        freeze_value('s', {signal.SIGTERM})
+
+
+def test_load_frozen_config(tmpdir):
+    conf_dir = str(tmpdir)
+    tmpdir.join('gunicorn.py').write("bind = '0.0.0.0:8000'\n")
+    snapshot = freeze_config(conf_dir, 'foo', 'prod', {'bind': '0.0.0.0:8000', 'workers': 2},
+                             {'home': '/tmp', 'DEBUG_SQL': True})
+    assert snapshot['settings'] == {'DEBUG_SQL': True}
+    write_frozen_config(conf_dir, snapshot)
+    assert load_frozen_config(conf_dir, 'prod')['gunicorn']['workers'] == 2
+    # frozen for other profiles
+    assert load_frozen_config(conf_dir, 'dev') is None
+    # stale
+    tmpdir.join('gunicorn.py').write("bind = '0.0.0.0:8080'\n")
+    with pytest.raises(ConfigError):
+        load_frozen_config(conf_dir, 'prod')
+
+    with pytest.raises(ConfigError):
+        freeze_config(conf_dir, 'foo', 'prod', {'workers': 'many'}, {})
+
+
+def test_install_frozen_settings(monkeypatch):
+    from guniflask.app import initializer
+
+    monkeypatch.setattr(initializer, 'load_app_settings', initializer.load_app_settings)
+    monkeypatch.setenv('GUNIFLASK_PORT', '8080')
+    install_frozen_settings({'settings': {'guniflask': {'cors': True}}})
+    settings = initializer.load_app_settings('foo')
+    assert settings['guniflask'] == {'cors': True}
+    assert settings['port'] == 8080
+    assert settings['app_name'] == 'foo'
+
+
+def test_freeze_callables_of_app_settings(tmpdir, monkeypatch):
+    from guniflask.app import initializer
+
+    tmpdir.join('foo.py').write("from os.path import join\n"
+                                "from json import JSONDecoder\n"
+                                "decode = JSONDecoder.decode\n"
+                                "hooks = {'join': [join], 'x': 1}\n")
+    monkeypatch.setenv('GUNIFLASK_CONF_DIR', str(tmpdir))
+    monkeypatch.setattr(initializer, 'load_app_settings', initializer.load_app_settings)
+    live = live_app_settings('foo')
+    snapshot = freeze_config(str(tmpdir), 'foo', None, {}, live)
+    write_frozen_config(str(tmpdir), snapshot)
+    install_frozen_settings(load_frozen_config(str(tmpdir)))
+    settings = initializer.load_app_settings('foo')
+    assert settings == live
+    assert settings['hooks']['join'][0] is os.path.join
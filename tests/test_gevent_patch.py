@@ -0,0 +1,28 @@
+from os.path import join
+
+from guniflask_cli.gevent_patch import early_patch, peek_gunicorn_config
+
+
+def test_peek_gunicorn_config(tmpdir):
+    conf_dir = str(tmpdir)
+    with open(join(conf_dir, 'gunicorn.py'), 'w') as f:
+        f.write("import os\nbind = '0.0.0.0:8000'\nworker_class = 'gevent'\nworkers = os.cpu_count()\n")
+    with open(join(conf_dir, 'gunicorn_prod.json'), 'w') as f:
+        f.write('{"worker_class": "sync"}')
+    assert peek_gunicorn_config(conf_dir) == {'bind': '0.0.0.0:8000', 'worker_class': 'gevent'}
+    assert peek_gunicorn_config(conf_dir, 'prod')['worker_class'] == 'sync'
+
+
+def test_early_patch_only_for_serving_commands(tmpdir, monkeypatch):
+    monkeypatch.setenv('GUNIFLASK_CONF_DIR', str(tmpdir))
+    with open(join(str(tmpdir), 'gunicorn.py'), 'w') as f:
+        f.write("worker_class = 'sync'\n")
+    assert not early_patch(['stop'])
+    assert not early_patch(['start', '-p', 'prod'])
+
+
+def test_early_patch_leaves_config_errors(tmpdir, monkeypatch):
+    monkeypatch.setenv('GUNIFLASK_CONF_DIR', str(tmpdir))
+    with open(join(str(tmpdir), 'gunicorn.yml'), 'w') as f:
+        f.write('workers: [1\n')
+    assert not early_patch(['start'])
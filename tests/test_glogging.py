@@ -0,0 +1,60 @@
+import json
+from datetime import timedelta
+
+from gunicorn.config import Config
+
+from guniflask_cli.glogging import AccessLogSampler, Logger
+
+
+class Response:
+    def __init__(self, status, sent=0):
+        self.status = status
+        self.sent = sent
+        self.headers = []
+
+
+def test_sampler_by_route():
+    sampler = AccessLogSampler(rates={'/health': 0, '/api/*': 0.25})
+    assert not any(sampler.should_log('/health', 200, 10) for _ in range(10))
+    assert sum(sampler.should_log('/api/users', 200, 10) for _ in range(100)) == 25
+    assert all(sampler.should_log('/index', 200, 10) for _ in range(10))
+
+
+def test_sampler_keeps_errors_and_slow_requests():
+    sampler = AccessLogSampler(rates={'*': 0}, slow_threshold=100)
+    assert sampler.should_log('/api', 500, 10)
+    assert sampler.should_log('/api', 200, 100000)
+    assert not sampler.should_log('/api', 200, 99999)
+
+
+def test_sampler_by_request_id():
+    sampler = AccessLogSampler(rates={'*': 0.5})
+    decisions = [sampler.should_log('/api', 200, 10, request_id=str(i)) for i in range(100)]
+    assert decisions == [sampler.should_log('/api', 200, 10, request_id=str(i)) for i in range(100)]
+    assert 0 < sum(decisions) < 100
+
+
+def test_json_access_log(tmpdir):
+    log_file = str(tmpdir.join('access.log'))
+    cfg = Config()
+    cfg.set('accesslog', log_file)
+    cfg.set('access_log_json', True)
+    logger = Logger(cfg)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/api/users',
+        'QUERY_STRING': 'page=1',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_X_REQUEST_ID': 'abc',
+    }
+    logger.access(Response('200 OK', sent=42), None, environ, timedelta(seconds=1, microseconds=5))
+    for h in logger.access_log.handlers:
+        h.flush()
+    with open(log_file) as f:
+        record = json.loads(f.readline())
+    assert record['status'] == 200
+    assert record['bytes'] == 42
+    assert record['duration_us'] == 1000005
+    assert record['request_id'] == 'abc'
+    assert record['path'] == '/api/users'
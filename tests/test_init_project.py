@@ -11,12 +11,13 @@ def show_version():
     assert res.returncode == 0
 
 
-def init_project(proj_dir):
+def init_project(proj_dir, **kwargs):
     settings = {
         'cli_version': __version__,
         'authentication_type': 'jwt',
         'port': 8000,
-        'project_name': 'foo'
+        'project_name': 'foo',
+        **kwargs
     }
     with open(join(proj_dir, '.guniflask-init.json'), 'w') as f:
         json.dump(settings, f)
@@ -29,3 +30,16 @@ def test_init_project(tmpdir, monkeypatch):
     os.mkdir(proj_dir)
     show_version()
     init_project(proj_dir)
+    for name in ['gunicorn.py', 'gunicorn_prod.py', 'gunicorn_dev.py']:
+        assert os.path.isfile(join(proj_dir, 'conf', name))
+
+
+def test_cpu_bound_workers_follow_cpu_share(tmpdir, monkeypatch):
+    proj_dir = join(str(tmpdir), 'foo')
+    os.mkdir(proj_dir)
+    init_project(proj_dir, traffic_profile='cpu_bound')
+    monkeypatch.setenv('GUNIFLASK_CPU_COUNT', '3')
+    config = {}
+    with open(join(proj_dir, 'conf', 'gunicorn_prod.py')) as f:
+        exec(f.read(), config)
+    assert config['workers'] == 3
@@ -0,0 +1,24 @@
+from os.path import join
+
+from guniflask_cli.instances import cpu_sets, instance_path, instance_pidfiles, parse_cpulist
+
+
+def test_instance_path():
+    assert instance_path('/app/.pid/foo.pid', 2) == '/app/.pid/foo.2.pid'
+    assert instance_path('/app/.log/foo.access.log', 0) == '/app/.log/foo.0.access.log'
+    assert instance_path('-', 1) == '-'
+
+
+def test_instance_pidfiles(tmpdir):
+    pidfile = join(str(tmpdir), 'foo.pid')
+    for name in ['foo.10.pid', 'foo.2.pid', 'foo.bar.pid', 'foobar.1.pid']:
+        tmpdir.join(name).write('1')
+    assert instance_pidfiles(pidfile) == [pidfile, join(str(tmpdir), 'foo.2.pid'), join(str(tmpdir), 'foo.10.pid')]
+
+
+def test_cpu_sets():
+    nodes = [parse_cpulist('0-3,8-11'), parse_cpulist('4-7,12-15')]
+    assert cpu_sets(2, nodes) == nodes
+    assert cpu_sets(4, nodes) == [[0, 1, 2, 3], [8, 9, 10, 11], [4, 5, 6, 7], [12, 13, 14, 15]]
+    assert cpu_sets(3, [[0, 1, 2, 3, 4, 5]]) == [[0, 1], [2, 3], [4, 5]]
+    assert cpu_sets(3, [[0, 1]]) == [[0], [0], [1]]
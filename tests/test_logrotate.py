@@ -0,0 +1,48 @@
+import gzip
+from datetime import datetime
+
+from guniflask_cli.logrotate import compress_file, next_rollover, remove_expired, rotate_file, rotated_files
+
+
+def test_rotated_files(tmpdir):
+    log = tmpdir.join('foo.access.log')
+    log.write('')
+    for name in ['foo.access.log.20240101-000000.gz', 'foo.access.log.20240102-000000',
+                 'foo.access.log.20240103-000000.gz', 'foo.access.log.1', 'foo.access.log.20240104-000000.gz.tmp']:
+        tmpdir.join(name).write('')
+    assert [f.rsplit('.log.', 1)[1] for f in rotated_files(str(log))] == \
+           ['20240103-000000.gz', '20240102-000000', '20240101-000000.gz']
+    remove_expired(str(log), 2, 0)
+    assert len(rotated_files(str(log))) == 2
+    assert tmpdir.join('foo.access.log.1').exists()
+
+
+def test_compress_file(tmpdir):
+    f = tmpdir.join('foo.error.log.20240101-000000')
+    f.write('line\n' * 100)
+    compress_file(str(f))
+    assert not f.exists()
+    with gzip.open(str(f) + '.gz', 'rt') as g:
+        assert g.read() == 'line\n' * 100
+
+
+def test_next_rollover():
+    now = datetime(2024, 1, 1, 23, 30, 5)
+    assert next_rollover('hourly', now) == datetime(2024, 1, 2, 0, 0, 0)
+    assert next_rollover('daily', now) == datetime(2024, 1, 2, 0, 0, 0)
+    assert next_rollover('hourly', datetime(2024, 1, 1, 10, 0, 0)) == datetime(2024, 1, 1, 11, 0, 0)
+
+
+def test_rotate_in_the_same_second(tmpdir):
+    log = tmpdir.join('foo.error.log')
+    rotated = []
+    for i in range(3):
+        log.write(f'{i}\n')
+        rotated.append(rotate_file(str(log), '20240101-000000'))
+    assert not log.exists()
+    assert [open(f).read() for f in rotated] == ['0\n', '1\n', '2\n']
+    assert rotated_files(str(log)) == rotated[::-1]
+    assert rotate_file(str(log), '20240101-000000') is None
+    compress_file(rotated[0])
+    assert [f.basename for f in tmpdir.listdir(sort=True)] == \
+           ['foo.error.log.20240101-000000-1', 'foo.error.log.20240101-000000-2', 'foo.error.log.20240101-000000.gz']
@@ -0,0 +1,65 @@
+import logging
+import subprocess
+import sys
+
+import pytest
+
+from guniflask_cli.master_thread import MasterThread
+
+
+class Server:
+    log = logging.getLogger('test')
+
+
+def test_interval_and_check_required():
+    class Thread(MasterThread):
+        interval = 1.0
+
+    with pytest.raises(TypeError):
+        Thread(Server())
+
+    class Checker(Thread):
+        def check(self):
+            pass
+
+    assert Checker(Server()).interval == 1.0
+
+
+MASTER_THREAD_FORK_SCRIPT = """
+import logging, os, sys, time
+from guniflask_cli.gevent_patch import patch_all
+patch_all()
+from guniflask_cli.master_thread import MasterThread
+
+fd = os.open(sys.argv[1], os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+
+
+class Server:
+    pid = os.getpid()
+    log = logging.getLogger('test')
+
+
+class Probe(MasterThread):
+    name = 'probe'
+    interval = 0.05
+
+    def check(self):
+        os.write(fd, b'%d\\n' % os.getpid())
+
+
+Probe.start(Server())
+time.sleep(0.3)
+pid = os.fork()
+if pid == 0:
+    # a greenlet would be scheduled while the worker sleeps
+    time.sleep(0.5)
+    os._exit(0)
+os.waitpid(pid, 0)
+"""
+
+
+def test_master_thread_not_running_in_forked_worker(tmpdir):
+    out = tmpdir.join('checks')
+    subprocess.run([sys.executable, '-c', MASTER_THREAD_FORK_SCRIPT, str(out)], check=True, timeout=30)
+    pids = set(out.read().split())
+    assert len(pids) == 1
@@ -0,0 +1,36 @@
+import sys
+from os.path import join
+
+from guniflask_cli.module_index import ModuleIndex
+
+
+def make_package(root):
+    pkg = root.mkdir('scan_foo')
+    pkg.join('__init__.py').write('')
+    pkg.join('views.py').write("from flask import Blueprint\n\nbp = Blueprint('views', __name__)\n")
+    pkg.join('services.py').write("from guniflask.context import service\n\n\n@service\nclass FooService:\n    pass\n")
+    sub = pkg.mkdir('utils')
+    sub.join('__init__.py').write('')
+    sub.join('helpers.py').write("raise RuntimeError('should not be imported')\n")
+
+
+def test_walk_modules_with_prefilter(tmpdir, monkeypatch):
+    make_package(tmpdir)
+    monkeypatch.syspath_prepend(str(tmpdir))
+    index_file = join(str(tmpdir), '.cache', 'module_index.json')
+    try:
+        index = ModuleIndex(index_file, prefilter=True)
+        assert [i[0] for i in index.find_modules('scan_foo')] == [
+            'scan_foo', 'scan_foo.services', 'scan_foo.utils', 'scan_foo.utils.helpers', 'scan_foo.views']
+        assert 'scan_foo.views' not in sys.modules
+
+        mods = index.walk_modules('scan_foo')
+        assert [m.__name__ for m in mods] == ['scan_foo', 'scan_foo.services', 'scan_foo.views']
+
+        index = ModuleIndex(index_file, prefilter=True)
+        assert index._entries['scan_foo.utils.helpers']['relevant'] is False
+        assert index._entries['scan_foo.views']['relevant'] is True
+    finally:
+        for name in list(sys.modules):
+            if name.startswith('scan_foo'):
+                del sys.modules[name]
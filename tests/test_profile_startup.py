@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+from os.path import join
+
+from guniflask_cli import __version__
+
+BOOT_SCRIPT = """
+import json
+from guniflask_cli.commands.profile_startup import ProfileStartup, StartupProfiler
+
+profiler = StartupProfiler()
+profiler.install()
+try:
+    app = ProfileStartup.boot(profiler)
+finally:
+    profiler.uninstall()
+print(json.dumps({'phases': [n.name for n in profiler.root.children], 'speedscope': profiler.to_speedscope(),
+                  'mark': app.settings['mark']}))
+"""
+
+
+def test_boot_from_frozen_config(tmpdir):
+    proj_dir = join(str(tmpdir), 'foo')
+    os.mkdir(proj_dir)
+    with open(join(proj_dir, '.guniflask-init.json'), 'w') as f:
+        json.dump({'cli_version': __version__, 'authentication_type': 'jwt', 'port': 8000, 'project_name': 'foo'}, f)
+    subprocess.run('guniflask init', shell=True, cwd=proj_dir, check=True, stdout=subprocess.DEVNULL)
+    settings = tmpdir.join('foo', 'conf', 'foo.py')
+    settings.write(settings.read().replace("# SQLALCHEMY_DATABASE_URI = ''", "SQLALCHEMY_DATABASE_URI = 'sqlite://'")
+                   + "\nmark = 'live'\n")
+    env = dict(os.environ, GUNIFLASK_ACTIVE_PROFILES='prod')
+    subprocess.run('guniflask config freeze', shell=True, cwd=proj_dir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    frozen = tmpdir.join('foo', 'conf', '.frozen.json')
+    snapshot = json.loads(frozen.read())
+    snapshot['settings']['mark'] = 'frozen'
+    frozen.write(json.dumps(snapshot))
+
+    p = subprocess.run([sys.executable, '-c', BOOT_SCRIPT], cwd=proj_dir, env=env, check=True,
+                       stdout=subprocess.PIPE)
+    result = json.loads(p.stdout.decode('utf-8').splitlines()[-1])
+    # booted as start would, from the snapshot
+    assert result['mark'] == 'frozen'
+    assert result['phases'] == ['load_config', 'load_app_env', 'load_app_settings', 'make_settings',
+                                'create_bean_context', 'init_app', 'register_blueprints', 'refresh_bean_context']
+    speedscope = result['speedscope']
+    names = [f['name'] for f in speedscope['shared']['frames']]
+    assert '[load_config]' in names and 'foo.app' in names
+    events = speedscope['profiles'][0]['events']
+    assert [e['type'] for e in events].count('O') == [e['type'] for e in events].count('C')
+    assert all(a['at'] <= b['at'] for a, b in zip(events, events[1:]))
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from gunicorn.config import Config
+
+from guniflask_cli.profiler import ProfilerMiddleware, rotate_profiles
+
+
+def slow_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    time.sleep(0.02)
+    return [b'ok']
+
+
+def call(app, path):
+    return b''.join(app({'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}, lambda status, headers: None))
+
+
+def test_profile_matched_routes(tmpdir):
+    output_dir = str(tmpdir.join('profiles'))
+    app = ProfilerMiddleware(slow_app, output_dir, route='/api/*')
+    assert call(app, '/health') == b'ok'
+    assert not os.path.exists(output_dir)
+    assert call(app, '/api/foo') == b'ok'
+    files = sorted(os.listdir(output_dir))
+    assert [os.path.splitext(f)[1] for f in files] == ['.collapsed', '.prof']
+    with open(os.path.join(output_dir, files[0])) as f:
+        assert 'slow_app' in f.read()
+
+
+def test_sampling_profile(tmpdir):
+    output_dir = str(tmpdir)
+    app = ProfilerMiddleware(slow_app, output_dir, mode='sampling', sample_rate=1000)
+    assert call(app, '/') == b'ok'
+    files = os.listdir(output_dir)
+    assert len(files) == 1 and files[0].endswith('-GET-root.collapsed')
+    with open(os.path.join(output_dir, files[0])) as f:
+        assert 'slow_app' in f.read()
+
+
+OVERLAPPING_REQUESTS_SCRIPT = """
+import sys, time
+from gevent import monkey
+monkey.patch_all()
+import gevent
+from guniflask_cli.profiler import ProfilerMiddleware
+
+spans = []
+
+
+def slow_app(environ, start_response):
+    start_response('200 OK', [])
+    start = time.monotonic()
+    # the other request is served meanwhile
+    gevent.sleep(0.05)
+    spans.append((start, time.monotonic()))
+    return [b'ok']
+
+
+app = ProfilerMiddleware(slow_app, sys.argv[1])
+gevent.joinall([gevent.spawn(app, {'PATH_INFO': f'/{i}', 'REQUEST_METHOD': 'GET'}, lambda *args: None)
+                for i in range(2)], raise_error=True)
+(a, b), (c, d) = sorted(spans)
+assert b <= c, spans
+"""
+
+
+def test_overlapping_cprofile_requests(tmpdir):
+    output_dir = str(tmpdir)
+    subprocess.run([sys.executable, '-c', OVERLAPPING_REQUESTS_SCRIPT, output_dir], check=True, timeout=30)
+    files = sorted(os.listdir(output_dir))
+    assert len(files) == 4
+    for f in files:
+        if f.endswith('.collapsed'):
+            with open(os.path.join(output_dir, f)) as fp:
+                assert 'slow_app' in fp.read()
+
+
+def test_rotate_profiles(tmpdir):
+    for i in range(5):
+        p = tmpdir.join(f'{i}.collapsed')
+        p.write('x' * 100)
+        os.utime(str(p), (i, i))
+    rotate_profiles(str(tmpdir), 250)
+    assert sorted(os.listdir(str(tmpdir))) == ['3.collapsed', '4.collapsed']
+
+
+def test_sample_rate_must_be_positive():
+    cfg = Config()
+    cfg.set('request_profiler_sample_rate', '100')
+    assert cfg.request_profiler_sample_rate == 100.0
+    for rate in (0, -1):
+        with pytest.raises(ValueError):
+            cfg.set('request_profiler_sample_rate', rate)
@@ -0,0 +1,62 @@
+APP_CONFTEST = """
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+pytest_plugins = ['guniflask_cli.pytest_plugin']
+
+engine = create_engine('sqlite://')
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+
+    @app.route('/items/<int:n>')
+    def items(n):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text('select :i'), {'i': i})
+        return 'ok'
+
+    return app
+"""
+
+
+def test_query_budget(pytester):
+    pytester.makeconftest(APP_CONFTEST)
+    pytester.makeini('[pytest]\nquery_budget = 2\n')
+    pytester.makepyfile("""
+        import pytest
+
+
+        def test_within_budget(app):
+            app.test_client().get('/items/2')
+
+
+        def test_over_budget(app):
+            app.test_client().get('/items/3')
+
+
+        @pytest.mark.query_budget(5)
+        def test_raised_by_marker(app):
+            app.test_client().get('/items/3')
+
+
+        @pytest.mark.query_budget(1)
+        def test_lowered_by_marker(app):
+            app.test_client().get('/items/2')
+
+
+        @pytest.mark.query_budget(None)
+        def test_exempt(app):
+            app.test_client().get('/items/10')
+    """)
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=3, failed=2)
+    result.stdout.fnmatch_lines([
+        '*_ test_over_budget _*',
+        'GET /items/3 (/items/<int:n>) issued 3 queries, over the budget of 2',
+        '*_ test_lowered_by_marker _*',
+        'GET /items/2 (/items/<int:n>) issued 2 queries, over the budget of 1',
+    ])
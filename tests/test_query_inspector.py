@@ -0,0 +1,35 @@
+import logging
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from guniflask_cli.query_inspector import QueryInspector
+
+
+def test_report_n_plus_one_and_slow_queries(caplog):
+    engine = create_engine('sqlite://')
+    app = Flask(__name__)
+
+    @app.route('/items/<int:n>')
+    def items(n):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text('select :i'), {'i': i})
+        return 'ok'
+
+    inspector = QueryInspector(app, burst_threshold=3, slow_threshold=0, logger=logging.getLogger('test'))
+    reports = []
+    inspector.listeners.append(reports.append)
+    try:
+        with caplog.at_level(logging.WARNING, logger='test'):
+            app.test_client().get('/items/2')
+            assert not [r for r in caplog.records if 'N+1' in r.getMessage()]
+            app.test_client().get('/items/3')
+    finally:
+        inspector.sql_listener.remove()
+    assert [r.count for r in reports] == [2, 3]
+    assert reports[1].route == '/items/<int:n>'
+    messages = [r.getMessage() for r in caplog.records]
+    assert any('Possible N+1 queries in GET /items/3 (/items/<int:n>): 3 queries of "select ?"' in m
+               and 'in items' in m for m in messages)
+    assert any(m.startswith('Slow query in GET /items/2') for m in messages)
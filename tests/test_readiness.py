@@ -0,0 +1,39 @@
+import os
+import socket
+from types import SimpleNamespace
+
+from guniflask_cli.readiness import can_connect, mark_master_ready, mark_starting, mark_worker_ready, \
+    read_ready_events, ready_file, tail_file
+
+
+def test_ready_events(tmpdir):
+    pidfile = str(tmpdir.join('foo.pid'))
+    assert ready_file(pidfile) == str(tmpdir.join('foo.ready.jsonl'))
+    tmpdir.join('foo.ready.jsonl').write('{"event": "worker_ready", "pid": 1}\n')
+    cfg = SimpleNamespace(pidfile=pidfile)
+    mark_starting(SimpleNamespace(cfg=cfg))
+    mark_master_ready(SimpleNamespace(cfg=cfg, num_workers=2))
+    mark_worker_ready(SimpleNamespace(cfg=cfg, ppid=os.getpid()))
+    events = read_ready_events(pidfile)
+    assert [e['event'] for e in events] == ['starting', 'master_ready', 'worker_ready']
+    assert events[1]['workers'] == 2
+    assert read_ready_events(str(tmpdir.join('bar.pid'))) == []
+
+
+def test_can_connect():
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    try:
+        assert not can_connect(('tcp', '0.0.0.0', port))
+        s.listen(1)
+        assert can_connect(('tcp', '0.0.0.0', port))
+    finally:
+        s.close()
+
+
+def test_tail_file(tmpdir):
+    f = tmpdir.join('error.log')
+    f.write(''.join(f'{i}\n' for i in range(100)))
+    assert tail_file(str(f), 3) == ['97', '98', '99']
+    assert tail_file(str(tmpdir.join('none.log'))) == []
@@ -0,0 +1,128 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from guniflask_cli.shared_cache import _SEQ, SharedCache
+
+
+def test_get_set():
+    cache = SharedCache(slots=16, slot_size=128, ways=4)
+    cache.set('a', {'x': 1})
+    assert cache.get('a') == {'x': 1}
+    assert cache.get('b', 'miss') == 'miss'
+    assert cache.delete('a')
+    assert cache.get('a') is None
+    assert not cache.set('large', 'x' * 200)
+    cache.set('t', 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('t') is None
+    assert cache.get_or_set('c', lambda: 3) == 3
+    cache.clear()
+    assert cache.get('c') is None
+
+
+def test_evict_least_recently_used():
+    cache = SharedCache(slots=4, slot_size=128, ways=4)
+    for i in range(4):
+        cache.set(f'k{i}', i)
+    cache.get('k0')
+    cache.set('k4', 4)
+    assert cache.get('k0') == 0
+    assert cache.get('k1') is None
+    assert cache.get('k4') == 4
+
+
+def test_share_across_processes():
+    cache = SharedCache(slots=64, slot_size=256)
+    pids = []
+    for w in range(4):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                deadline = time.monotonic() + 0.3
+                n = 0
+                while time.monotonic() < deadline:
+                    key = f'k{n % 16}'
+                    cache.set(key, (key, w, 'x' * (n % 100)))
+                    value = cache.get(f'k{(n + 7) % 16}')
+                    # never a torn value
+                    if value is not None and value[0] != f'k{(n + 7) % 16}':
+                        code = 1
+                    n += 1
+            except Exception:
+                code = 1
+            finally:
+                os._exit(code)
+        pids.append(pid)
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+    assert cache.get('k0')[0] == 'k0'
+
+
+def test_writer_died_holding_lock():
+    cache = SharedCache(slots=4, slot_size=128, ways=4, lock_timeout=0.05)
+    cache.set('a', 1)
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        cache._acquire(0)
+        os.write(w, b'1')
+        time.sleep(60)
+        os._exit(0)
+    assert os.read(r, 1) == b'1'
+    # skipped while the holder is alive
+    assert not cache.set('a', 2)
+    assert cache.get('a') == 1
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+    # as if it died in the middle of writing the slot
+    off = cache._slots_offset
+    _SEQ.pack_into(cache.buf, off, _SEQ.unpack_from(cache.buf, off)[0] + 1)
+    assert cache.get('a') is None
+    cache.clear()
+    for i in range(cache.slots):
+        assert _SEQ.unpack_from(cache.buf, cache._slots_offset + i * cache.slot_size)[0] % 2 == 0
+    assert cache.set('a', 3)
+    assert cache.get('a') == 3
+
+
+BUSY_LOCK_SCRIPT = """
+from gevent import monkey
+monkey.patch_all()
+import os, time
+import gevent
+from guniflask_cli.shared_cache import SharedCache
+
+cache = SharedCache(slots=4, slot_size=128, ways=4, lock_timeout=0.3)
+r, w = os.pipe()
+pid = os.fork()
+if pid == 0:
+    cache._acquire(0)
+    os.write(w, b'1')
+    time.sleep(60)
+    os._exit(0)
+os.read(r, 1)
+ticks = []
+
+
+def tick():
+    while True:
+        ticks.append(1)
+        gevent.sleep(0.01)
+
+
+g = gevent.spawn(tick)
+assert not cache.set('a', 1)
+g.kill()
+os.kill(pid, 9)
+# other greenlets run while the write waits for the lock
+assert len(ticks) > 10, ticks
+"""
+
+
+def test_busy_lock_does_not_block_greenlets():
+    subprocess.run([sys.executable, '-c', BUSY_LOCK_SCRIPT], check=True, timeout=30)
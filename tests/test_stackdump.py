@@ -0,0 +1,29 @@
+import time
+
+from guniflask_cli.stackdump import DUMP_SIGNAL, StuckWorkerMonitor, format_stacks
+
+
+def test_format_stacks():
+    assert 'test_format_stacks' in format_stacks()
+
+
+def test_dump_stuck_workers_once(arbiter):
+    server = arbiter([1, 2], timeout=30, stack_dump_fraction=0.75)
+    now = time.monotonic()
+    server.WORKERS[1].tmp.value = now - 25
+    server.WORKERS[2].tmp.value = now
+    monitor = StuckWorkerMonitor(server)
+    monitor.check()
+    assert server.signals == [(1, DUMP_SIGNAL)]
+    # dumped once for each stall
+    monitor.check()
+    assert len(server.signals) == 1
+    server.WORKERS[1].tmp.value = time.monotonic() - 25
+    monitor.check()
+    assert len(server.signals) == 2
+
+    server.timeout = 0
+    server.WORKERS[1].tmp.value = time.monotonic() - 100
+    monitor.check()
+    assert len(server.signals) == 2
+
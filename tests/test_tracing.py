@@ -0,0 +1,62 @@
+import json
+
+from sqlalchemy import create_engine, text
+
+from guniflask_cli.tracing import JsonLinesExporter, Tracer, statement_fingerprint
+
+
+class ListExporter:
+    def __init__(self):
+        self.records = []
+
+    def export(self, record):
+        self.records.append(record)
+
+
+def test_statement_fingerprint():
+    assert statement_fingerprint("SELECT * FROM t1 WHERE id = 5 AND name = 'a''b'") \
+           == 'select * from t1 where id = ? and name = ?'
+    assert statement_fingerprint('select * from t where id in (%s, %s, %s)') \
+           == statement_fingerprint('select * from t where id in (:id_1)')
+    assert statement_fingerprint('INSERT INTO t (a, b) VALUES (?, ?), (?, ?)') == 'insert into t (a, b) values (?)'
+
+
+def test_trace_sql_spans():
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=0, slow_threshold=None)
+    tracer.sql_listener.listen()
+    try:
+        engine = create_engine('sqlite://')
+        tracer.start_trace('GET /a')
+        with engine.connect() as conn:
+            for i in range(3):
+                conn.execute(text('select :x'), {'x': i})
+        # not sampled
+        assert tracer.end_trace(status=200) is None
+
+        tracer.start_trace('GET /b')
+        with engine.connect() as conn:
+            conn.execute(text('select 1'))
+        record = tracer.end_trace(status=500)
+    finally:
+        tracer.sql_listener.remove()
+    assert exporter.records == [record]
+    assert record['sql_count'] == 1
+    assert record['spans'][0]['fingerprint'] == 'select ?'
+
+
+def test_sample_by_trace_id():
+    tracer = Tracer(ListExporter(), sample_rate=0.5)
+    assert len({tracer.is_sampled('same-id') for _ in range(10)}) == 1
+
+
+def test_json_lines_exporter_rotation(tmpdir):
+    path = str(tmpdir.join('traces.jsonl'))
+    exporter = JsonLinesExporter(path, max_bytes=100, backup_count=2)
+    for i in range(10):
+        exporter.export({'i': i, 'padding': 'x' * 40})
+    exporter.close()
+    assert sorted(i.basename for i in tmpdir.listdir() if not i.basename.endswith('.lock')) \
+           == ['traces.jsonl', 'traces.jsonl.1', 'traces.jsonl.2']
+    with open(path + '.1') as f:
+        assert [json.loads(line)['i'] for line in f] == [8, 9]
@@ -0,0 +1,37 @@
+import logging
+
+from flask import Flask, request
+
+from guniflask_cli.warmup import WARMUP_HEADER, parse_warmup_request, register_warmup, warm_up
+
+
+def test_parse_warmup_request():
+    assert parse_warmup_request('/health') == ('GET', '/health')
+    assert parse_warmup_request('post /api/items') == ('POST', '/api/items')
+
+
+def test_warm_up():
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/ping')
+    def ping():
+        calls.append(request.headers.get(WARMUP_HEADER))
+        return 'pong'
+
+    @register_warmup(app)
+    def prepare(app):
+        calls.append('prepare')
+
+    register_warmup(app, lambda app: 1 / 0)
+    assert warm_up(app, ['GET /ping'], timeout=10, logger=logging.getLogger('test'))
+    # the error of a step does not stop warm-up
+    assert calls == ['prepare', '1']
+
+
+def test_warm_up_timeout():
+    app = Flask(__name__)
+    calls = []
+    register_warmup(app, lambda app: calls.append(1))
+    assert not warm_up(app, timeout=-1)
+    assert calls == []
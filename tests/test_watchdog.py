@@ -0,0 +1,37 @@
+import os
+import signal
+
+from guniflask_cli.settings import validate_size
+from guniflask_cli.watchdog import MemoryWatchdog
+
+
+def test_validate_size():
+    assert validate_size('512M') == 512 * 1024 * 1024
+    assert validate_size('1.5GiB') == int(1.5 * 1024 ** 3)
+    assert validate_size(1024) == 1024
+
+
+def test_recycle_workers_above_limits(arbiter):
+    # all workers share the memory of the current process in this test
+    pid = os.getpid()
+    server = arbiter([pid], memory_soft_limit='1K', memory_capacity_floor=0.5)
+    watchdog = MemoryWatchdog(server)
+    watchdog.first_seen[pid] = -1e9
+    watchdog.check()
+    assert server.killed == [(pid, signal.SIGTERM)]
+    # not recycled again while it is exiting
+    watchdog.check()
+    assert len(server.killed) == 1
+
+    server = arbiter([pid], memory_soft_limit='1K', memory_hard_limit='2K')
+    MemoryWatchdog(server).check()
+    assert server.killed == [(pid, signal.SIGKILL)]
+
+
+def test_keep_capacity_floor(arbiter):
+    pid = os.getpid()
+    server = arbiter([pid, 1], memory_soft_limit='1K', memory_capacity_floor=1)
+    watchdog = MemoryWatchdog(server)
+    watchdog.first_seen.update({pid: -1e9, 1: -1e9})
+    watchdog.check()
+    assert server.killed == []
@@ -0,0 +1,39 @@
+import sys
+
+import pytest
+
+from guniflask_cli.errors import ConfigError
+from guniflask_cli.workers import apply_worker_defaults, validate_worker_options, worker_concurrency, worker_type
+
+
+def test_worker_type():
+    assert worker_type('sync') == 'sync'
+    assert worker_type('sync', threads=4) == 'gthread'
+    assert worker_type('gunicorn.workers.gthread.ThreadWorker') == 'gthread'
+    assert worker_type('gevent') == 'gevent'
+    assert worker_type('asgi') == 'asgi'
+    assert worker_type('foo.Worker') is None
+
+
+def test_worker_defaults():
+    options = {'worker_class': 'gthread'}
+    apply_worker_defaults(options)
+    assert options['threads'] == 4
+    assert worker_concurrency(options) == 4
+
+    options = {'worker_class': 'gevent', 'workers': 2}
+    apply_worker_defaults(options)
+    assert options['workers'] == 2
+    assert worker_concurrency(options) == 1000
+
+    options = {'worker_class': 'asgi'}
+    apply_worker_defaults(options)
+    assert worker_type(options['worker_class']) == 'asgi'
+
+
+def test_gevent_with_preload_app():
+    pytest.importorskip('gevent')
+    if 'gevent.monkey' in sys.modules and sys.modules['gevent.monkey'].is_module_patched('socket'):
+        pytest.skip('gevent has patched the test process')
+    with pytest.raises(ConfigError):
+        validate_worker_options({'worker_class': 'gevent', 'preload_app': True})